@@ -1,43 +1,43 @@
-import os
-from typing import List, Dict, Optional
-from datetime import datetime
-from dotenv import load_dotenv
-from openai import AzureOpenAI
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 
+from app.config import AZURE_OPENAI_CHAT_DEPLOYMENT
 from app.rag.retriever import retrieve_context
+from app.rag.store import list_document_types
 from app.chat.session_manager import session_manager
-from app.models.schemas import ChatSession
+from app.utils.admission import PRIORITY_CHAT, llm_admission
 from app.utils.logger import get_logger
+from app.utils.metrics import record_usage, stage_timer
+from app.utils.openai_client import get_openai_client
+from app.utils.resilience import completion_policy
+from app.utils.tracing import annotate, traced
 
 logger = get_logger(__name__)
-load_dotenv()
 
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-)
+# Runs retrieval and the topic scan alongside the request thread
+_chat_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="chat")
+
+def _submit(fn, *args, **kwargs):
+    """Run ``fn`` on the chat pool inside a copy of the caller's trace context."""
+    return _chat_pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def _retrieve(user_message: str, k: int, topic: Optional[str]) -> Tuple[List[Dict], Optional[int]]:
+    try:
+        contexts, index_version = retrieve_context(user_message, k=k, document_type=topic)
+        logger.debug("Retrieved %s context chunks", len(contexts))
+        return contexts, index_version
+    except Exception as e:
+        logger.warning("Context retrieval failed: %s", e)
+        return [], None
 
 def get_available_topics() -> List[str]:
-    """Get list of available document topics from the knowledge base."""
-    from pathlib import Path
-    import json
-
-    topics = set()
-    chunks_dir = Path("data/chunks")
-
-    for chunk_file in chunks_dir.glob("*.json"):
-        with open(chunk_file, "r") as f:
-            chunks = json.load(f)
-            for chunk in chunks:
-                metadata = chunk.get("metadata", {})
-                if metadata.get("approved", False):
-                    doc_type = metadata.get("document_type")
-                    if doc_type:
-                        topics.add(doc_type)
+    """Get list of available document topics (types of approved documents)."""
+    with stage_timer("topics"):
+        topics = list_document_types(approved_only=True)
     
-    logger.info(f"Available topics: {sorted(topics)}")
-    return sorted(topics)
+    logger.debug("Available topics: %s", topics)
+    return topics
 
 def build_chat_prompt(
     user_message: str,
@@ -77,6 +77,7 @@ Guidelines:
 
     return messages 
 
+@traced("chat")
 def chat(
     session_id: str,
     user_message: str,
@@ -94,23 +95,23 @@ def chat(
     
     Returns:
         Response dictionary with answer and metadata
+
+    Independent steps run concurrently: query embedding and search on one
+    worker, the topic catalog on another, while the session and history
+    are read on the calling thread. Only retrieval -> LLM is serial.
     """
 
-    logger.info(f"Chat request - Session: {session_id}, Topic: {topic}, Message: '{user_message[:50]}...'")
+    logger.debug("Chat request - Session: %s, Topic: %s, Message: '%s...'", session_id, topic, user_message[:50])
+
+    # Topics are only needed for the response, so the scan overlaps everything below
+    topics_future = _submit(get_available_topics)
 
     # Get or create session
     session = session_manager.get_session(session_id)
     if not session:
-        logger.info(f"Session not found, creating new: {session_id}")
-        new_session = ChatSession(
-            session_id=session_id,
-            messages=[],
-            selected_topic=topic,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        session_manager.sessions[session_id] = new_session
-        session = new_session
+        logger.debug("Session not found, creating new: %s", session_id)
+        session_manager.create_session(session_id, topic=topic)
+        session = session_manager.get_session(session_id)
     
     # Update topic if provided
     if topic:
@@ -118,38 +119,50 @@ def chat(
     else:
         topic = session.selected_topic
 
-    # Retrieve relevant context
-    contexts = []
+    # Retrieve relevant context while history is read here
+    contexts_future = None
     if user_message.lower() not in ["hello", "hi", "help", "topics"]:
-        try:
-            contexts = retrieve_context(user_message, k=k, document_type=topic)
-            logger.info(f"Retrieved {len(contexts)} context chunks")
-        except Exception as e:
-            logger.warning(f"Context retrieval failed: {e}")
-    
+        contexts_future = _submit(_retrieve, user_message, k, topic)
+
     # Get conversation history
     conversation_history = session_manager.get_conversation_history(session_id)
+    contexts, index_version = contexts_future.result() if contexts_future else ([], None)
     
     # Build chat messages
-    messages = build_chat_prompt(user_message, contexts, conversation_history, topic)
+    with stage_timer("prompt_build"):
+        messages = build_chat_prompt(user_message, contexts, conversation_history, topic)
 
     # Call GPT
-    logger.info("Calling Azure OpenAI for chat completion")
-    deployment = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT")
-
-    response = client.chat.completions.create(
-        model=deployment,
-        messages=messages,
-        temperature=0.7,
-        max_tokens=800
+    logger.debug("Calling Azure OpenAI for chat completion")
+    deployment = AZURE_OPENAI_CHAT_DEPLOYMENT
+
+    with llm_admission.slot(PRIORITY_CHAT), stage_timer("llm"):
+        response = completion_policy.call(
+            lambda timeout: get_openai_client().chat.completions.create(
+                model=deployment,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=800,
+                timeout=timeout
+            )
+        )
+    usage = getattr(response, "usage", None)
+    record_usage(usage)
+    annotate(
+        k=k,
+        contexts=len(contexts),
+        history_messages=len(conversation_history),
+        prompt_bytes=sum(len(m["content"].encode("utf-8")) for m in messages),
+        tokens=getattr(usage, "total_tokens", None)
     )
 
     assistant_message = response.choices[0].message.content  # Fixed: choices not choice
-    logger.info(f"Generated response ({len(assistant_message)} chars)")
+    logger.debug("Generated response (%s chars)", len(assistant_message))
 
     # Save messages to session
-    session_manager.add_message(session_id, "user", user_message)
-    session_manager.add_message(session_id, "assistant", assistant_message)
+    with stage_timer("session_write"):
+        session_manager.add_message(session_id, "user", user_message)
+        session_manager.add_message(session_id, "assistant", assistant_message)
 
     # Prepare sources
     sources = [
@@ -167,7 +180,8 @@ def chat(
         "message": assistant_message,
         "topic": topic,
         "sources": sources,
-        "available_topics": get_available_topics()
+        "available_topics": topics_future.result(),
+        "index_version": index_version
     }
 
 
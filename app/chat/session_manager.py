@@ -1,71 +1,109 @@
+import sys
+import time
 import uuid 
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from typing import  Dict,Optional,List
 from pathlib import Path
 import json
 
+from app.config import SESSION_MAX_MESSAGES
 from app.models.schemas import ChatSession,ChatMessage
 from app.utils.logger import get_logger
 
 logger=get_logger(__name__)
 
+
+class _Message:
+    """One turn of a conversation; timestamps are epoch seconds."""
+
+    __slots__=("role","content","timestamp")
+
+    def __init__(self,role:str,content:str,timestamp:float):
+        # Roles repeat in every session, so share one string object per role
+        self.role=sys.intern(role)
+        self.content=content
+        self.timestamp=timestamp
+
+
+class Session:
+    """Compact live session: a bounded ring buffer of ``_Message`` records.
+
+    Only the newest ``SESSION_MAX_MESSAGES`` messages are kept. ``to_model``
+    builds the pydantic ``ChatSession`` for API responses and persistence.
+    """
+
+    __slots__=("session_id","messages","selected_topic","created_at","updated_at")
+
+    def __init__(self,session_id:str,selected_topic:Optional[str]=None,max_messages:int=SESSION_MAX_MESSAGES):
+        now=time.time()
+        self.session_id=session_id
+        self.messages:deque=deque(maxlen=max_messages)
+        self.selected_topic=selected_topic
+        self.created_at=now
+        self.updated_at=now
+
+    def to_model(self)->ChatSession:
+        return ChatSession(
+            session_id=self.session_id,
+            messages=[
+                ChatMessage(role=m.role,content=m.content,timestamp=datetime.utcfromtimestamp(m.timestamp))
+                for m in self.messages
+            ],
+            selected_topic=self.selected_topic,
+            created_at=datetime.utcfromtimestamp(self.created_at),
+            updated_at=datetime.utcfromtimestamp(self.updated_at)
+        )
+
+
 class SessionManager:
     """Manage chat sessions and conversation history."""
 
     def __init__(self):
-        self.sessions:Dict[str,ChatSession]={}
+        self.sessions:Dict[str,Session]={}
         self.sessions_dir=Path("data/sessions")
         self.sessions_dir.mkdir(parents=True,exist_ok=True)
 
-    def create_session(self)->str:
-        """Create a new chat session."""
-        session_id=str(uuid.uuid4())
-        session=ChatSession(  # Fixed typo
-            session_id=session_id,
-            messages=[],
-            selected_topic=None,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        self.sessions[session_id]=session  
-        logger.info(f"Created new chat session: {session_id}")
+    def create_session(self,session_id:Optional[str]=None,topic:Optional[str]=None)->str:
+        """Create a new chat session (with a new id unless ``session_id`` is given)."""
+        session_id=session_id or str(uuid.uuid4())
+        self.sessions[session_id]=Session(session_id,selected_topic=topic)
+        logger.info("Created new chat session: %s", session_id)
         return session_id
-    def get_session(self,session_id:str)-> Optional[ChatSession]:
+    def get_session(self,session_id:str)-> Optional[Session]:
         """Get an existing session."""
         return self.sessions.get(session_id)
     def add_message(self,session_id:str,role:str,content:str):
         """Add a message to the conversation history."""
         session = self.sessions.get(session_id)
         if not session:
-            logger.warning(f"Session not found: {session_id}")
+            logger.warning("Session not found: %s", session_id)
             return 
         
-        message = ChatMessage(
-            role=role,
-            content=content,
-            timestamp=datetime.utcnow()
-        )
-        session.messages.append(message)
-        session.updated_at=datetime.utcnow()
-        logger.info(f"Added{role} message to session {session_id}")
+        now=time.time()
+        session.messages.append(_Message(role,content,now))
+        session.updated_at=now
+        logger.debug("Added%s message to session %s", role, session_id)
 
     def set_topic(self, session_id:str,topic:str):
         """Set the topic for a session."""
         session=self.sessions.get(session_id)
         if session:
             session.selected_topic=topic 
-            logger.info(f"Set topic '{topic}' for session {session_id} ")
+            logger.debug("Set topic '%s' for session %s ", topic, session_id)
     
     def get_conversation_history(self,session_id:str,max_messages:int=10)-> List[dict]:
-        """Get recent conversation history."""
+        """Get recent conversation history in chat-completions message format."""
         session= self.sessions.get(session_id)
         if not session:
             return []
         
-        recent_messages=session.messages[-max_messages:]
+        messages=session.messages
+        skip=max(len(messages)-max_messages,0)
         return [
             {"role":msg.role,"content":msg.content}
-            for msg in recent_messages
+            for msg in islice(messages,skip,None)
         ]
     def save_session(self,session_id:str):
         """Save session to disk."""
@@ -75,7 +113,7 @@ class SessionManager:
         
         file_path=self.sessions_dir/f"{session_id}.json"
         with open(file_path,"w") as f:
-            json.dump(session.model_dump(),f,indent=2,default=str)
-        logger.info(f"Saved session {session_id} to disk")
+            json.dump(session.to_model().model_dump(),f,indent=2,default=str)
+        logger.info("Saved session %s to disk", session_id)
 
-session_manager=SessionManager()
\ No newline at end of file
+session_manager=SessionManager()
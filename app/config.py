@@ -6,11 +6,98 @@ load_dotenv()
 #azure opepnai configurations
 AZURE_OPENAI_ENDPOINT=os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_KEY=os.getenv("AZURE_OPENAI_KEY")
+AZURE_OPENAI_API_KEY=os.getenv("AZURE_OPENAI_API_KEY")
+AZURE_OPENAI_API_VERSION=os.getenv("AZURE_OPENAI_API_VERSION")
+AZURE_OPENAI_CHAT_DEPLOYMENT=os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT")
+AZURE_OPENAI_EMBEDDING_DEPLOYMENT=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+
+#openai http client configurations (one pooled client shared by all modules)
+OPENAI_MAX_CONNECTIONS=int(os.getenv("OPENAI_MAX_CONNECTIONS","100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS","20"))
+OPENAI_KEEPALIVE_EXPIRY_S=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_S","60"))
+OPENAI_TIMEOUT_S=float(os.getenv("OPENAI_TIMEOUT_S","60"))
+OPENAI_CONNECT_TIMEOUT_S=float(os.getenv("OPENAI_CONNECT_TIMEOUT_S","5"))
+
+#resilience configurations for azure openai calls (retries here replace the SDK's own)
+LLM_DEADLINE_S=float(os.getenv("LLM_DEADLINE_S","30"))
+EMBEDDING_DEADLINE_S=float(os.getenv("EMBEDDING_DEADLINE_S","10"))
+UPSTREAM_MAX_RETRIES=int(os.getenv("UPSTREAM_MAX_RETRIES","2"))
+UPSTREAM_BACKOFF_BASE_S=float(os.getenv("UPSTREAM_BACKOFF_BASE_S","0.25"))
+UPSTREAM_BACKOFF_MAX_S=float(os.getenv("UPSTREAM_BACKOFF_MAX_S","4"))
+CIRCUIT_FAILURE_THRESHOLD=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD","5"))
+CIRCUIT_RESET_TIMEOUT_S=float(os.getenv("CIRCUIT_RESET_TIMEOUT_S","30"))
+#hedge after this latency percentile (e.g. 95); empty disables hedging
+LLM_HEDGE_PERCENTILE=float(os.getenv("LLM_HEDGE_PERCENTILE")) if os.getenv("LLM_HEDGE_PERCENTILE") else None
+EMBEDDING_HEDGE_PERCENTILE=float(os.getenv("EMBEDDING_HEDGE_PERCENTILE")) if os.getenv("EMBEDDING_HEDGE_PERCENTILE") else None
+HEDGE_MIN_SAMPLES=int(os.getenv("HEDGE_MIN_SAMPLES","20"))
 AZURE_OPENAI_EMBEGGINI_MODEL="text-embedding-3-small"
 AZURE_OPENAI_CHAT_MODEL="gpt-4o"
 
+#admission control for llm completions: slots, waiting requests and how long one may wait
+LLM_MAX_CONCURRENCY=int(os.getenv("LLM_MAX_CONCURRENCY","8"))
+LLM_MAX_QUEUE=int(os.getenv("LLM_MAX_QUEUE","64"))
+LLM_QUEUE_TIMEOUT_S=float(os.getenv("LLM_QUEUE_TIMEOUT_S","10"))
+
 #azure ai search configurations
 AZURE_SEARCH_ENPOINT=os.getenv("AZURE_SEARCH_ENPOINT")
 AZURE_SEARCH_KEY=os.getenv("AZURE_SEARCH_KEY")
 AZURE_SEARCH_INDEX_NAME="enterprise-knowlege-index"
 
+#embedding configurations ("azure", "azure:<deployment>", "hashing" or "hashing:<dim>")
+EMBEDDING_PROVIDER=os.getenv("EMBEDDING_PROVIDER","azure")
+EMBEDDING_HASHING_DIM=int(os.getenv("EMBEDDING_HASHING_DIM","512"))
+#concurrent query embeddings are sent together: wait up to this long (0 disables) or until the cap
+EMBEDDING_BATCH_WINDOW_MS=float(os.getenv("EMBEDDING_BATCH_WINDOW_MS","5"))
+EMBEDDING_BATCH_MAX=int(os.getenv("EMBEDDING_BATCH_MAX","16"))
+
+#chunk repository (SQLite); legacy data/chunks/*.json files are imported on first use
+CHUNK_DB_PATH=os.getenv("CHUNK_DB_PATH","data/chunks.db")
+
+#vector index configurations
+VECTOR_INDEX_MMAP=os.getenv("VECTOR_INDEX_MMAP","true").lower()=="true"
+#index builds stream chunks in batches of this many; each batch is embedded, checkpointed (builds resume
+#from checkpoints after a failure) and added to the index as soon as it is ready
+INDEX_CHECKPOINT_CHUNKS=int(os.getenv("INDEX_CHECKPOINT_CHUNKS","512"))
+#embedding batches of an index build in flight at once
+INDEX_EMBED_IN_FLIGHT=int(os.getenv("INDEX_EMBED_IN_FLIGHT","4"))
+#restart builds that were interrupted (e.g. by a restart) when the app starts
+INDEX_RESUME_ON_STARTUP=os.getenv("INDEX_RESUME_ON_STARTUP","true").lower()=="true"
+#concurrent searches of one store run as one batched faiss call of up to this many queries (1 disables)
+SEARCH_BATCH_MAX=int(os.getenv("SEARCH_BATCH_MAX","64"))
+#extra time a batch waits for more queries; 0 only batches queries that arrive during a running search
+SEARCH_BATCH_WAIT_MS=float(os.getenv("SEARCH_BATCH_WAIT_MS","0"))
+#threads for retrieval-only request work (/search, the retrieval step of /query), kept apart from llm-bound requests
+SEARCH_POOL_THREADS=int(os.getenv("SEARCH_POOL_THREADS","16"))
+#batched searches of at least this many queries use faiss's blas distance path
+FAISS_BLAS_MIN_BATCH=int(os.getenv("FAISS_BLAS_MIN_BATCH","8"))
+#largest embedding dimension served (1536 for text-embedding-3-small); faiss's blas threshold is process-wide and sized for it
+FAISS_BLAS_DIM=int(os.getenv("FAISS_BLAS_DIM",str(max(1536,EMBEDDING_HASHING_DIM))))
+#number of built index versions kept on disk for rollback
+INDEX_RETAIN_VERSIONS=int(os.getenv("INDEX_RETAIN_VERSIONS","3"))
+#compact a store in the background once this fraction of its vectors are tombstoned
+INDEX_COMPACTION_THRESHOLD=float(os.getenv("INDEX_COMPACTION_THRESHOLD","0.2"))
+
+#share one embedding + search between concurrent identical requests
+COALESCE_SEARCHES=os.getenv("COALESCE_SEARCHES","true").lower()=="true"
+#also share one /query completion between identical concurrent questions (same question, same contexts)
+COALESCE_COMPLETIONS=os.getenv("COALESCE_COMPLETIONS","false").lower()=="true"
+
+#chat sessions keep only this many most recent messages
+SESSION_MAX_MESSAGES=int(os.getenv("SESSION_MAX_MESSAGES","50"))
+
+#http responses of at least this many bytes are compressed (brotli if installed, else gzip)
+COMPRESSION_MIN_BYTES=int(os.getenv("COMPRESSION_MIN_BYTES","1024"))
+COMPRESSION_LEVEL=int(os.getenv("COMPRESSION_LEVEL","5"))
+
+#startup warm-up: stores to preload (comma-separated, empty for none), azure connections to open
+#and whether to run a dummy search; /ready reports 503 until it has finished
+WARMUP_STORES=[name.strip() for name in os.getenv("WARMUP_STORES","default").split(",") if name.strip()]
+WARMUP_CONNECTIONS=int(os.getenv("WARMUP_CONNECTIONS","2"))
+WARMUP_SEARCH=os.getenv("WARMUP_SEARCH","true").lower()=="true"
+
+#tracing configurations
+SLOW_TRACE_THRESHOLD_MS=float(os.getenv("SLOW_TRACE_THRESHOLD_MS","2000"))
+SLOW_TRACE_LOG=os.getenv("SLOW_TRACE_LOG","logs/slow_requests.jsonl")
+
+#logging configurations
+LOG_LEVEL=os.getenv("LOG_LEVEL","INFO").upper()
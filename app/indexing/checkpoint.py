@@ -0,0 +1,161 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.indexing.versions import INDEX_ROOT, store_root
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHECKPOINT_DIR = "checkpoint"
+LOCK_FILE = "lock"
+
+
+_held = threading.local()
+
+
+@contextmanager
+def store_lock(store_name: str, wait: bool = True) -> Iterator[bool]:
+    """
+    Hold the cross-process lock (an flock on ``checkpoint/lock``) for
+    changing ``store_name``: builds, and every read-current-then-publish
+    update. Yields False without waiting when ``wait`` is off and another
+    holder has it. Re-entrant within a thread, so helpers that publish can
+    take it again under a caller that already holds it.
+    """
+    held = _held.__dict__.setdefault("stores", {})
+    if store_name in held:
+        held[store_name] += 1
+        try:
+            yield True
+        finally:
+            held[store_name] -= 1
+        return
+
+    directory = store_root(store_name) / CHECKPOINT_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_FILE, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        held[store_name] = 1
+        try:
+            yield True
+        finally:
+            del held[store_name]
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def content_key(chunk: Dict) -> int:
+    """63-bit key of a chunk's id and text; an edited chunk gets a new key and is re-embedded."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(chunk["chunk_id"].encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(chunk["text"].encode("utf-8"))
+    return int.from_bytes(digest.digest(), "little") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def content_keys(chunks: Sequence[Dict]) -> np.ndarray:
+    return np.fromiter((content_key(chunk) for chunk in chunks), dtype=np.int64, count=len(chunks))
+
+
+class BuildCheckpoint:
+    """
+    Embeddings of an unfinished build of one store, kept on disk until the
+    build is published.
+
+    Each embedded batch is written as its own ``batch_<n>.npz`` (content keys
+    and float32 vectors) with a write-then-rename, so a crash loses at most
+    the batch in flight. ``params.json`` records the provider and build
+    parameters; vectors from another provider are never reused.
+
+    Builds hold the store's lock (see store_lock) for their whole run, so
+    server workers and the bulk CLI never write or clear each other's batches.
+    """
+
+    def __init__(self, store_name: str):
+        self.store_name = store_name
+        self.directory = store_root(store_name) / CHECKPOINT_DIR
+        self._next_batch = 0
+
+    @property
+    def params_file(self) -> Path:
+        return self.directory / "params.json"
+
+    def locked(self, wait: bool = True):
+        """Hold the store's lock; see store_lock."""
+        return store_lock(self.store_name, wait)
+
+    def params(self) -> Optional[Dict]:
+        try:
+            return json.loads(self.params_file.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def begin(self, params: Dict) -> Dict[int, np.ndarray]:
+        """
+        Start or resume a build with ``params`` and return the vectors already
+        embedded, keyed by content key. A checkpoint from another provider is
+        discarded.
+        """
+        existing = self.params()
+        if existing is not None and existing.get("embedding_provider") != params.get("embedding_provider"):
+            logger.info("Discarding checkpoint of '%s' made with provider '%s'", self.store_name, existing.get("embedding_provider"))
+            self.clear()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.params_file.with_suffix(".json.tmp")
+        tmp_file.write_text(json.dumps(params, indent=2))
+        os.replace(tmp_file, self.params_file)
+
+        vectors: Dict[int, np.ndarray] = {}
+        for batch_file in self._batch_files():
+            try:
+                with np.load(batch_file) as batch:
+                    vectors.update(zip(batch["keys"].tolist(), batch["vectors"]))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Ignoring unreadable checkpoint batch %s: %s", batch_file.name, e)
+            self._next_batch = max(self._next_batch, int(batch_file.stem.split("_")[1]) + 1)
+        return vectors
+
+    def append(self, keys: np.ndarray, vectors: np.ndarray):
+        """Persist one embedded batch."""
+        batch_file = self.directory / f"batch_{self._next_batch:06d}.npz"
+        tmp_file = batch_file.with_suffix(".tmp")
+        with open(tmp_file, "wb") as f:
+            np.savez(f, keys=np.asarray(keys, dtype=np.int64), vectors=np.asarray(vectors, dtype=np.float32))
+        os.replace(tmp_file, batch_file)
+        self._next_batch += 1
+
+    def clear(self):
+        # The directory (and the lock file in it) stays; removing it would let
+        # another build lock a fresh file while this one still runs
+        for leftover in self.directory.glob("*"):
+            if leftover.name != LOCK_FILE:
+                leftover.unlink(missing_ok=True)
+        self._next_batch = 0
+
+    def _batch_files(self) -> List[Path]:
+        return sorted(self.directory.glob("batch_*.npz"))
+
+
+def pending_checkpoints() -> List[Tuple[str, Dict]]:
+    """``(store_name, build params)`` of builds that stopped before publishing."""
+    if not INDEX_ROOT.is_dir():
+        return []
+    pending = []
+    for root in sorted(INDEX_ROOT.iterdir()):
+        if root.is_dir():
+            params = BuildCheckpoint(root.name).params()
+            if params is not None:
+                pending.append((root.name, params))
+    return pending
@@ -1,61 +1,260 @@
-import os
-from typing import List
-from dotenv import load_dotenv
-from openai import AzureOpenAI
-
-# Load environment variables
-load_dotenv()
-
-# Initialize Azure OpenAI client
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
+import re
+import threading
+import zlib
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Dict, List, Optional
+import numpy as np
+from app.config import (
+    AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
+    EMBEDDING_BATCH_MAX,
+    EMBEDDING_BATCH_WINDOW_MS,
+    EMBEDDING_HASHING_DIM,
+    EMBEDDING_PROVIDER,
 )
+from app.utils.logger import get_logger
+from app.utils.metrics import EMBEDDING_BATCH_SIZE, record_usage, stage_timer
+from app.utils.openai_client import get_openai_client
+from app.utils.resilience import embedding_policy
+from app.utils.tracing import annotate, traced
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
+logger = get_logger(__name__)
+
+
+class EmbeddingProvider:
+    """Turns texts into vectors. ``name`` is recorded with every store it builds."""
+
+    name = ""
+    # Remote providers pay a round trip per call, so concurrent queries are micro-batched
+    batch_queries = False
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class AzureEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from an Azure OpenAI deployment, sent in batches of 16."""
+
+    batch_size = 16
+    batch_queries = True
+
+    def __init__(self, deployment: Optional[str] = None):
+        self.deployment = deployment or AZURE_OPENAI_EMBEDDING_DEPLOYMENT
+        if not self.deployment:
+            # The name is recorded with every store; "azure:None" could never be queried again
+            raise ValueError("No Azure embedding deployment: set AZURE_OPENAI_EMBEDDING_DEPLOYMENT or use 'azure:<deployment>'")
+        self.name = f"azure:{self.deployment}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        embeddings = []
+        total_tokens = 0
+
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i:i + self.batch_size]
+
+            try:
+                with stage_timer("embed"):
+                    response = embedding_policy.call(
+                        lambda timeout: get_openai_client().embeddings.create(
+                            model=self.deployment,
+                            input=batch,
+                            timeout=timeout
+                        )
+                    )
+                usage = getattr(response, "usage", None)
+                record_usage(usage)
+                total_tokens += getattr(usage, "total_tokens", 0) or 0
+                embeddings.extend([item.embedding for item in response.data])
+            except Exception as e:
+                logger.error("Embedding a batch of %s texts with '%s' failed: %s", len(batch), self.deployment, e)
+                raise
+
+        annotate(batches=(len(texts) + self.batch_size - 1) // self.batch_size, tokens=total_tokens)
+        return embeddings
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+@lru_cache(maxsize=200_000)
+def _hash_token(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Local, deterministic embeddings with no network access.
+
+    Words are hashed into ``dim`` signed buckets (the hashing trick), term
+    frequencies are damped with log1p and rows are L2-normalized, so L2
+    distance between vectors tracks cosine similarity of the word counts.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing:{dim}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        with stage_timer("embed"):
+            for row, text in enumerate(texts):
+                tokens = _TOKEN_RE.findall(text.lower())
+                if not tokens:
+                    continue
+                hashes = np.fromiter((_hash_token(t) for t in tokens), dtype=np.uint32, count=len(tokens))
+                buckets = hashes % self.dim
+                signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+                np.add.at(matrix[row], buckets, signs)
+
+            matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+        return list(matrix)
+
+
+class _Batch:
+    __slots__ = ("texts", "futures", "sealed")
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.futures: List[Future] = []
+        self.sealed = threading.Event()
+
+
+class QueryBatcher:
+    """
+    Collects concurrent single-query embeddings into one provider call.
+
+    The first caller of a batch waits up to ``window_s`` (less if the batch
+    reaches ``max_batch``), then embeds everything collected and hands each
+    caller its own vector. A failed call fails every caller in the batch.
     """
-    Generate embeddings using Azure OpenAI.
-    
+
+    def __init__(self, provider: EmbeddingProvider, window_s: float, max_batch: int):
+        self.provider = provider
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending = _Batch()
+
+    def embed(self, text: str) -> List[float]:
+        future: Future = Future()
+        with self._lock:
+            batch = self._pending
+            batch.texts.append(text)
+            batch.futures.append(future)
+            leader = len(batch.texts) == 1
+            if len(batch.texts) >= self.max_batch:
+                self._pending = _Batch()
+                batch.sealed.set()
+
+        if leader:
+            batch.sealed.wait(self.window_s)
+            with self._lock:
+                if self._pending is batch:
+                    self._pending = _Batch()
+            self._flush(batch)
+        else:
+            annotate(batched=True)
+        return future.result()
+
+    def _flush(self, batch: _Batch):
+        EMBEDDING_BATCH_SIZE.observe(len(batch.texts))
+        annotate(batch_size=len(batch.texts))
+        try:
+            vectors = self.provider.embed(batch.texts)
+        except BaseException as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        for future, vector in zip(batch.futures, vectors):
+            future.set_result(vector)
+
+
+_providers: Dict[str, EmbeddingProvider] = {}
+_batchers: Dict[str, QueryBatcher] = {}
+_batchers_lock = threading.Lock()
+
+def get_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """
+    Resolve a provider from a spec such as "azure", "azure:<deployment>",
+    "hashing" or "hashing:<dim>". Defaults to EMBEDDING_PROVIDER.
+    """
+    spec = name or EMBEDDING_PROVIDER
+    if spec not in _providers:
+        kind, _, arg = spec.partition(":")
+        if kind == "azure":
+            provider = AzureEmbeddingProvider(arg or None)
+        elif kind == "hashing":
+            provider = HashingEmbeddingProvider(int(arg) if arg else EMBEDDING_HASHING_DIM)
+        else:
+            raise ValueError(f"Unknown embedding provider: {spec}")
+        _providers[spec] = provider
+    return _providers[spec]
+
+def _clean_text(text) -> str:
+    # Convert to string and strip whitespace
+    clean_text = str(text).strip()
+
+    # Skip empty texts
+    if not clean_text:
+        clean_text = "empty"
+
+    # Replace problematic characters
+    return clean_text.replace('\x00', '')  # Remove null bytes
+
+def _batcher(provider: EmbeddingProvider) -> QueryBatcher:
+    with _batchers_lock:
+        if provider.name not in _batchers:
+            _batchers[provider.name] = QueryBatcher(provider, EMBEDDING_BATCH_WINDOW_MS / 1000, EMBEDDING_BATCH_MAX)
+        return _batchers[provider.name]
+
+@traced("embed_texts")
+def embed_texts(texts: List[str], provider: Optional[str] = None) -> List[List[float]]:
+    """
+    Generate embeddings with the selected provider (Azure OpenAI by default).
+
     Args:
         texts: List of text strings to embed
-        
+        provider: Provider spec, see get_provider
+
     Returns:
         List of embedding vectors
     """
-    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-    
+    embedding_provider = get_provider(provider)
+
     # Clean and validate input texts
-    clean_texts = []
-    for text in texts:
-        # Convert to string and strip whitespace
-        clean_text = str(text).strip()
-        
-        # Skip empty texts
-        if not clean_text:
-            clean_text = "empty"
-        
-        # Replace problematic characters
-        clean_text = clean_text.replace('\x00', '')  # Remove null bytes
-        
-        clean_texts.append(clean_text)
-    
-    # Process in batches
-    embeddings = []
-    batch_size = 16
-    
-    for i in range(0, len(clean_texts), batch_size):
-        batch = clean_texts[i:i + batch_size]
-        
-        try:
-            response = client.embeddings.create(
-                model=deployment,
-                input=batch
-            )
-            embeddings.extend([item.embedding for item in response.data])
-        except Exception as e:
-            print(f"Error embedding batch: {e}")
-            print(f"Batch content: {batch[:100]}...")  # Print first 100 chars for debugging
-            raise
-    
-    return embeddings
\ No newline at end of file
+    clean_texts = [_clean_text(text) for text in texts]
+
+    embeddings = embedding_provider.embed(clean_texts)
+
+    annotate(
+        provider=embedding_provider.name,
+        texts=len(clean_texts),
+        chars=sum(len(t) for t in clean_texts)
+    )
+    return embeddings
+
+@traced("embed_query")
+def embed_query(query: str, provider: Optional[str] = None) -> List[float]:
+    """
+    Embed a single search query.
+
+    For remote providers, queries from concurrent requests are micro-batched
+    into one call (EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_BATCH_MAX).
+
+    Args:
+        query: Query text
+        provider: Provider spec, see get_provider
+
+    Returns:
+        Embedding vector
+    """
+    embedding_provider = get_provider(provider)
+    if not embedding_provider.batch_queries or EMBEDDING_BATCH_WINDOW_MS <= 0:
+        return embed_texts([query], provider=provider)[0]
+
+    clean_query = _clean_text(query)
+    embedding = _batcher(embedding_provider).embed(clean_query)
+    annotate(provider=embedding_provider.name, texts=1, chars=len(clean_query))
+    return embedding
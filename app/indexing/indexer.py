@@ -1,17 +1,36 @@
-import json
-from pathlib import Path
-from typing import List, Dict, Optional
-from app.indexing.embeddings import embed_texts
-from app.indexing.vector_store import VectorStore
+import contextvars
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+import numpy as np
+from app.indexing.embeddings import embed_query, embed_texts, get_provider
+from app.config import COALESCE_SEARCHES, INDEX_CHECKPOINT_CHUNKS, INDEX_COMPACTION_THRESHOLD, INDEX_EMBED_IN_FLIGHT
+from app.indexing.checkpoint import BuildCheckpoint, content_keys, pending_checkpoints, store_lock
+from app.indexing.jobs import submit_job, track_progress
+from app.indexing.vector_store import VectorStore, chunk_vector_ids
+from app.indexing.sharded_store import SHARD_BY_DOCUMENT_TYPE, ShardedVectorStore, load_sharded_store, open_store, search_store, shard_store_name
+from app.indexing.versions import new_version
+from app.rag.store import count_chunks, document_metadata, iter_chunks, unapproved_chunk_counts
 from app.utils.logger import get_logger
+from app.utils.metrics import stage_timer
+from app.utils.singleflight import SingleFlight, normalize_query
+from app.utils.tracing import annotate
 
 logger = get_logger(__name__)
 
-CHUNKS_DIR = Path("data/chunks")
+# Concurrent identical searches share one embedding call and one search
+_inflight = SingleFlight("search")
+
+# Embedding batches of index builds; the build adds finished batches while these run
+_embed_pool = ThreadPoolExecutor(max_workers=INDEX_EMBED_IN_FLIGHT, thread_name_prefix="index-embed")
 
 def load_all_chunks(approved_only: bool = True, document_type: Optional[str] = None) -> List[Dict]:
     """
-    Load chunks from storage with optional filtering.
+    Load chunks from the chunk repository with optional filtering.
+    
+    Filters are applied by the repository's metadata indexes, so only
+    matching documents are read.
     
     Args:
         approved_only: Only load chunks from approved documents
@@ -20,88 +39,440 @@ def load_all_chunks(approved_only: bool = True, document_type: Optional[str] = N
     Returns:
         List of filtered chunks
     """
-    all_chunks = []
-    skipped_count = 0
-    
-    for chunk_file in CHUNKS_DIR.glob("*.json"):
-        with open(chunk_file, "r") as f:
-            chunks = json.load(f)
-            
-            for chunk in chunks:
-                metadata = chunk.get("metadata", {})
-                
-                # Governance: Skip non-approved documents
-                if approved_only and not metadata.get("approved", False):
-                    skipped_count += 1
-                    logger.warning(
-                        f"Skipping unapproved chunk from document: {metadata.get('document_id', 'unknown')}"
-                    )
-                    continue
-                
-                # Filter by document type if specified
-                if document_type and metadata.get("document_type") != document_type:
-                    continue
-                
-                all_chunks.append(chunk)
-    
-    if skipped_count > 0:
-        logger.info(f"Skipped {skipped_count} chunks from unapproved documents")
-    
-    logger.info(f"Loaded {len(all_chunks)} approved chunks")
+    with stage_timer("chunk_load"):
+        all_chunks = list(iter_chunks(approved_only=approved_only, document_type=document_type))
+        _report_skipped_chunks(approved_only)
+    
+    logger.info("Loaded %s approved chunks", len(all_chunks))
     return all_chunks
 
+def _report_skipped_chunks(approved_only: bool):
+    """Governance: unapproved documents are excluded by the query; report what was skipped."""
+    skipped_by_document = unapproved_chunk_counts() if approved_only else {}
+    
+    # One summary per document instead of a warning per skipped chunk
+    for document_id, count in skipped_by_document.items():
+        logger.warning("Skipping %s unapproved chunks from document: %s", count, document_id)
+    if skipped_by_document:
+        logger.info(
+            "Skipped %s chunks from %s unapproved documents",
+            sum(skipped_by_document.values()), len(skipped_by_document)
+        )
+
 def build_index(
     store_name: str = "default",
     approved_only: bool = True,
-    document_type: Optional[str] = None
-) -> VectorStore:
+    document_type: Optional[str] = None,
+    shard_by: Optional[str] = None,
+    num_shards: int = 4,
+    embedding_provider: Optional[str] = None,
+    resume: bool = True
+):
     """
     Build vector index from chunks with governance controls.
     
+    The store is written to a new snapshot directory and only becomes
+    visible to searches once the build has finished (see versions.py).
+    
+    Chunks are streamed from the repository in batches; up to
+    INDEX_EMBED_IN_FLIGHT batches are embedded at once while finished ones
+    are added to the index, so only the index and a few batches are held in
+    memory. Every batch is checkpointed, so a build that fails or is
+    interrupted re-embeds only what it had not finished.
+    
     Args:
         store_name: Name for the vector store
         approved_only: Only index approved documents
         document_type: Filter by document type
+        shard_by: Partition into shards by "document_type" or "document_id"
+        num_shards: Number of hash buckets when sharding by document_id
+        embedding_provider: Provider spec (defaults to EMBEDDING_PROVIDER); recorded with the store
+        resume: Reuse embeddings checkpointed by an earlier, unfinished build
         
     Returns:
-        VectorStore with indexed chunks
+        VectorStore (or ShardedVectorStore) with indexed chunks
     """
-    logger.info(f"Starting index build (approved_only={approved_only}, document_type={document_type})")
+    checkpoint = BuildCheckpoint(store_name)
+    # Another build of this store (another server worker, the bulk CLI) finishes first
+    with checkpoint.locked():
+        return _build_index(
+            checkpoint, store_name, approved_only, document_type, shard_by, num_shards, embedding_provider, resume
+        )
+
+def _build_index(
+    checkpoint: BuildCheckpoint,
+    store_name: str,
+    approved_only: bool,
+    document_type: Optional[str],
+    shard_by: Optional[str],
+    num_shards: int,
+    embedding_provider: Optional[str],
+    resume: bool
+):
+    logger.info("Starting index build (approved_only=%s, document_type=%s)", approved_only, document_type)
+    
+    # Governance filtering happens in the repository query
+    _report_skipped_chunks(approved_only)
+    total = count_chunks(approved_only=approved_only, document_type=document_type)
     
-    # Load chunks with governance filtering
-    chunks = load_all_chunks(approved_only=approved_only, document_type=document_type)
+    if not total:
+        logger.warning("No chunks found to index after filtering")
+        return VectorStore()
+    
+    provider = get_provider(embedding_provider).name
+    logger.info("Indexing %s chunks with provider '%s'...", total, provider)
+    if not resume:
+        checkpoint.clear()
+    build_params = {
+        "approved_only": approved_only,
+        "document_type": document_type,
+        "shard_by": shard_by,
+        "num_shards": num_shards,
+        "embedding_provider": provider,
+    }
+    chunks = iter_chunks(approved_only=approved_only, document_type=document_type)
     
-    if not chunks:
+    store = ShardedVectorStore(store_name, shard_by=shard_by, num_shards=num_shards, provider=provider) if shard_by else None
+    indexed = 0
+    for batch, vectors in _embed_batches(store_name, chunks, total, provider, checkpoint, build_params):
+        if store is None:
+            store = VectorStore(dim=vectors.shape[1], provider=provider)
+        store.add(vectors, batch)
+        indexed += len(batch)
+    
+    if store is None:
         logger.warning("No chunks found to index after filtering")
         return VectorStore()
     
-    logger.info(f"Processing {len(chunks)} chunks...")
+    with new_version(store_name) as (version, directory):
+        store.index_path = directory
+        store.version = version
+        if shard_by:
+            store.save(directory=directory)
+        else:
+            store.save(store_name, directory)
+    checkpoint.clear()
+    logger.info("Index '%s' saved as version %s with %s chunks", store_name, version, indexed)
+    
+    return store
+
+def _batched(chunks: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _embed_batch(chunks: List[Dict], keys: np.ndarray, done: Dict[int, np.ndarray], provider: str) -> Tuple[np.ndarray, List[int]]:
+    """float32 vectors of one batch, reusing checkpointed ones; also returns the rows embedded now."""
+    missing = [i for i, key in enumerate(keys.tolist()) if key not in done]
+    fresh = np.asarray(embed_texts([chunks[i]["text"] for i in missing], provider=provider), dtype=np.float32) if missing else None
+    if len(missing) == len(chunks):
+        return fresh, missing
+    rows = [done.get(key) for key in keys.tolist()]
+    for i, vector in zip(missing, fresh if fresh is not None else ()):
+        rows[i] = vector
+    return np.stack(rows), missing
+
+def _embed_batches(
+    store_name: str,
+    chunks: Iterable[Dict],
+    total: int,
+    provider: str,
+    checkpoint: BuildCheckpoint,
+    build_params: Dict
+) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+    """
+    Yield ``(chunks, vectors)`` batches in input order while the following
+    batches are read and embedded on the embedding pool. Each batch is
+    checkpointed before it is yielded.
+    """
+    done = checkpoint.begin(build_params)
+    if done:
+        logger.info("Build of '%s' resuming with %s checkpointed embeddings", store_name, len(done))
+    progress = track_progress(store_name, total)
+    pending = deque()
     
-    # Extract text
-    texts = [chunk["text"] for chunk in chunks]
+    def finish_oldest() -> Tuple[List[Dict], np.ndarray]:
+        batch, keys, future = pending.popleft()
+        vectors, embedded = future.result()
+        if embedded:
+            checkpoint.append(keys[embedded], vectors[embedded])
+        progress.advance(len(embedded), resumed=len(batch) - len(embedded))
+        return batch, vectors
     
-    # Generate embeddings
-    logger.info("Generating embeddings with Azure OpenAI...")
-    embeddings = embed_texts(texts)
-    logger.info(f"Generated {len(embeddings)} embeddings")
+    try:
+        for batch in _batched(chunks, INDEX_CHECKPOINT_CHUNKS):
+            keys = content_keys(batch)
+            # Copy the context so embedding spans attach to the build's trace
+            future = _embed_pool.submit(contextvars.copy_context().run, _embed_batch, batch, keys, done, provider)
+            pending.append((batch, keys, future))
+            if len(pending) >= INDEX_EMBED_IN_FLIGHT:
+                yield finish_oldest()
+        while pending:
+            yield finish_oldest()
+    finally:
+        # After a failure, batches not started yet are dropped
+        for _, _, future in pending:
+            future.cancel()
+
+def resume_interrupted_builds() -> List[str]:
+    """
+    Queue a build for every store with a leftover checkpoint; returns the job ids.
     
-    # Build index
-    logger.info("Building FAISS index...")
-    store = VectorStore(dim=len(embeddings[0]))
-    store.add(embeddings, chunks)
+    Every server worker calls this on startup; only the one that gets a
+    store's build lock resumes it.
+    """
+    job_ids = []
+    for store_name, _ in pending_checkpoints():
+        with BuildCheckpoint(store_name).locked(wait=False) as acquired:
+            if not acquired:
+                logger.info("Build of '%s' is already running elsewhere; not resuming it", store_name)
+                continue
+        job = submit_job("build", store_name, _resume_build, store_name=store_name)
+        job_ids.append(job.job_id)
+    return job_ids
+
+def _resume_build(store_name: str):
+    checkpoint = BuildCheckpoint(store_name)
+    with checkpoint.locked(wait=False) as acquired:
+        # Re-read the parameters under the lock: another worker may have taken or finished the build
+        params = checkpoint.params() if acquired else None
+        if params is None:
+            logger.info("Build of '%s' was resumed elsewhere", store_name)
+            return None
+        logger.info("Resuming interrupted build of '%s'", store_name)
+        return _build_index(
+            checkpoint,
+            store_name,
+            params.get("approved_only", True),
+            params.get("document_type"),
+            params.get("shard_by"),
+            params.get("num_shards", 4),
+            params.get("embedding_provider"),
+            resume=True,
+        )
+
+def rebuild_shard(
+    store_name: str,
+    document_metadata: Dict,
+    approved_only: bool = True
+) -> ShardedVectorStore:
+    """
+    Re-embed only the shard that a document belongs to.
     
-    # Save
-    store.save(store_name)
-    logger.info(f"Index '{store_name}' saved successfully with {len(chunks)} chunks")
+    Args:
+        store_name: Name of an existing sharded vector store
+        document_metadata: Metadata of the added or changed document
+        approved_only: Only index approved documents
+        
+    Returns:
+        ShardedVectorStore with the shard replaced
+    """
+    # Held from reading the current version until the new one is active, so a
+    # concurrent delete or replace (in any process) is not undone
+    with store_lock(store_name):
+        current = load_sharded_store(store_name)
+        if current is None:
+            raise ValueError(f"Sharded vector store '{store_name}' not found")
+        
+        shard_key = current.shard_key({"metadata": document_metadata})
+        logger.info("Rebuilding shard '%s' of store '%s'", shard_key, store_name)
+        
+        chunks = _shard_chunks(current, shard_key, approved_only)
+        # Embed with the store's own provider so shards never mix vector spaces
+        embeddings = embed_texts([chunk["text"] for chunk in chunks], provider=current.provider) if chunks else []
+        
+        # Build on a copy so in-flight searches keep using the old shard until the swap
+        store = ShardedVectorStore(
+            store_name,
+            shard_by=current.shard_by,
+            num_shards=current.num_shards,
+            provider=current.provider
+        )
+        store.shards = dict(current.shards)
+        store.replace_shard(shard_key, embeddings, chunks)
+        # The new snapshot hard-links the unchanged shards of the current one
+        with new_version(store_name, base=current.version) as (version, directory):
+            store.version = version
+            store.save(keys=[shard_key] if current.version is not None else None, directory=directory)
+        logger.info("Shard '%s' rebuilt with %s chunks (version %s)", shard_key, len(chunks), version)
     
     return store
 
+def _shard_chunks(store: ShardedVectorStore, shard_key: str, approved_only: bool) -> List[Dict]:
+    """Chunks of one shard; the repository query reads only that shard's documents."""
+    with stage_timer("chunk_load"):
+        _report_skipped_chunks(approved_only)
+        if store.shard_by == SHARD_BY_DOCUMENT_TYPE and shard_key != "unknown":
+            return list(iter_chunks(approved_only=approved_only, document_type=shard_key))
+        # Hash buckets (and the "unknown" type, which also holds untyped documents)
+        # are resolved from document metadata alone
+        document_ids = [
+            document_id for document_id, metadata in document_metadata(approved_only).items()
+            if store.shard_key({"metadata": metadata}) == shard_key
+        ]
+        return list(iter_chunks(approved_only=approved_only, document_ids=document_ids))
+
+def _editable_copy(current):
+    """Copy of a flat or sharded store that can be changed without affecting readers."""
+    if isinstance(current, ShardedVectorStore):
+        store = ShardedVectorStore(
+            current.name,
+            shard_by=current.shard_by,
+            num_shards=current.num_shards,
+            provider=current.provider
+        )
+        store.shards = {key: shard.copy() for key, shard in current.shards.items()}
+        return store
+    return current.copy()
+
+def _parts(store_name: str, store) -> Dict[str, VectorStore]:
+    """The VectorStores making up a store, keyed by the name they are saved under."""
+    if isinstance(store, ShardedVectorStore):
+        return {shard_store_name(store_name, key): shard for key, shard in store.shards.items()}
+    return {store_name: store}
+
+def _publish(store_name: str, current, store, changed: Dict[str, VectorStore]) -> int:
+    """
+    Write the changed parts of ``store`` as a new version of ``store_name``.
+    
+    Unchanged files are hard-linked from the current version; parts that only
+    gained tombstones rewrite just their tombstone list.
+    """
+    if current.version is None:
+        # Legacy unversioned store: nothing to link, so write everything
+        changed = _parts(store_name, store)
+    # Callers normally hold the lock since reading ``current``; this keeps a bare call safe too
+    with store_lock(store_name), new_version(store_name, base=current.version) as (version, directory):
+        for name, part in changed.items():
+            if part.shared and current.version is not None:
+                part.save_tombstones(name, directory)
+            else:
+                part.save(name, directory)
+        store.index_path = directory
+        store.version = version
+        if isinstance(store, ShardedVectorStore):
+            store.save(keys=[], directory=directory)
+    return version
+
+@contextmanager
+def _open_for_update(store_name: str):
+    """
+    Yield the current store and an editable copy, holding the store's lock
+    until the change is published so concurrent updates (in any process)
+    never publish from the same base and drop each other's changes.
+    """
+    with store_lock(store_name):
+        current = open_store(store_name)
+        if current is None:
+            raise ValueError(f"Vector store '{store_name}' not found")
+        yield current, _editable_copy(current)
+
+def remove_document_from_index(store_name: str, document_chunks: List[Dict]):
+    """
+    Tombstone a document's vectors so searches stop returning it.
+    
+    Nothing is re-embedded and the FAISS index is not rewritten; a background
+    compaction is scheduled once INDEX_COMPACTION_THRESHOLD of a store's
+    vectors are tombstoned.
+    
+    Args:
+        store_name: Name of the vector store
+        document_chunks: Stored chunks of the document being removed
+        
+    Returns:
+        VectorStore (or ShardedVectorStore) without the document
+    """
+    with _open_for_update(store_name) as (current, store):
+        ids = chunk_vector_ids(document_chunks)
+        
+        changed = {name: part for name, part in _parts(store_name, store).items() if part.tombstone(ids)}
+        if not changed:
+            logger.info("Store '%s' has no vectors for the removed document", store_name)
+            return current
+        version = _publish(store_name, current, store, changed)
+        logger.info("Tombstoned %s chunks in store '%s' (version %s)", len(ids), store_name, version)
+        
+        if any(part.tombstone_ratio > INDEX_COMPACTION_THRESHOLD for part in changed.values()):
+            logger.info("Tombstones in store '%s' passed %s, scheduling compaction", store_name, INDEX_COMPACTION_THRESHOLD)
+            submit_job("compact", store_name, compact_index, store_name=store_name)
+        return store
+
+def replace_document_in_index(store_name: str, old_chunks: List[Dict], new_chunks: List[Dict]):
+    """
+    Swap a document's vectors for those of its new version.
+    
+    Only ``new_chunks`` are embedded; the old vectors (and any tombstones in
+    the affected parts) are removed from the index.
+    
+    Args:
+        store_name: Name of the vector store
+        old_chunks: Chunks of the version being replaced
+        new_chunks: Chunks of the new version
+        
+    Returns:
+        VectorStore (or ShardedVectorStore) with the new version indexed
+    """
+    with _open_for_update(store_name) as (current, store):
+        old_ids = chunk_vector_ids(old_chunks)
+        
+        changed = {}
+        for name, part in _parts(store_name, store).items():
+            if len(part.contains(old_ids)):
+                part.remove(old_ids)
+                changed[name] = part
+        
+        if new_chunks:
+            # Embed with the store's own provider so vectors stay comparable
+            embeddings = embed_texts([chunk["text"] for chunk in new_chunks], provider=current.provider)
+            store.add(embeddings, new_chunks)
+            if isinstance(store, ShardedVectorStore):
+                for key in {store.shard_key(chunk) for chunk in new_chunks}:
+                    changed[shard_store_name(store_name, key)] = store.shards[key]
+            else:
+                changed[store_name] = store
+        
+        if not changed:
+            return current
+        version = _publish(store_name, current, store, changed)
+        logger.info(
+            "Replaced %s chunks with %s in store '%s' (version %s)",
+            len(old_chunks), len(new_chunks), store_name, version
+        )
+        return store
+
+def compact_index(store_name: str = "default"):
+    """
+    Physically drop tombstoned vectors from a store into a new version.
+    
+    Args:
+        store_name: Name of the vector store
+        
+    Returns:
+        Compacted VectorStore (or ShardedVectorStore)
+    """
+    with _open_for_update(store_name) as (current, store):
+        changed = {}
+        for name, part in _parts(store_name, store).items():
+            if len(part.tombstones):
+                removed = part.compact()
+                logger.info("Compacted '%s': removed %s tombstoned vectors", name, removed)
+                changed[name] = part
+        if not changed:
+            return current
+        _publish(store_name, current, store, changed)
+        return store
+
 def search_index(
     query: str,
     k: int = 5,
     store_name: str = "default",
     document_type: Optional[str] = None
-) -> List[Dict]:
+) -> Tuple[List[Dict], Optional[int]]:
     """
     Search the vector index with optional filtering.
     
@@ -112,27 +483,38 @@ def search_index(
         document_type: Filter results by document type
         
     Returns:
-        List of matching chunks
+        Matching chunks and the version of the store that produced them
     """
-    logger.info(f"Searching for: '{query}' (top_k={k}, document_type={document_type})")
+    logger.debug("Searching for: '%s' (top_k=%s, document_type=%s)", query, k, document_type)
     
-    store = VectorStore()
-    if not store.load(store_name):
-        logger.error(f"Vector store '{store_name}' not found")
+    store = open_store(store_name)
+    if store is None:
+        logger.error("Vector store '%s' not found", store_name)
         raise ValueError(f"Vector store '{store_name}' not found")
+    annotate(index_version=store.version)
+    
+    if COALESCE_SEARCHES:
+        key = (store_name, store.version, normalize_query(query), document_type, k)
+        results = list(_inflight.do(key, _search, store, query, k, document_type))
+    else:
+        results = _search(store, query, k, document_type)
     
-    query_embedding = embed_texts([query])[0]
+    logger.debug("Found %s relevant chunks", len(results))
+    return results, store.version
+
+def _search(store, query: str, k: int, document_type: Optional[str]) -> List[Dict]:
+    query_embedding = embed_query(query, provider=store.provider)
     
     # Get more results than needed if filtering by type
     search_k = k * 3 if document_type else k
-    results = store.search(query_embedding, search_k)
+    with stage_timer("search"):
+        results = search_store(store, query_embedding, search_k, document_type)
     
     # Filter by document type if specified
     if document_type:
-        results = filter_by_document_type(results, document_type)
+        with stage_timer("filter"):
+            results = filter_by_document_type(results, document_type)
         results = results[:k]  # Trim to requested size
-    
-    logger.info(f"Found {len(results)} relevant chunks")
     return results
 
 def filter_by_document_type(chunks: List[Dict], document_type: str) -> List[Dict]:
@@ -150,5 +532,5 @@ def filter_by_document_type(chunks: List[Dict], document_type: str) -> List[Dict
         chunk for chunk in chunks 
         if chunk.get("metadata", {}).get("document_type") == document_type
     ]
-    logger.info(f"Filtered {len(chunks)} chunks to {len(filtered)} of type '{document_type}'")
+    logger.debug("Filtered %s chunks to %s of type '%s'", len(chunks), len(filtered), document_type)
     return filtered
\ No newline at end of file
@@ -0,0 +1,170 @@
+import contextvars
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Builds run one at a time, off the request path
+_build_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-build")
+
+# Finished jobs beyond this many are forgotten
+MAX_TRACKED_JOBS = 50
+
+# Seconds between progress log lines of a long-running build
+PROGRESS_LOG_INTERVAL_S = 10
+
+_current_job: contextvars.ContextVar[Optional["IndexJob"]] = contextvars.ContextVar("current_index_job", default=None)
+
+
+class BuildProgress:
+    """Chunks embedded so far by a build, with throughput and ETA.
+
+    ``resumed`` chunks came from a checkpoint and are left out of the rate.
+    """
+
+    def __init__(self, store_name: str, total: int):
+        self.store_name = store_name
+        self.total = total
+        self.resumed = 0
+        self.done = 0
+        self._started = time.monotonic()
+        self._logged = self._started
+        self._lock = threading.Lock()
+
+    def advance(self, count: int, resumed: int = 0):
+        """Record ``count`` newly embedded and ``resumed`` checkpointed chunks."""
+        with self._lock:
+            self.resumed += resumed
+            self.done += count + resumed
+            now = time.monotonic()
+            if now - self._logged < PROGRESS_LOG_INTERVAL_S and self.done < self.total:
+                return
+            self._logged = now
+        progress = self.to_dict()
+        logger.info(
+            "Build of '%s': %s/%s chunks embedded (%.1f%%, %.1f chunks/s, ETA %ss)",
+            self.store_name, progress["chunks_embedded"], progress["chunks_total"], progress["percent"],
+            progress["rate_per_s"], progress["eta_s"]
+        )
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            done, resumed, total = self.done, self.resumed, self.total
+        elapsed = time.monotonic() - self._started
+        rate = (done - resumed) / elapsed if elapsed > 0 else 0.0
+        return {
+            "chunks_total": total,
+            "chunks_embedded": done,
+            "chunks_resumed": resumed,
+            "percent": round(100 * done / total, 1) if total else 100.0,
+            "rate_per_s": round(rate, 2),
+            "eta_s": round((total - done) / rate, 1) if rate > 0 else None,
+            "elapsed_s": round(elapsed, 1),
+        }
+
+
+def track_progress(store_name: str, total: int) -> BuildProgress:
+    """Start reporting a build's progress, on the running job if there is one."""
+    progress = BuildProgress(store_name, total)
+    job = _current_job.get()
+    if job is not None:
+        job.progress = progress
+    return progress
+
+
+class IndexJob:
+    """A background index build and its outcome."""
+
+    def __init__(self, kind: str, store_name: str, params: Dict):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.store_name = store_name
+        self.params = params
+        self.status = "queued"
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.stats: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self.progress: Optional[BuildProgress] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "store_name": self.store_name,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "version": (self.stats or {}).get("version"),
+            "progress": self.progress.to_dict() if self.progress else None,
+            "stats": self.stats,
+            "error": self.error,
+        }
+
+
+_jobs: "OrderedDict[str, IndexJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def _run(job: IndexJob, fn: Callable, args, kwargs):
+    job.status = "running"
+    job.started_at = datetime.utcnow()
+    logger.info("Index job %s (%s of '%s') started", job.job_id, job.kind, job.store_name)
+    _current_job.set(job)
+    try:
+        store = fn(*args, **kwargs)
+        if store is None:
+            # Nothing to do, e.g. another process already resumed the build
+            job.status = "skipped"
+            return None
+        job.stats = store.get_stats()
+        job.status = "succeeded"
+        return store
+    except Exception as e:
+        job.error = str(e)
+        job.status = "failed"
+        logger.error("Index job %s failed: %s", job.job_id, e)
+        raise
+    finally:
+        job.finished_at = datetime.utcnow()
+
+
+def submit_job(kind: str, store_name: str, fn: Callable, /, *args, **kwargs) -> IndexJob:
+    """
+    Queue ``fn(*args, **kwargs)`` (which returns a store) as a background build.
+
+    Searches keep being served from the active snapshot until the build
+    switches the store to its new version.
+    """
+    # Chunk lists and metadata dicts are left out of the reported parameters
+    params = {k: v for k, v in kwargs.items() if k != "store_name" and isinstance(v, (str, int, float, bool, type(None)))}
+    job = IndexJob(kind, store_name, params)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+        while len(_jobs) > MAX_TRACKED_JOBS:
+            oldest = next(iter(_jobs.values()))
+            if oldest.status in ("queued", "running"):
+                break
+            _jobs.popitem(last=False)
+    job.future = _build_pool.submit(contextvars.copy_context().run, _run, job, fn, args, kwargs)
+    return job
+
+
+def get_job(job_id: str) -> Optional[IndexJob]:
+    return _jobs.get(job_id)
+
+
+def list_jobs() -> List[IndexJob]:
+    with _jobs_lock:
+        return list(reversed(_jobs.values()))
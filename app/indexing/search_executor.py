@@ -0,0 +1,99 @@
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.metrics import SEARCH_BATCH_SIZE
+from app.utils.tracing import annotate
+
+SearchFn = Callable[[np.ndarray, int], Tuple[np.ndarray, np.ndarray]]
+
+
+class _Query:
+    __slots__ = ("vector", "k", "arrived", "result", "error", "done")
+
+    def __init__(self, vector: np.ndarray, k: int):
+        self.vector = vector
+        self.k = k
+        self.arrived = time.monotonic()
+        self.result: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+
+
+class SearchExecutor:
+    """
+    Runs concurrent single-vector searches against one index as n x d batches.
+
+    At most one batch is in flight per executor. Queries that arrive while
+    it runs are queued and searched together in the next batch, so an idle
+    store answers immediately and a busy one batches on its own. ``max_wait_s``
+    additionally holds a batch open for late arrivals. Each batch searches
+    with the largest ``k`` asked for and trims the rows per caller.
+
+    The calling threads take turns running batches; no extra thread is used.
+    """
+
+    def __init__(self, search: SearchFn, max_batch: int, max_wait_s: float = 0.0):
+        self._search = search
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self._cond = threading.Condition()
+        self._queue: List[_Query] = []
+        self._running = False
+
+    def search(self, vector: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Distances and labels (1-D, length ``k``) for one query vector."""
+        query = _Query(vector, k)
+        with self._cond:
+            self._queue.append(query)
+            if len(self._queue) >= self.max_batch:
+                self._cond.notify_all()
+            while not query.done:
+                batch = self._take_batch()
+                if batch is None:
+                    self._cond.wait(self._wait_timeout())
+                    continue
+                self._cond.release()
+                try:
+                    self._run(batch)
+                finally:
+                    self._cond.acquire()
+                    self._running = False
+                    self._cond.notify_all()
+
+        if query.error is not None:
+            raise query.error
+        return query.result
+
+    def _wait_timeout(self) -> Optional[float]:
+        if self._running or not self._queue or not self.max_wait_s:
+            return None
+        return max(self._queue[0].arrived + self.max_wait_s - time.monotonic(), 0.0)
+
+    def _take_batch(self) -> Optional[List[_Query]]:
+        # Called with the lock held
+        if self._running or not self._queue:
+            return None
+        full = len(self._queue) >= self.max_batch
+        if not full and self.max_wait_s and time.monotonic() - self._queue[0].arrived < self.max_wait_s:
+            return None
+        batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+        self._running = True
+        return batch
+
+    def _run(self, batch: List[_Query]):
+        SEARCH_BATCH_SIZE.observe(len(batch))
+        annotate(search_batch=len(batch))
+        try:
+            k = max(query.k for query in batch)
+            distances, labels = self._search(np.vstack([query.vector for query in batch]), k)
+        except BaseException as e:
+            for query in batch:
+                query.error = e
+                query.done = True
+            return
+        for row, query in enumerate(batch):
+            query.result = (distances[row, :query.k], labels[row, :query.k])
+            query.done = True
@@ -0,0 +1,230 @@
+import contextvars
+import hashlib
+import heapq
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.indexing.vector_store import VectorStore, load_store
+from app.indexing.versions import INDEX_ROOT, new_version, resolve
+from app.utils.metrics import CACHE_REQUESTS
+
+SHARD_BY_DOCUMENT_TYPE = "document_type"
+SHARD_BY_DOCUMENT_ID = "document_id"
+
+# FAISS releases the GIL while searching, so threads give real parallelism
+_search_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="shard-search")
+
+
+def shard_key_for(metadata: Dict, shard_by: str, num_shards: int = 1) -> str:
+    """Return the shard a chunk belongs to given its metadata."""
+    if shard_by == SHARD_BY_DOCUMENT_TYPE:
+        return metadata.get("document_type") or "unknown"
+    if shard_by == SHARD_BY_DOCUMENT_ID:
+        document_id = metadata.get("document_id") or ""
+        bucket = int(hashlib.md5(document_id.encode("utf-8")).hexdigest(), 16) % num_shards
+        return str(bucket)
+    raise ValueError(f"Unsupported shard_by: {shard_by}")
+
+
+def shard_store_name(store_name: str, shard_key: str) -> str:
+    """File-safe name of the VectorStore holding one shard."""
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "-", shard_key).strip("-")[:40] or "shard"
+    digest = hashlib.md5(shard_key.encode("utf-8")).hexdigest()[:8]
+    return f"{store_name}__{slug}_{digest}"
+
+
+class ShardedVectorStore:
+    """Vector store split into independent per-partition FAISS shards.
+
+    Each shard is a regular VectorStore saved under its own name, so a single
+    shard can be rebuilt without touching the others. Searches fan out to all
+    shards on a thread pool and the per-shard top-k results are merged.
+    """
+
+    def __init__(
+        self,
+        name: str = "default",
+        shard_by: str = SHARD_BY_DOCUMENT_TYPE,
+        num_shards: int = 1,
+        provider: Optional[str] = None,
+    ):
+        self.name = name
+        self.shard_by = shard_by
+        self.num_shards = num_shards
+        self.provider = provider
+        self.shards: Dict[str, VectorStore] = {}
+        self.version: Optional[int] = None
+        self.index_path = INDEX_ROOT
+        self.index_path.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def manifest_file(self) -> Path:
+        return self.index_path / f"{self.name}_shards.json"
+
+    def shard_key(self, chunk: Dict) -> str:
+        return shard_key_for(chunk.get("metadata", {}), self.shard_by, self.num_shards)
+
+    def add(self, embeddings: List[List[float]], chunks: List[Dict]):
+        """Partition embeddings and chunks into their shards."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        grouped: Dict[str, List[int]] = {}
+        for row, chunk in enumerate(chunks):
+            grouped.setdefault(self.shard_key(chunk), []).append(row)
+
+        for key, rows in grouped.items():
+            shard = self.shards.get(key)
+            if shard is None:
+                shard = VectorStore(dim=embeddings.shape[1], provider=self.provider)
+                self.shards[key] = shard
+            shard.add(embeddings[rows], [chunks[row] for row in rows])
+
+    def replace_shard(self, key: str, embeddings: List[List[float]], chunks: List[Dict]):
+        """Swap in a freshly built shard; an empty shard is dropped."""
+        if not chunks:
+            self.shards.pop(key, None)
+            return
+        shard = VectorStore(dim=len(embeddings[0]), provider=self.provider)
+        shard.add(embeddings, chunks)
+        self.shards[key] = shard
+
+    def search(self, query_embedding: List[float], k: int = 5, shard_keys: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Search shards in parallel and merge their top-k results."""
+        keys = list(self.shards) if shard_keys is None else [key for key in shard_keys if key in self.shards]
+        if not keys:
+            return []
+        if len(keys) == 1:
+            return self.shards[keys[0]].search(query_embedding, k)
+
+        # Copy the context so per-shard spans attach to the caller's trace
+        futures = [
+            _search_pool.submit(contextvars.copy_context().run, self.shards[key].search, query_embedding, k)
+            for key in keys
+        ]
+        candidates = [result for future in futures for result in future.result()]
+        return heapq.nsmallest(k, candidates, key=lambda r: r["similarity_score"])
+
+    def shards_for(self, document_type: Optional[str]) -> Optional[List[str]]:
+        """Shards that can hold a document type, or None when all must be searched."""
+        if document_type and self.shard_by == SHARD_BY_DOCUMENT_TYPE:
+            return [document_type]
+        return None
+
+    def save(self, keys: Optional[Iterable[str]] = None, directory: Optional[Path] = None):
+        """Save shards (all, or only ``keys``) and then the manifest into ``directory``.
+
+        Without ``directory`` every shard is saved as a new version of the
+        store (see VectorStore.save).
+        """
+        if directory is None:
+            with new_version(self.name) as (version, directory):
+                self.index_path = directory
+                self.version = version
+                self._write(None)
+            return
+        self.index_path = directory
+        self._write(keys)
+
+    def _write(self, keys: Optional[Iterable[str]]):
+        for key in (self.shards if keys is None else keys):
+            if key in self.shards:
+                self.shards[key].save(shard_store_name(self.name, key), directory=self.index_path)
+
+        manifest = {
+            "shard_by": self.shard_by,
+            "num_shards": self.num_shards,
+            "embedding_provider": self.provider,
+            "shards": {key: shard_store_name(self.name, key) for key in sorted(self.shards)},
+        }
+        tmp_file = self.manifest_file.with_suffix(".json.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def load(self, name: Optional[str] = None) -> bool:
+        """Load the manifest and each shard through the shared store cache."""
+        if name:
+            self.name = name
+        if not self.manifest_file.exists():
+            return False
+
+        with open(self.manifest_file, "r") as f:
+            manifest = json.load(f)
+        self.shard_by = manifest["shard_by"]
+        self.num_shards = manifest.get("num_shards", 1)
+        self.provider = manifest.get("embedding_provider")
+        self.shards = {}
+        for key, store_name in manifest["shards"].items():
+            shard = load_store(store_name, directory=self.index_path, version=self.version)
+            if shard is None:
+                continue
+            if shard.provider != self.provider:
+                raise ValueError(
+                    f"Shard '{key}' of store '{self.name}' was built with provider "
+                    f"'{shard.provider}', expected '{self.provider}'"
+                )
+            self.shards[key] = shard
+        return True
+
+    @property
+    def dim(self) -> int:
+        return next(iter(self.shards.values())).dim if self.shards else 0
+
+    def get_stats(self) -> Dict:
+        """Get statistics."""
+        shard_stats = {key: shard.get_stats() for key, shard in self.shards.items()}
+        return {
+            "total_vectors": sum(s["total_vectors"] for s in shard_stats.values()),
+            "dimension": self.dim,
+            "embedding_provider": self.provider,
+            "total_chunks": sum(s["total_chunks"] for s in shard_stats.values()),
+            "shard_by": self.shard_by,
+            "version": self.version,
+            "shards": shard_stats,
+        }
+
+
+_loaded_sharded: Dict[str, tuple] = {}
+
+def load_sharded_store(name: str = "default") -> Optional[ShardedVectorStore]:
+    """Return a cached sharded store, reloading when its active snapshot or manifest changes."""
+    version, directory = resolve(name)
+    manifest_file = directory / f"{name}_shards.json"
+    try:
+        mtime = manifest_file.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _loaded_sharded.get(name)
+    if cached and cached[0] == (directory, mtime):
+        CACHE_REQUESTS.inc(cache="sharded_store", result="hit")
+        return cached[1]
+
+    CACHE_REQUESTS.inc(cache="sharded_store", result="miss")
+    store = ShardedVectorStore(name)
+    store.index_path = directory
+    store.version = version
+    if not store.load():
+        return None
+    _loaded_sharded[name] = ((directory, mtime), store)
+    return store
+
+
+def open_store(name: str = "default"):
+    """Load a store by name, preferring a sharded layout when one exists."""
+    sharded = load_sharded_store(name)
+    if sharded is not None:
+        return sharded
+    return load_store(name)
+
+
+def search_store(store, query_embedding: List[float], k: int, document_type: Optional[str] = None) -> List[Dict]:
+    """Search a flat or sharded store, skipping shards that cannot match ``document_type``."""
+    if isinstance(store, ShardedVectorStore):
+        return store.search(query_embedding, k, shard_keys=store.shards_for(document_type))
+    return store.search(query_embedding, k)
@@ -1,26 +1,212 @@
-import faiss 
 import numpy as np
+import hashlib
 import json
+import mmap
+import os
+import threading
 from pathlib import Path
-from typing import List,Dict
+from typing import List,Dict,Optional,Sequence
+
+from app.config import FAISS_BLAS_DIM, FAISS_BLAS_MIN_BATCH, SEARCH_BATCH_MAX, SEARCH_BATCH_WAIT_MS, VECTOR_INDEX_MMAP
+from app.indexing.search_executor import SearchExecutor
+from app.indexing.versions import INDEX_ROOT, new_version, resolve
+from app.utils.metrics import CACHE_REQUESTS, stage_timer
+from app.utils.tracing import annotate, traced
+
+
+class MappedChunks(Sequence):
+    """Read-only chunk list backed by a memory-mapped JSONL payload.
+
+    Chunks are decoded on access, so every worker process maps the same
+    physical pages instead of holding its own parsed copy.
+    """
+
+    def __init__(self,payload_file:Path,offsets_file:Path):
+        self._file=open(payload_file,"rb")
+        size=os.fstat(self._file.fileno()).st_size
+        self._map=mmap.mmap(self._file.fileno(),0,access=mmap.ACCESS_READ) if size else b""
+        self._offsets=np.load(offsets_file,mmap_mode="r")
+
+    def __len__(self):
+        return max(len(self._offsets)-1,0)
+
+    def __getitem__(self,idx):
+        if isinstance(idx,slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx<0:
+            idx+=len(self)
+        if not 0<=idx<len(self):
+            raise IndexError(idx)
+        start,end=int(self._offsets[idx]),int(self._offsets[idx+1])
+        return json.loads(self._map[start:end])
+
+
+_executor_lock=threading.Lock()
+_blas_threshold_set=False
+
+
+def _set_blas_threshold():
+    """Set FAISS's process-wide BLAS threshold once; callers hold ``_executor_lock``."""
+    global _blas_threshold_set
+    if _blas_threshold_set:
+        return
+    import faiss
+    # FAISS scans queries one by one until nq*d reaches this threshold; batches only
+    # beat per-query scans on the BLAS path. Sized for the largest served dimension,
+    # so stores of any dimension see the same setting whichever searches first
+    faiss.cvar.distance_compute_blas_threshold=FAISS_BLAS_MIN_BATCH*FAISS_BLAS_DIM
+    _blas_threshold_set=True
+
+
+def chunk_vector_id(chunk_id:str) -> int:
+    """Stable, non-negative 63-bit FAISS id for a chunk."""
+    digest=hashlib.blake2b(chunk_id.encode("utf-8"),digest_size=8).digest()
+    return int.from_bytes(digest,"little") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def chunk_vector_ids(chunks:Sequence[Dict]) -> np.ndarray:
+    return np.fromiter((chunk_vector_id(chunk["chunk_id"]) for chunk in chunks),dtype=np.int64,count=len(chunks))
+
 
 class VectorStore:
-    """FAISS-based vector store for semantic search."""
+    """FAISS-based vector store for semantic search.
+
+    Vectors are stored under stable per-chunk ids (``chunk_vector_id``) in
+    FAISS row order, so row ``i`` of the index is ``chunks[i]``. Deleted ids
+    are first recorded as tombstones and excluded at search time; ``compact``
+    (or any ``remove``) drops them from the index and payload for good.
+    Stores saved before ids were introduced use the row number as the id
+    and are converted on their first mutation.
+    """
+
+    def __init__(self,dim:int=1536,provider:Optional[str]=None):
+        """Initialize vector store (1536 for Azure ada-002).
 
-    def __init__(self,dim:int=1536):
-        """Initialize vector store (1536 for Azure ada-002)."""
+        ``provider`` names the embedding provider that produced the vectors;
+        queries must be embedded with the same one.
+        """
+        import faiss  # deferred so importing the app does not load FAISS
         self.dim=dim
-        self.index= faiss.IndexFlatL2(dim)
+        self.provider=provider
+        self.index= faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
         self.chunks=[]
-        self.index_path=Path("data/vector_index")
+        self.tombstones=np.empty(0,dtype=np.int64)
+        self.mapped=False
+        # Set on copies that share index and chunks with a cached store
+        self.shared=False
+        self._id_lookup=None
+        self._search_params=None
+        self._search_executor=None
+        # Snapshot version this store was loaded from or saved as (None if unversioned)
+        self.version=None
+        self.index_path=INDEX_ROOT
         self.index_path.mkdir(parents=True, exist_ok=True)
-    
+
+    @property
+    def id_mapped(self) -> bool:
+        return hasattr(self.index,"id_map")
+
     def add(self,embeddings:List[List[float]],chunks:List[Dict]):
         """Add embeddings and chunks to the index."""
-        embeddings_array=np.array(embeddings).astype("float32")
-        self.index.add(embeddings_array)
+        self._ensure_writable()
+        # No copy when the embeddings already are a float32 array
+        embeddings_array=np.asarray(embeddings,dtype=np.float32)
+        self.index.add_with_ids(embeddings_array,chunk_vector_ids(chunks))
         self.chunks.extend(chunks)
-    
+        self._id_lookup=None
+
+    def copy(self) -> "VectorStore":
+        """Cheap copy sharing index and chunks; they are duplicated on the first mutation."""
+        clone=VectorStore.__new__(VectorStore)
+        clone.__dict__.update(self.__dict__)
+        clone.shared=True
+        clone._search_executor=None
+        return clone
+
+    def contains(self,ids:Sequence[int]) -> np.ndarray:
+        """Ids among ``ids`` that have a vector in this store (tombstoned or not)."""
+        if not self.id_mapped:
+            self._ensure_writable()
+        ids=np.asarray(ids,dtype=np.int64)
+        rows=self._rows_for(ids)
+        return ids[rows>=0]
+
+    def tombstone(self,ids:Sequence[int]) -> int:
+        """Hide ``ids`` from searches without touching the index. Returns how many were new."""
+        present=np.setdiff1d(self.contains(ids),self.tombstones)
+        if len(present):
+            self.tombstones=np.union1d(self.tombstones,present)
+            self._search_params=None
+        return len(present)
+
+    def remove(self,ids:Sequence[int]=()) -> int:
+        """Drop ``ids`` and all tombstoned ids from the index and the chunk payload."""
+        doomed=np.union1d(np.asarray(ids,dtype=np.int64),self.tombstones)
+        self._ensure_writable()
+        if len(doomed):
+            import faiss
+            row_ids=faiss.vector_to_array(self.index.id_map)
+            keep=~np.isin(row_ids,doomed)
+            removed=int(self.index.remove_ids(doomed))
+            # IndexFlat keeps the surviving rows in order, so the payload stays aligned
+            self.chunks=[chunk for chunk,kept in zip(self.chunks,keep) if kept]
+        else:
+            removed=0
+        self.tombstones=np.empty(0,dtype=np.int64)
+        self._id_lookup=None
+        self._search_params=None
+        return removed
+
+    def compact(self) -> int:
+        """Physically remove tombstoned vectors."""
+        return self.remove()
+
+    @property
+    def tombstone_ratio(self) -> float:
+        return len(self.tombstones)/max(self.index.ntotal,1)
+
+    def _rows_for(self,labels:np.ndarray) -> np.ndarray:
+        """Map FAISS ids to chunk rows (-1 where unknown)."""
+        labels=np.asarray(labels,dtype=np.int64)
+        if not self.id_mapped:
+            return np.where((labels>=0)&(labels<len(self.chunks)),labels,-1)
+        if self._id_lookup is None:
+            import faiss
+            row_ids=faiss.vector_to_array(self.index.id_map)
+            order=np.argsort(row_ids,kind="stable")
+            self._id_lookup=(row_ids[order],order)
+        sorted_ids,order=self._id_lookup
+        if not len(sorted_ids):
+            return np.full(len(labels),-1,dtype=np.int64)
+        pos=np.clip(np.searchsorted(sorted_ids,labels),0,len(sorted_ids)-1)
+        return np.where(sorted_ids[pos]==labels,order[pos],-1)
+
+    def _search_kwargs(self) -> Dict:
+        if not len(self.tombstones):
+            return {}
+        if self._search_params is None:
+            import faiss
+            # Keep the selectors referenced; SearchParameters does not own them
+            batch=faiss.IDSelectorBatch(self.tombstones)
+            selector=faiss.IDSelectorNot(batch)
+            self._search_params=(faiss.SearchParameters(sel=selector),selector,batch)
+        return {"params":self._search_params[0]}
+
+    def _search_batch(self,queries:np.ndarray,k:int):
+        return self.index.search(queries,k,**self._search_kwargs())
+
+    def _executor(self) -> Optional[SearchExecutor]:
+        """Batches concurrent searches of this store (see search_executor.py)."""
+        if SEARCH_BATCH_MAX<=1:
+            return None
+        if self._search_executor is None:
+            with _executor_lock:
+                if self._search_executor is None:
+                    _set_blas_threshold()
+                    self._search_executor=SearchExecutor(self._search_batch,SEARCH_BATCH_MAX,SEARCH_BATCH_WAIT_MS/1000)
+        return self._search_executor
+
+    @traced("vector_store.search")
     def search(self, query_embedding: List[float], k: int = 5) -> List[Dict]:
         """Search for similar chunks."""
         # Make sure query_embedding is a 1D array, not nested
@@ -28,44 +214,205 @@ class VectorStore:
             if isinstance(query_embedding[0], list):
             # If it's nested, flatten it
                 query_embedding = query_embedding[0]
-    
+
         query_array = np.array([query_embedding]).astype("float32")
-        distances, indices = self.index.search(query_array, k)
-    
+        if query_array.shape[1] != self.index.d:
+            raise ValueError(
+                f"Query embedding has dimension {query_array.shape[1]} but the index has {self.index.d} "
+                f"(store built with provider '{self.provider}')"
+            )
+        executor = self._executor()
+        if executor is None:
+            distances, labels = self._search_batch(query_array, k)
+            distances, labels = distances[0], labels[0]
+        else:
+            distances, labels = executor.search(query_array[0], k)
+
         results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx < len(self.chunks):
-                result = self.chunks[idx].copy()
+        for row, distance in zip(self._rows_for(labels), distances):
+            if row >= 0:
+                result = self.chunks[row].copy()
                 result["similarity_score"] = float(distance)
                 results.append(result)
-            
+
+        annotate(k=k, ntotal=self.index.ntotal, tombstones=len(self.tombstones), results=len(results))
         return results
-    
-    def save(self,name:str="defaul"):
-        """Save index to disk."""
-        faiss.write_index(self.index,str(self.index_path / f"{name}.index"))
-        with open(self.index_path / f"{name}_chunks.json","w") as f:
-            json.dump(self.chunks,f,indent=2)
-    
-    def load(self,name:str="default"):
-        """Load index from disk."""
+
+    def save(self,name:str="default",directory:Optional[Path]=None):
+        """Save index to disk.
+
+        Chunks are written as a JSONL payload plus an offsets array so that
+        ``load`` can memory-map them instead of parsing the whole file.
+        ``directory`` must be a snapshot no reader uses yet; without one the
+        store is saved as a new version of ``name``, so readers switch from
+        the old files to the new ones in one step.
+        """
+        if directory is None:
+            with new_version(name) as (version,directory):
+                self._write(name,directory)
+            self.index_path=directory
+            self.version=version
+            return
+        self._write(name,directory)
+
+    def _write(self,name:str,directory:Path):
+        import faiss
+        index_file=directory / f"{name}.index"
+        payload_file=directory / f"{name}_chunks.jsonl"
+        offsets_file=directory / f"{name}_chunks.offsets.npy"
+
+        tmp_index=index_file.with_suffix(".index.tmp")
+        faiss.write_index(self.index,str(tmp_index))
+
+        offsets=[0]
+        tmp_payload=payload_file.with_suffix(".jsonl.tmp")
+        with open(tmp_payload,"wb") as f:
+            for chunk in self.chunks:
+                line=json.dumps(chunk).encode("utf-8")+b"\n"
+                f.write(line)
+                offsets.append(offsets[-1]+len(line))
+        tmp_offsets=directory / f"{name}_chunks.offsets.tmp.npy"
+        np.save(tmp_offsets,np.asarray(offsets,dtype=np.int64))
+
+        os.replace(tmp_index,index_file)
+        os.replace(tmp_payload,payload_file)
+        os.replace(tmp_offsets,offsets_file)
+        self.save_tombstones(name,directory)
+
+    def save_tombstones(self,name:str="default",directory:Optional[Path]=None):
+        """Write only the tombstone list and metadata; index and payload are left as they are."""
+        directory=directory or self.index_path
+        tombstones_file=directory / f"{name}_tombstones.npy"
+        if len(self.tombstones):
+            tmp_tombstones=directory / f"{name}_tombstones.tmp.npy"
+            np.save(tmp_tombstones,self.tombstones)
+            os.replace(tmp_tombstones,tombstones_file)
+        else:
+            tombstones_file.unlink(missing_ok=True)
+
+        meta_file=directory / f"{name}_meta.json"
+        tmp_meta=meta_file.with_suffix(".json.tmp")
+        with open(tmp_meta,"w") as f:
+            json.dump({
+                "embedding_provider":self.provider,
+                "dimension":self.dim,
+                "total_vectors":self.index.ntotal,
+                "tombstones":len(self.tombstones)
+            },f,indent=2)
+        os.replace(tmp_meta,meta_file)
+
+    def load(self,name:str="default",mmap_mode:Optional[bool]=None):
+        """Load index from disk.
+
+        With ``mmap_mode`` (defaults to ``VECTOR_INDEX_MMAP``) the FAISS index
+        and chunk payload are mapped read-only and shared between processes.
+        Stores saved in the legacy ``{name}_chunks.json`` format are still
+        readable but are always loaded into memory.
+        """
+        import faiss
+        if mmap_mode is None:
+            mmap_mode=VECTOR_INDEX_MMAP
+
         index_file=self.index_path / f"{name}.index"
-        chunks_file=self.index_path / f"{name}_chunks.json"
+        payload_file=self.index_path / f"{name}_chunks.jsonl"
+        offsets_file=self.index_path / f"{name}_chunks.offsets.npy"
+        legacy_chunks_file=self.index_path / f"{name}_chunks.json"
 
-        if index_file.exists() and chunks_file.exists():
+        if not index_file.exists():
+            return False
+
+        if payload_file.exists() and offsets_file.exists():
+            if mmap_mode:
+                # MMAP_IFC maps flat (IndexFlat/IndexIDMap2) vectors in place; plain MMAP copies them
+                self.index=faiss.read_index(str(index_file),faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+                self.chunks=MappedChunks(payload_file,offsets_file)
+                self.mapped=True
+            else:
+                self.index=faiss.read_index(str(index_file))
+                with open(payload_file,"r") as f:
+                    self.chunks=[json.loads(line) for line in f]
+                self.mapped=False
+        elif legacy_chunks_file.exists():
             self.index=faiss.read_index(str(index_file))
-            with open(chunks_file,"r") as f:
+            with open(legacy_chunks_file,"r") as f:
                 self.chunks=json.load(f)
-            return True
-        return False
-    
+            self.mapped=False
+        else:
+            return False
+
+        self.dim=self.index.d
+        tombstones_file=self.index_path / f"{name}_tombstones.npy"
+        self.tombstones=np.load(tombstones_file) if tombstones_file.exists() else np.empty(0,dtype=np.int64)
+        self._id_lookup=None
+        self._search_params=None
+        # Stores saved before providers were recorded were built with Azure
+        meta_file=self.index_path / f"{name}_meta.json"
+        self.provider=None
+        if meta_file.exists():
+            with open(meta_file,"r") as f:
+                self.provider=json.load(f).get("embedding_provider")
+        return True
+
+    def _ensure_writable(self):
+        """Copy a memory-mapped or shared store into private memory before mutating it.
+
+        Stores saved before per-chunk ids are rebuilt as an id-mapped index here.
+        """
+        if not (self.mapped or self.shared or not self.id_mapped):
+            return
+        import faiss
+        if self.id_mapped:
+            self.index=faiss.deserialize_index(faiss.serialize_index(self.index))
+        else:
+            vectors=self.index.reconstruct_n(0,self.index.ntotal)
+            index=faiss.IndexIDMap2(faiss.IndexFlatL2(self.index.d))
+            index.add_with_ids(vectors,chunk_vector_ids(self.chunks))
+            self.index=index
+        self.chunks=list(self.chunks)
+        self.mapped=False
+        self.shared=False
+        self._id_lookup=None
+
     def get_stats(self) -> Dict:
         """Get statistics."""
         return {
             "total_vectors": self.index.ntotal,
             "dimension":self.dim,
-            "total_chunks":len(self.chunks)
+            "embedding_provider":self.provider,
+            "total_chunks":len(self.chunks),
+            "memory_mapped":self.mapped,
+            "tombstones":len(self.tombstones),
+            "version":self.version
         }
 
 
-       
+_loaded_stores:Dict[str,tuple]={}
+
+def load_store(name:str="default",directory:Optional[Path]=None,version:Optional[int]=None) -> Optional[VectorStore]:
+    """Return a process-wide cached store, reloading only when it was rebuilt on disk.
+
+    Without ``directory`` the store's active snapshot is used; sharded stores
+    pass the snapshot directory their shards live in.
+    """
+    if directory is None:
+        version,directory=resolve(name)
+    index_file=directory / f"{name}.index"
+    try:
+        mtime=index_file.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached=_loaded_stores.get(name)
+    if cached and cached[0]==(directory,mtime):
+        CACHE_REQUESTS.inc(cache="vector_store",result="hit")
+        return cached[1]
+
+    CACHE_REQUESTS.inc(cache="vector_store",result="miss")
+    store=VectorStore()
+    store.index_path=directory
+    store.version=version
+    with stage_timer("index_load"):
+        if not store.load(name):
+            return None
+    _loaded_stores[name]=((directory,mtime),store)
+    return store
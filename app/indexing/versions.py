@@ -0,0 +1,110 @@
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+from app.config import INDEX_RETAIN_VERSIONS
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_ROOT = Path("data/vector_index")
+
+_VERSION_RE = re.compile(r"^v(\d+)$")
+
+
+def store_root(name: str) -> Path:
+    """Directory holding the versioned snapshots of a store."""
+    return INDEX_ROOT / name
+
+
+def version_dir(name: str, version: int) -> Path:
+    return store_root(name) / f"v{version:06d}"
+
+
+def active_version(name: str) -> Optional[int]:
+    """Version the CURRENT pointer names, or None for unversioned (legacy) stores."""
+    try:
+        return int((store_root(name) / "CURRENT").read_text().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def resolve(name: str) -> tuple:
+    """``(version, directory)`` to load a store from; legacy stores live directly in INDEX_ROOT."""
+    version = active_version(name)
+    return version, INDEX_ROOT if version is None else version_dir(name, version)
+
+
+def list_versions(name: str) -> List[int]:
+    root = store_root(name)
+    if not root.is_dir():
+        return []
+    versions = []
+    for entry in root.iterdir():
+        match = _VERSION_RE.match(entry.name)
+        if match and entry.is_dir():
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+
+def activate_version(name: str, version: int):
+    """Atomically point the store at ``version`` and prune old snapshots."""
+    if not version_dir(name, version).is_dir():
+        raise ValueError(f"Version {version} of store '{name}' does not exist")
+    pointer = store_root(name) / "CURRENT"
+    tmp_pointer = pointer.with_suffix(".tmp")
+    tmp_pointer.write_text(str(version))
+    os.replace(tmp_pointer, pointer)
+    logger.info("Store '%s' now serving version %s", name, version)
+    prune_versions(name)
+
+
+def prune_versions(name: str, keep: int = INDEX_RETAIN_VERSIONS):
+    """Delete all but the newest ``keep`` snapshots, never the active one.
+
+    Readers that still have an old snapshot memory-mapped keep their pages
+    after the files are unlinked.
+    """
+    active = active_version(name)
+    for version in list_versions(name)[:-keep] if keep > 0 else []:
+        if version != active:
+            shutil.rmtree(version_dir(name, version), ignore_errors=True)
+            logger.info("Pruned version %s of store '%s'", version, name)
+
+
+def _create_version_dir(name: str) -> tuple:
+    store_root(name).mkdir(parents=True, exist_ok=True)
+    version = (list_versions(name) or [0])[-1] + 1
+    while True:
+        directory = version_dir(name, version)
+        try:
+            directory.mkdir()
+            return version, directory
+        except FileExistsError:
+            # Another builder took this number
+            version += 1
+
+
+@contextmanager
+def new_version(name: str, base: Optional[int] = None):
+    """
+    Yield ``(version, directory)`` for a snapshot being built, then activate it.
+
+    With ``base`` the files of that version are hard-linked in first, so a
+    partial rebuild only writes what changed. A failed build removes its
+    directory and leaves the active version untouched.
+    """
+    version, directory = _create_version_dir(name)
+    try:
+        if base is not None:
+            for source in version_dir(name, base).iterdir():
+                if source.is_file():
+                    os.link(source, directory / source.name)
+        yield version, directory
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    activate_version(name, version)
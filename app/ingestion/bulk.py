@@ -0,0 +1,361 @@
+"""Offline bulk ingestion and indexing.
+
+Walks a directory of .pdf/.docx files, takes each file's metadata from a
+manifest, applies ``validate_document`` governance, ingests the accepted
+files on parallel worker processes and then builds or updates a vector
+store. Documents are written through ``ingest_document`` and stores through
+the indexer, so the server reads the result exactly like uploaded documents.
+
+    python -m app.ingestion.bulk docs/ --manifest docs/manifest.csv --store default --workers 8
+
+The manifest is a CSV with a header row or a JSON list of objects (or an
+object keyed by path). Each entry has ``path`` (relative to the directory)
+and the DocumentMetadata fields ``title``, ``document_type``, ``version``,
+``approved``, ``approved_by``, ``approval_date`` and optionally
+``document_id``. Files without an entry are skipped.
+
+Runs are resumable: every finished file is appended to a journal
+(``--state``), and rerunning the same command skips files whose content
+and metadata are unchanged, then indexes whatever earlier runs ingested but
+never indexed. Index builds resume from their own checkpoints.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import multiprocessing
+import sys
+import time
+import types
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.ingestion.governance import validate_document
+from app.models.schemas import DocumentMetadata
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+DEFAULT_STATE_FILE = Path("data/bulk_ingest_state.jsonl")
+
+# Seconds between progress lines
+PROGRESS_INTERVAL_S = 10
+
+
+def load_manifest(path: Path) -> Dict[str, Dict]:
+    """Metadata entries keyed by their file path (as written in the manifest)."""
+    if path.suffix.lower() == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return {key: dict(entry, path=key) for key, entry in data.items()}
+        return {entry["path"]: entry for entry in data}
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        # Empty cells mean "not set" (e.g. an optional document_id)
+        return {
+            row["path"]: {key: value for key, value in row.items() if key and value not in (None, "")}
+            for row in csv.DictReader(f)
+        }
+
+
+def document_id_for(file_path: Path) -> str:
+    """Stable id of a file, so rerunning an ingest replaces documents instead of duplicating them."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, file_path.resolve().as_uri()))
+
+
+def fingerprint(file_path: Path, metadata: Dict) -> str:
+    """Changes when the file or its manifest entry changes."""
+    stat = file_path.stat()
+    digest = hashlib.sha256(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class Journal:
+    """
+    Append-only JSONL record of a bulk ingest, used to resume it.
+
+    ``ingested`` lines record a file's document id, fingerprint and how many
+    chunks the version it replaced had; ``indexed`` lines record the
+    documents a store has picked up.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.documents: Dict[str, Dict] = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                    if entry.get("event") == "ingested":
+                        self.documents[entry["path"]] = dict(entry, stores=[])
+                    elif entry.get("event") == "indexed":
+                        self._mark_indexed(entry["store"], entry["document_ids"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _write(self, entry: Dict):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def ingested(self, path: str, document_id: str, file_fingerprint: str, chunks: int, replaced_chunks: int):
+        entry = {
+            "event": "ingested",
+            "path": path,
+            "document_id": document_id,
+            "fingerprint": file_fingerprint,
+            "chunks": chunks,
+            "replaced_chunks": replaced_chunks,
+        }
+        self._write(entry)
+        self.documents[path] = dict(entry, stores=[])
+
+    def indexed(self, store_name: str, document_ids: List[str]):
+        self._write({"event": "indexed", "store": store_name, "document_ids": document_ids})
+        self._mark_indexed(store_name, document_ids)
+
+    def _mark_indexed(self, store_name: str, document_ids: List[str]):
+        document_ids = set(document_ids)
+        for document in self.documents.values():
+            if document["document_id"] in document_ids:
+                document["stores"].append(store_name)
+
+    def pending(self, store_name: str) -> List[Dict]:
+        """Ingested documents the store has not picked up yet."""
+        return [document for document in self.documents.values() if store_name not in document["stores"]]
+
+    def close(self):
+        self._file.close()
+
+
+def _ingest_file(file_path: str, metadata: Dict, document_id: str) -> Dict:
+    """Worker: ingest one file with the same code path as an upload."""
+    from app.ingestion.loader import ingest_document
+
+    path = Path(file_path)
+    with open(path, "rb") as f:
+        result = ingest_document(types.SimpleNamespace(filename=path.name, file=f), DocumentMetadata(**metadata), document_id=document_id)
+    return {"chunk_count": result["chunk_count"], "text_length": result["text_length"]}
+
+
+def plan(root: Path, manifest: Dict[str, Dict], journal: Journal, force: bool = False) -> Tuple[List[Dict], Dict[str, List]]:
+    """
+    Match files to manifest entries and apply governance.
+
+    Returns the files to ingest and the ones left out, keyed by reason
+    (``unchanged``, ``rejected``, ``unlisted``, ``missing``).
+    """
+    from app.rag.store import document_exists
+
+    entries = {Path(key).as_posix(): entry for key, entry in manifest.items()}
+    skipped: Dict[str, List] = {"unchanged": [], "rejected": [], "unlisted": [], "missing": []}
+    tasks = []
+
+    files = sorted(path for path in root.rglob("*") if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS)
+    for path in files:
+        relative = path.relative_to(root).as_posix()
+        entry = entries.pop(relative, None)
+        if entry is None:
+            skipped["unlisted"].append(relative)
+            continue
+
+        metadata = {key: value for key, value in entry.items() if key != "path"}
+        try:
+            validate_document(DocumentMetadata(**metadata))
+        except ValidationError as e:
+            reason = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            skipped["rejected"].append((relative, reason))
+            continue
+        except ValueError as e:
+            skipped["rejected"].append((relative, str(e)))
+            continue
+
+        document_id = metadata.pop("document_id", None) or document_id_for(path)
+        file_fingerprint = fingerprint(path, metadata)
+        previous = journal.documents.get(relative)
+        if (not force and previous and previous["fingerprint"] == file_fingerprint
+                and previous["document_id"] == document_id and document_exists(document_id)):
+            skipped["unchanged"].append(relative)
+            continue
+
+        tasks.append({
+            "path": relative,
+            "file": str(path),
+            "bytes": path.stat().st_size,
+            "metadata": metadata,
+            "document_id": document_id,
+            "fingerprint": file_fingerprint,
+        })
+
+    skipped["missing"] = sorted(entries)
+    return tasks, skipped
+
+
+def ingest(tasks: List[Dict], journal: Journal, workers: int) -> Dict:
+    """Ingest ``tasks`` on ``workers`` processes, journaling each file as it finishes."""
+    from app.rag.store import document_chunk_count
+
+    stats = {"files": 0, "bytes": 0, "chunks": 0, "failed": [], "seconds": 0.0}
+    if not tasks:
+        return stats
+
+    start = last_report = time.monotonic()
+    # Spawned, not forked: workers must not inherit the parent's SQLite connection
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {}
+        for task in tasks:
+            # The index still holds the version being replaced; remember how many chunks it had
+            previous = journal.documents.get(task["path"], {})
+            task["replaced_chunks"] = max(
+                document_chunk_count(task["document_id"]),
+                previous.get("replaced_chunks", 0) if previous.get("document_id") == task["document_id"] else 0,
+            )
+            futures[pool.submit(_ingest_file, task["file"], task["metadata"], task["document_id"])] = task
+
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error("Ingestion of %s failed: %s", task["path"], e)
+                stats["failed"].append((task["path"], str(e)))
+                continue
+            journal.ingested(task["path"], task["document_id"], task["fingerprint"], result["chunk_count"], task["replaced_chunks"])
+            stats["files"] += 1
+            stats["bytes"] += task["bytes"]
+            stats["chunks"] += result["chunk_count"]
+
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL_S:
+                last_report = now
+                done = stats["files"] + len(stats["failed"])
+                print(f"  ingested {done}/{len(tasks)} files, {stats['chunks']} chunks ({done / (now - start):.1f} files/s)")
+
+    stats["seconds"] = time.monotonic() - start
+    return stats
+
+
+def index(
+    store_name: str,
+    journal: Journal,
+    rebuild: bool = False,
+    embedding_provider: Optional[str] = None,
+    shard_by: Optional[str] = None,
+    num_shards: int = 4,
+) -> Dict:
+    """
+    Bring ``store_name`` up to date with the journaled documents.
+
+    A missing store (or ``rebuild``) gets a full pipelined build of every
+    approved document; an existing one has just the pending documents'
+    vectors replaced, in one new version.
+    """
+    from app.indexing.indexer import build_index, replace_document_in_index
+    from app.indexing.sharded_store import open_store
+    from app.rag.store import iter_chunks
+
+    pending = journal.pending(store_name)
+    current = open_store(store_name)
+    start = time.monotonic()
+
+    if current is None or rebuild:
+        store = build_index(
+            store_name=store_name,
+            embedding_provider=embedding_provider,
+            shard_by=shard_by,
+            num_shards=num_shards,
+        )
+        mode, chunks = "build", store.get_stats()["total_vectors"]
+    elif pending:
+        # Chunk ids are positional, so the old version's ids follow from its chunk count
+        old_chunks = [
+            {"chunk_id": f"{document['document_id']}_chunk_{i}"}
+            for document in pending for i in range(document["replaced_chunks"])
+        ]
+        new_chunks = [chunk for document in pending for chunk in iter_chunks(document_id=document["document_id"])]
+        store = replace_document_in_index(store_name, old_chunks, new_chunks)
+        mode, chunks = "update", len(new_chunks)
+    else:
+        return {"mode": "unchanged", "chunks": 0, "seconds": 0.0, "version": current.version}
+
+    journal.indexed(store_name, [document["document_id"] for document in pending])
+    return {"mode": mode, "chunks": chunks, "seconds": time.monotonic() - start, "version": store.version}
+
+
+def _rate(count: float, seconds: float) -> float:
+    return count / seconds if seconds > 0 else 0.0
+
+
+def report(ingest_stats: Dict, skipped: Dict[str, List], index_stats: Optional[Dict], store_name: str):
+    seconds = ingest_stats["seconds"]
+    print(
+        f"Ingested {ingest_stats['files']} files ({ingest_stats['bytes'] / 1e6:.1f} MB, {ingest_stats['chunks']} chunks) "
+        f"in {seconds:.1f} s: {_rate(ingest_stats['files'], seconds):.1f} files/s, "
+        f"{_rate(ingest_stats['bytes'] / 1e6, seconds):.2f} MB/s, {_rate(ingest_stats['chunks'], seconds):.0f} chunks/s"
+    )
+    print(
+        f"Skipped: {len(skipped['unchanged'])} unchanged, {len(skipped['rejected'])} rejected by governance, "
+        f"{len(skipped['unlisted'])} not in manifest, {len(skipped['missing'])} in manifest but not found"
+    )
+    for path, reason in skipped["rejected"][:10]:
+        print(f"  rejected {path}: {reason}")
+    for path, error in ingest_stats["failed"][:10]:
+        print(f"  failed {path}: {error}")
+    if index_stats is not None:
+        print(
+            f"Index '{store_name}': {index_stats['mode']}, {index_stats['chunks']} chunks in {index_stats['seconds']:.1f} s "
+            f"({_rate(index_stats['chunks'], index_stats['seconds']):.0f} chunks/s), version {index_stats['version']}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", type=Path, help="Directory to walk for .pdf and .docx files")
+    parser.add_argument("--manifest", type=Path, required=True, help="CSV or JSON metadata manifest")
+    parser.add_argument("--store", default="default", help="Vector store to build or update")
+    parser.add_argument("--workers", type=int, default=max(multiprocessing.cpu_count() - 1, 1), help="Ingestion worker processes")
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE_FILE, help="Journal used to resume runs")
+    parser.add_argument("--force", action="store_true", help="Re-ingest files even if unchanged")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the store from all approved documents")
+    parser.add_argument("--no-index", action="store_true", help="Only ingest; leave the store as it is")
+    parser.add_argument("--embedding-provider", help="Provider for a new store, e.g. 'azure' or 'hashing:512'")
+    parser.add_argument("--shard-by", choices=["document_type", "document_id"], help="Shard a new store")
+    parser.add_argument("--num-shards", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if not args.directory.is_dir():
+        parser.error(f"not a directory: {args.directory}")
+
+    journal = Journal(args.state)
+    try:
+        tasks, skipped = plan(args.directory, load_manifest(args.manifest), journal, force=args.force)
+        print(f"{len(tasks)} files to ingest with {args.workers} workers")
+        ingest_stats = ingest(tasks, journal, args.workers)
+
+        index_stats = None
+        if not args.no_index:
+            index_stats = index(
+                args.store,
+                journal,
+                rebuild=args.rebuild,
+                embedding_provider=args.embedding_provider,
+                shard_by=args.shard_by,
+                num_shards=args.num_shards,
+            )
+        report(ingest_stats, skipped, index_stats, args.store)
+    finally:
+        journal.close()
+    return 1 if ingest_stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,73 @@
+import zipfile
 from pathlib import Path
-from pypdf import PdfReader
-from docx import Document
+from typing import Iterator
+from xml.etree import ElementTree
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
 
 
 def extract_text(file_path: Path) -> str:
+    return "".join(iter_text(file_path)).strip()
+
+
+def iter_text(file_path: Path) -> Iterator[str]:
+    """
+    Yield a document's text piece by piece (PDF pages, DOCX paragraphs).
+
+    Concatenating the pieces gives the same text as ``extract_text``; memory
+    use depends on the largest piece, not on the document size.
+    """
     extension = file_path.suffix.lower()
 
     if extension == ".pdf":
-        return _extract_pdf(file_path)
+        return _iter_pdf(file_path)
     elif extension == ".docx":
-        return _extract_docx(file_path)
+        return _iter_docx(file_path)
     else:
         raise ValueError("Unsupported file type")
 
 
-def _extract_pdf(file_path: Path) -> str:
+def _iter_pdf(file_path: Path) -> Iterator[str]:
+    from pypdf import PdfReader  # deferred: only needed when a PDF is ingested
+
     reader = PdfReader(file_path)
-    text = ""
     for page in reader.pages:
-        text += page.extract_text() or ""
-    return text.strip()
+        yield page.extract_text() or ""
+
+
+def _iter_docx(file_path: Path) -> Iterator[str]:
+    """Stream body-level paragraphs straight from word/document.xml.
+
+    Matches python-docx's ``Document.paragraphs`` text (runs, tabs and
+    breaks; table contents excluded) without building the whole DOM.
+    """
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+        body, body_depth, depth = None, None, 0
+        first = True
+        for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if elem.tag == _W + "body":
+                    body, body_depth = elem, depth
+                continue
+
+            depth -= 1
+            if body is None or depth != body_depth:
+                continue
+            # A direct child of <w:body> is complete
+            if elem.tag == _W + "p":
+                if not first:
+                    yield "\n"
+                first = False
+                yield "".join(_run_text(node) for node in elem.iter())
+            body.clear()
 
 
-def _extract_docx(file_path: Path) -> str:
-    doc = Document(file_path)
-    return "\n".join(p.text for p in doc.paragraphs).strip()
+def _run_text(node) -> str:
+    if node.tag == _W + "t":
+        return node.text or ""
+    if node.tag == _W + "tab":
+        return "\t"
+    if node.tag in (_W + "br", _W + "cr"):
+        return "\n"
+    return ""
@@ -1,12 +1,15 @@
+import os
+import shutil
 import uuid
 from pathlib import Path 
 from datetime import datetime
+from typing import Optional
 
-from app.ingestion.extractor import extract_text 
+from app.ingestion.extractor import iter_text
 from app.ingestion.governance import validate_document 
 from app.models.schemas import DocumentMetadata
-from app.rag.chunker import chunk_text
-from app.rag.store import save_chunks
+from app.rag.chunker import iter_words, stream_chunks
+from app.rag.store import delete_chunks, save_chunks
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -14,50 +17,93 @@ logger = get_logger(__name__)
 DOCUMENT_DIR = Path("data/documents")
 DOCUMENT_DIR.mkdir(parents=True, exist_ok=True)
 
-def ingest_document(file, metadata: DocumentMetadata):
-    """Ingest document with logging and governance."""
-    logger.info(f"Starting document ingestion: {file.filename}")
+_COPY_BUFFER_BYTES = 1024 * 1024
+
+def _delete_uploaded_files(document_id: str) -> int:
+    removed = 0
+    for path in DOCUMENT_DIR.glob(f"{document_id}_*"):
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+def delete_document(document_id: str) -> bool:
+    """Delete a document's uploaded file and chunks. Returns False if it did not exist."""
+    found = delete_chunks(document_id)
+    found = _delete_uploaded_files(document_id) > 0 or found
+    logger.info("Document deleted: %s (found=%s)", document_id, found)
+    return found
+
+def ingest_document(file, metadata: DocumentMetadata, document_id: Optional[str] = None):
+    """
+    Ingest document with logging and governance.
+    
+    Passing the ``document_id`` of an existing document replaces it with a
+    new version: its uploaded file and chunks are overwritten once the new
+    version has been ingested, so a failed replacement leaves the old one intact.
+    
+    The upload is copied to disk in blocks and its text flows through
+    pages -> words -> chunks -> repository writer as a stream, so memory use
+    does not grow with the document size.
+    """
+    logger.info("Starting document ingestion: %s", file.filename)
     
     # 1. Governance check
     try:
         validate_document(metadata)
-        logger.info(f"Document passed governance checks (approved={metadata.approved})")
+        logger.info("Document passed governance checks (approved=%s)", metadata.approved)
     except Exception as e:
-        logger.error(f"Governance validation failed: {str(e)}")
+        logger.error("Governance validation failed: %s", str(e))
         raise
     
-    # 2. Generate document ID
-    document_id = str(uuid.uuid4())
+    # 2. Generate document ID (or keep it when replacing a version)
+    replacing = bool(document_id)
+    if replacing:
+        logger.info("Replacing document: %s", document_id)
+    else:
+        document_id = str(uuid.uuid4())
+        logger.info("Assigned document ID: %s", document_id)
     metadata.document_id = document_id
-    logger.info(f"Assigned document ID: {document_id}")
     
-    # 3. Save uploaded file
+    # 3. Save uploaded file under a temporary name (which keeps the extension
+    # the extractor goes by, but not the "<document_id>_" prefix of live files)
     file_path = DOCUMENT_DIR / f"{document_id}_{file.filename}"
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
-    logger.info(f"File saved: {file_path}")
-    
-    # 4. Extract text
-    extracted_text = extract_text(file_path)
-    logger.info(f"Text extracted: {len(extracted_text)} characters")
-    
-    # 5. Chunk the text
-    chunks = chunk_text(extracted_text)
-    logger.info(f"Created {len(chunks)} chunks")
+    upload_path = DOCUMENT_DIR / f".upload-{uuid.uuid4().hex}_{file.filename}"
+    try:
+        with open(upload_path, "wb") as f:
+            shutil.copyfileobj(file.file, f, _COPY_BUFFER_BYTES)
+        
+        # 4-6. Extract, chunk and save chunks with metadata in one pass
+        text_length = 0
+        
+        def pieces():
+            nonlocal text_length
+            for piece in iter_text(upload_path):
+                text_length += len(piece)
+                yield piece
+        
+        chunk_count = save_chunks(document_id, stream_chunks(iter_words(pieces())), metadata.model_dump())
+    except BaseException:
+        upload_path.unlink(missing_ok=True)
+        raise
+    logger.info("Extracted %s characters into %s chunks", text_length, chunk_count)
     
-    # 6. Save chunks with metadata
-    chunk_count = save_chunks(document_id, chunks, metadata.model_dump())
-    logger.info(f"Saved {chunk_count} chunks to storage")
+    # The new version is stored; only now replace the previous upload
+    os.replace(upload_path, file_path)
+    if replacing:
+        for old_path in DOCUMENT_DIR.glob(f"{document_id}_*"):
+            if old_path != file_path:
+                old_path.unlink(missing_ok=True)
+    logger.info("File saved: %s", file_path)
     
     # 7. Return ingestion result
     result = {
         "document_id": document_id,
         "file_path": str(file_path),
         "metadata": metadata.model_dump(),
-        "text_length": len(extracted_text),
+        "text_length": text_length,
         "chunk_count": chunk_count,
         "ingested_at": datetime.utcnow().isoformat(),
     }
     
-    logger.info(f"Document ingestion completed: {document_id}")
+    logger.info("Document ingestion completed: %s", document_id)
     return result
\ No newline at end of file
@@ -1,19 +1,69 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from app.ingestion.loader import ingest_document
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from app.ingestion.loader import delete_document, ingest_document
 from app.models.schemas import DocumentMetadata, ChatRequest, ChatResponse  # Add ChatRequest, ChatResponse
-from app.indexing.indexer import build_index, search_index
+from app.indexing.indexer import build_index, rebuild_shard, remove_document_from_index, replace_document_in_index, resume_interrupted_builds, search_index
+from app.indexing.jobs import get_job, list_jobs, submit_job
+from app.indexing.sharded_store import load_sharded_store, open_store
+from app.indexing.versions import activate_version, active_version, list_versions
 from app.rag.retriever import retrieve_context
 from app.rag.generator import generate_answer
+from app.rag.store import load_chunks
 from app.chat.chatbot import chat, get_available_topics
 from app.chat.session_manager import session_manager
+from app.config import INDEX_RESUME_ON_STARTUP, LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, SEARCH_POOL_THREADS
+from app.utils.admission import PRIORITY_CHAT, PRIORITY_QUERY, OverloadedError, Reservation, llm_admission
 from app.utils.logger import get_logger
+from app.utils.compression import CompressionMiddleware
+from app.utils.metrics import HTTP_LATENCY, render_latest
+from app.utils.openai_client import close_openai_client
+from app.utils.projection import parse_fields, project_results
+from app.utils.resilience import CircuitOpenError, DeadlineExceededError
+from app.utils.static_assets import serve_asset, serve_page
+from app.warmup import readiness, run_warmup
+from app.utils.tracing import start_trace
 from datetime import datetime
 from typing import Optional
 
 logger = get_logger(__name__)
 
+# LLM-bound request bodies run here, off the event loop, so requests can
+# overlap; they are admitted first (llm_admission.reserve), which bounds them
+# to one thread each
+_request_pool = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY + LLM_MAX_QUEUE, thread_name_prefix="request")
+# Retrieval-only work gets its own threads so a backlog of LLM calls cannot delay searches
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_POOL_THREADS, thread_name_prefix="search")
+
+def _run_in(pool: ThreadPoolExecutor, fn, *args, **kwargs):
+    """Await ``fn`` on ``pool`` inside a copy of the caller's trace context."""
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return asyncio.get_running_loop().run_in_executor(pool, call)
+
+def _run_blocking(fn, *args, **kwargs):
+    return _run_in(_request_pool, fn, *args, **kwargs)
+
+def _run_search(fn, *args, **kwargs):
+    return _run_in(_search_pool, fn, *args, **kwargs)
+
+async def _run_admitted(reservation: Reservation, fn, *args, **kwargs):
+    """Like ``_run_blocking`` for an admitted LLM-bound call; the worker releases ``reservation``."""
+    def run():
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            reservation.release()
+    reservation.handed_off = True
+    return await _run_blocking(run)
+
+def _overloaded(e: OverloadedError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after_s))})
+
 app = FastAPI(
     title="AI-Powered Knowledge Framework",
     description="Enterprise RAG system with governance controls",
@@ -29,13 +79,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON/HTML responses for remote clients
+app.add_middleware(CompressionMiddleware)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe per-route latency; the route template keeps label cardinality bounded."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting AI-Powered Knowledge Framework")
+    # Warm up in the background: /health answers at once, /ready once warm
+    asyncio.get_running_loop().run_in_executor(None, run_warmup)
+    if INDEX_RESUME_ON_STARTUP:
+        resume_interrupted_builds()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down AI-Powered Knowledge Framework")
+    close_openai_client()
 
 
 @app.get("/chat/topics")
@@ -50,7 +126,7 @@ async def get_topics():
             "count": len(topics)
         }
     except Exception as e:
-        logger.error(f"Failed to get topics: {e}")
+        logger.error("Failed to get topics: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/chat/session")
@@ -77,7 +153,7 @@ async def send_chat_message(request: ChatRequest):
     3. Generate a response with conversation history
     4. Return answer with sources
     """
-    logger.info(f"Chat message received - Session: {request.session_id}, Topic: {request.topic}")
+    logger.info("Chat message received - Session: %s, Topic: %s", request.session_id, request.topic)
     
     try:
         # Create session if not provided
@@ -85,16 +161,31 @@ async def send_chat_message(request: ChatRequest):
             request.session_id = session_manager.create_session()
         
         # Process the chat message
-        response = chat(
-            session_id=request.session_id,
-            user_message=request.message,
-            topic=request.topic
-        )
+        # Shed here, before a thread is spent on a request that cannot be served in time
+        with start_trace("/chat/message", session_id=request.session_id) as trace, llm_admission.reserve(PRIORITY_CHAT) as reservation:
+            response = await _run_admitted(
+                reservation,
+                chat,
+                session_id=request.session_id,
+                user_message=request.message,
+                topic=request.topic
+            )
+        
+        if request.debug:
+            response["debug"] = {"trace": trace.to_dict()}
         
         return ChatResponse(**response)
         
+    except OverloadedError as e:
+        raise _overloaded(e)
+    except CircuitOpenError as e:
+        logger.warning("Chat rejected: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after_s))})
+    except DeadlineExceededError as e:
+        logger.error("Chat timed out: %s", e)
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        logger.error(f"Chat failed: {e}")
+        logger.error("Chat failed: %s", e)
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
@@ -117,434 +208,17 @@ async def get_chat_history(session_id: str):
     }
 
 @app.get("/chat/ui", response_class=HTMLResponse)
-async def chat_ui():
-    """Serve an enhanced chat UI with file upload."""
-    return """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>AI Knowledge Assistant</title>
-        <link
-      href="https://fonts.googleapis.com/css2?family=Afacad:ital,wght@0,400..700;1,400..700&display=swap"
-      rel="stylesheet"
-        />
-
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body {
-                font-family: 'Afacad', 'Segoe UI', Roboto, Helvetica, Arial, sans-serif;
-                letter-spacing: 0.2px;
-                background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
-                height: 100vh;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-            }
-            .chat-container {
-                width: 90%;
-                max-width: 800px;
-                height: 90vh;
-                background: white;
-                border-radius: 20px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                display: flex;
-                flex-direction: column;
-                overflow: hidden;
-            }
-            .chat-header {
-                background: linear-gradient(120deg, #1b2540 0%, #2c3e5c 50%);
-                color: white;
-                padding: 20px;
-                text-align: center;
-            }
-            .chat-header h1 {
-                font-size: 24px;
-                margin-bottom: 10px;
-            }
-            .controls {
-                padding: 15px;
-                background: #f8f9fa;
-                border-bottom: 1px solid #e0e0e0;
-                display: flex;
-                gap: 10px;
-            }
-            .controls select, .controls input[type="text"] {
-                flex: 1;
-                padding: 10px;
-                border: 2px solid #667eea;
-                border-radius: 8px;
-                font-size: 14px;
-                background: white;
-            }
-            .upload-section {
-                padding: 15px;
-                background: #fff9e6;
-                border-bottom: 2px solid #ffd700;
-                display: flex;
-                gap: 10px;
-                align-items: center;
-            }
-            .file-input-wrapper {
-                position: relative;
-                overflow: hidden;
-                display: inline-block;
-            }
-            .file-input-wrapper input[type=file] {
-                position: absolute;
-                left: -9999px;
-            }
-            .file-input-wrapper label {
-                display: inline-block;
-                padding: 10px 20px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border-radius: 8px;
-                cursor: pointer;
-                font-size: 14px;
-                font-weight: 600;
-                transition: transform 0.2s;
-            }
-            .file-input-wrapper label:hover {
-                transform: scale(1.05);
-            }
-            .file-name {
-                flex: 1;
-                color: #666;
-                font-size: 14px;
-            }
-            .upload-btn {
-                padding: 10px 20px;
-                background: #14b8a6;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                cursor: pointer;
-                font-size: 14px;
-                font-weight: 600;
-                transition: transform 0.2s;
-            }
-            .upload-btn:hover {
-                transform: scale(1.05);
-            }
-            .upload-btn:disabled {
-                opacity: 0.5;
-                cursor: not-allowed;
-            }
-            .chat-messages {
-                flex: 1;
-                overflow-y: auto;
-                padding: 20px;
-                background: #f5f5f5;
-            }
-            .message {
-                margin-bottom: 15px;
-                display: flex;
-                animation: fadeIn 0.3s;
-            }
-            @keyframes fadeIn {
-                from { opacity: 0; transform: translateY(10px); }
-                to { opacity: 1; transform: translateY(0); }
-            }
-            .message.user {
-                justify-content: flex-end;
-            }
-            .message.system {
-                justify-content: center;
-            }
-            .message-content {
-                max-width: 70%;
-                padding: 12px 16px;
-                border-radius: 18px;
-                word-wrap: break-word;
-            }
-            .message.user .message-content {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-            }
-            .message.assistant .message-content {
-                background: white;
-                color: #333;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-            }
-            .message.system .message-content {
-                background: #fff9e6;
-                color: #856404;
-                border: 1px solid #ffd700;
-                text-align: center;
-                max-width: 90%;
-            }
-            .sources {
-                font-size: 11px;
-                color: #666;
-                margin-top: 8px;
-                padding-top: 8px;
-                border-top: 1px solid #e0e0e0;
-            }
-            .chat-input {
-                padding: 20px;
-                background: white;
-                border-top: 1px solid #e0e0e0;
-                display: flex;
-                gap: 10px;
-            }
-            .chat-input input {
-                flex: 1;
-                padding: 12px 16px;
-                border: 2px solid #e0e0e0;
-                border-radius: 25px;
-                font-size: 14px;
-                outline: none;
-                transition: border-color 0.3s;
-            }
-            .chat-input input:focus {
-                border-color: #667eea;
-            }
-            .chat-input button {
-                padding: 12px 30px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border: none;
-                border-radius: 25px;
-                cursor: pointer;
-                font-size: 14px;
-                font-weight: 600;
-                transition: transform 0.2s;
-            }
-            .chat-input button:hover {
-                transform: scale(1.05);
-            }
-            .chat-input button:disabled {
-                opacity: 0.5;
-                cursor: not-allowed;
-            }
-            .loading {
-                display: none;
-                text-align: center;
-                color: #666;
-                font-style: italic;
-                padding: 10px;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="chat-container">
-            <div class="chat-header">
-                <h1> AI KNOWLEDGE ASSISTANT</h1>
-                <p>Upload documents and ask questions!</p>
-            </div>
-            
-            <div class="upload-section">
-                <div class="file-input-wrapper">
-                    <input type="file" id="fileInput" accept=".pdf,.docx" onchange="handleFileSelect(event)">
-                    <label for="fileInput">📄 Choose File</label>
-                </div>
-                <span class="file-name" id="fileName">No file selected</span>
-                <input type="text" id="docTitle" placeholder="Document title (optional)" style="width: 200px;">
-                <button class="upload-btn" id="uploadBtn" onclick="uploadDocument()" disabled>Upload</button>
-            </div>
-            
-            <div class="controls">
-                <select id="topicSelect">
-                    <option value="">All Topics</option>
-                </select>
-            </div>
-            
-            <div class="chat-messages" id="chatMessages">
-                <div class="message assistant">
-                    <div class="message-content">
-                        👋 Hello! I'm your AI Knowledge Assistant. 
-                        <br><br>
-                        📤 <b>Upload a document</b> above to add it to my knowledge base
-                        <br>
-                        💬 <b>Ask me anything</b> about the documents I have access to
-                        <br><br>
-                        Select a topic or just start chatting!
-                    </div>
-                </div>
-            </div>
-            
-            <div class="loading" id="loading">AI is thinking...</div>
-            
-            <div class="chat-input">
-                <input 
-                    type="text" 
-                    id="messageInput" 
-                    placeholder="Type your message..." 
-                    onkeypress="if(event.key==='Enter') sendMessage()"
-                />
-                <button onclick="sendMessage()" id="sendBtn">Send</button>
-            </div>
-        </div>
-
-        <script>
-            let sessionId = null;
-            let selectedFile = null;
-            const API_URL = 'http://127.0.0.1:8000';
-
-            // Initialize
-            async function init() {
-                // Create session
-                const sessionRes = await fetch(`${API_URL}/chat/session`, { method: 'POST' });
-                const sessionData = await sessionRes.json();
-                sessionId = sessionData.session_id;
-                
-                // Load topics
-                await loadTopics();
-            }
-
-            async function loadTopics() {
-                const topicsRes = await fetch(`${API_URL}/chat/topics`);
-                const topicsData = await topicsRes.json();
-                
-                const select = document.getElementById('topicSelect');
-                select.innerHTML = '<option value="">All Topics</option>';
-                topicsData.topics.forEach(topic => {
-                    const option = document.createElement('option');
-                    option.value = topic;
-                    option.textContent = topic;
-                    select.appendChild(option);
-                });
-            }
-
-            function handleFileSelect(event) {
-                selectedFile = event.target.files[0];
-                const fileName = document.getElementById('fileName');
-                const uploadBtn = document.getElementById('uploadBtn');
-                
-                if (selectedFile) {
-                    fileName.textContent = selectedFile.name;
-                    uploadBtn.disabled = false;
-                } else {
-                    fileName.textContent = 'No file selected';
-                    uploadBtn.disabled = true;
-                }
-            }
-
-            async function uploadDocument() {
-                if (!selectedFile) return;
-                
-                const uploadBtn = document.getElementById('uploadBtn');
-                const docTitle = document.getElementById('docTitle').value || selectedFile.name;
-                
-                uploadBtn.disabled = true;
-                uploadBtn.textContent = 'Uploading...';
-                
-                addMessage('system', `📤 Uploading "${docTitle}"...`);
-                
-                try {
-                    const formData = new FormData();
-                    formData.append('file', selectedFile);
-                    
-                    const response = await fetch(
-                        `${API_URL}/documents/upload-and-index?title=${encodeURIComponent(docTitle)}&document_type=General&approved=true&approved_by=chat_user`,
-                        {
-                            method: 'POST',
-                            body: formData
-                        }
-                    );
-                    
-                    const data = await response.json();
-                    
-                    if (response.ok) {
-                        addMessage('system', `✅ "${docTitle}" uploaded and indexed! You can now ask questions about it.`);
-                        
-                        // Reload topics
-                        await loadTopics();
-                        
-                        // Clear file input
-                        document.getElementById('fileInput').value = '';
-                        document.getElementById('fileName').textContent = 'No file selected';
-                        document.getElementById('docTitle').value = '';
-                        selectedFile = null;
-                    } else {
-                        addMessage('system', `❌ Upload failed: ${data.detail}`);
-                    }
-                    
-                } catch (error) {
-                    addMessage('system', '❌ Upload failed. Please try again.');
-                    console.error(error);
-                } finally {
-                    uploadBtn.disabled = false;
-                    uploadBtn.textContent = 'Upload';
-                }
-            }
+async def chat_ui(request: Request):
+    """Serve an enhanced chat UI with file upload (app/static/chat.html)."""
+    return serve_page(request, "chat.html")
 
-            function addMessage(role, content, sources = []) {
-                const messagesDiv = document.getElementById('chatMessages');
-                const messageDiv = document.createElement('div');
-                messageDiv.className = `message ${role}`;
-                
-                let sourcesHTML = '';
-                if (sources && sources.length > 0) {
-                    sourcesHTML = '<div class="sources"> Sources: ' + 
-                        sources.map(s => s.document_title).join(', ') + 
-                        '</div>';
-                }
-                
-                messageDiv.innerHTML = `
-                    <div class="message-content">
-                        ${content}
-                        ${sourcesHTML}
-                    </div>
-                `;
-                
-                messagesDiv.appendChild(messageDiv);
-                messagesDiv.scrollTop = messagesDiv.scrollHeight;
-            }
-
-            async function sendMessage() {
-                const input = document.getElementById('messageInput');
-                const message = input.value.trim();
-                
-                if (!message) return;
-                
-                const topic = document.getElementById('topicSelect').value;
-                const sendBtn = document.getElementById('sendBtn');
-                const loading = document.getElementById('loading');
-                
-                // Disable input
-                input.disabled = true;
-                sendBtn.disabled = true;
-                loading.style.display = 'block';
-                
-                // Add user message
-                addMessage('user', message);
-                input.value = '';
-                
-                try {
-                    // Send to API
-                    const response = await fetch(`${API_URL}/chat/message`, {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({
-                            session_id: sessionId,
-                            message: message,
-                            topic: topic || null
-                        })
-                    });
-                    
-                    const data = await response.json();
-                    
-                    // Add assistant response
-                    addMessage('assistant', data.message, data.sources);
-                    
-                } catch (error) {
-                    addMessage('assistant', '❌ Sorry, I encountered an error. Please try again.');
-                    console.error(error);
-                } finally {
-                    input.disabled = false;
-                    sendBtn.disabled = false;
-                    loading.style.display = 'none';
-                    input.focus();
-                }
-            }
-
-            // Initialize on load
-            init();
-        </script>
-    </body>
-    </html>
-    """
+@app.get("/static/{name}", include_in_schema=False)
+async def static_asset(request: Request, name: str):
+    """Serve the chat UI's stylesheet and script with ETag and long-lived caching."""
+    response = serve_asset(request, name)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return response
 
 @app.post("/documents/upload-and-index")
 async def upload_and_index_document(
@@ -556,7 +230,7 @@ async def upload_and_index_document(
     approved_by: str = "chatbot_user",
 ):
     """Upload a document and immediately add it to the index."""
-    logger.info(f"Upload + Index request: {file.filename}")
+    logger.info("Upload + Index request: %s", file.filename)
     
     try: 
         # Step 1: Upload document
@@ -569,13 +243,20 @@ async def upload_and_index_document(
             approval_date=datetime.utcnow()
         )
         upload_result = ingest_document(file, metadata)
-        logger.info(f"Document uploaded: {upload_result['document_id']}")
+        logger.info("Document uploaded: %s", upload_result['document_id'])
         
-        # Step 2: Rebuild index to include new document
-        logger.info("Rebuilding index with new document...")
-        store = build_index(approved_only=True)
+        # Step 2: Rebuild index to include new document (only its shard if sharded)
+        if load_sharded_store("default") is not None:
+            logger.info("Rebuilding shard for new document...")
+            job = submit_job("rebuild_shard", "default", rebuild_shard, store_name="default", document_metadata=upload_result["metadata"])
+        else:
+            logger.info("Rebuilding index with new document...")
+            existing = open_store("default")
+            job = submit_job("build", "default", build_index, approved_only=True, embedding_provider=existing.provider if existing else None)
+        # Awaiting the job keeps the event loop free while the build runs
+        store = await asyncio.wrap_future(job.future)
         stats = store.get_stats()
-        logger.info(f"Index rebuilt: {stats}")
+        logger.info("Index rebuilt: %s", stats)
         
         return {
             "status": "success",
@@ -584,7 +265,7 @@ async def upload_and_index_document(
             "index_stats": stats
         }
     except Exception as e:
-        logger.error(f"Upload + Index failed: {str(e)}")
+        logger.error("Upload + Index failed: %s", str(e))
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/")
@@ -596,6 +277,19 @@ def root():
 def health():
     return {"message": "OK", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/ready")
+def ready(response: Response):
+    """Readiness for load balancers: 503 until warm-up has loaded every required component."""
+    status = readiness.to_dict()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Expose pipeline metrics in Prometheus text format (per worker process)."""
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
+
 @app.post("/documents/upload")
 async def upload_documents(
     file: UploadFile = File(...),
@@ -605,7 +299,7 @@ async def upload_documents(
     approved: bool = False,
     approved_by: str = "",
 ):
-    logger.info(f"Upload request: {file.filename} (approved={approved})")
+    logger.info("Upload request: %s (approved=%s)", file.filename, approved)
     
     try: 
         metadata = DocumentMetadata(
@@ -617,27 +311,157 @@ async def upload_documents(
             approval_date=datetime.utcnow()
         )
         result = ingest_document(file, metadata)
-        logger.info(f"Document uploaded successfully: {result['document_id']}")
+        logger.info("Document uploaded successfully: %s", result['document_id'])
         return {"status": "success", "data": result}
     except Exception as e:
-        logger.error(f"Upload failed: {str(e)}")
+        logger.error("Upload failed: %s", str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.put("/documents/{document_id}")
+async def replace_document(
+    document_id: str,
+    file: UploadFile = File(...),
+    title: str = "Untitled",
+    document_type: str = "General",
+    version: str = "1.0",
+    approved: bool = False,
+    approved_by: str = "",
+    store_name: str = Query("default", description="Vector store to update in place")
+):
+    """
+    Replace a document with a new version.
+    
+    Only the new version's chunks are embedded; the old version's vectors are
+    removed from the store without a full rebuild.
+    """
+    logger.info("Replace request: %s -> %s (version=%s)", document_id, file.filename, version)
+    
+    old_chunks = load_chunks(document_id)
+    if old_chunks is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    try:
+        metadata = DocumentMetadata(
+            title=title,
+            document_type=document_type,
+            version=version,
+            approved=approved,
+            approved_by=approved_by,
+            approval_date=datetime.utcnow()
+        )
+        result = ingest_document(file, metadata, document_id=document_id)
+    except Exception as e:
+        logger.error("Replace failed: %s", str(e))
         raise HTTPException(status_code=400, detail=str(e))
+    
+    index_stats = index_version = None
+    if open_store(store_name) is not None:
+        try:
+            job = submit_job(
+                "replace_document",
+                store_name,
+                replace_document_in_index,
+                store_name=store_name,
+                old_chunks=old_chunks,
+                new_chunks=load_chunks(document_id) or []
+            )
+            store = await asyncio.wrap_future(job.future)
+            index_stats = store.get_stats()
+            index_version = store.version
+        except Exception as e:
+            logger.error("Index update for replaced document failed: %s", str(e))
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    return {
+        "status": "success",
+        "data": result,
+        "index_stats": index_stats,
+        "index_version": index_version
+    }
+
+@app.delete("/documents/{document_id}")
+async def remove_document(
+    document_id: str,
+    store_name: str = Query("default", description="Vector store to remove the document from")
+):
+    """Delete a document and tombstone its vectors without rebuilding the index."""
+    logger.info("Delete request: %s", document_id)
+    
+    chunks = load_chunks(document_id)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    index_stats = index_version = None
+    if open_store(store_name) is not None:
+        try:
+            job = submit_job("remove_document", store_name, remove_document_from_index, store_name=store_name, document_chunks=chunks)
+            store = await asyncio.wrap_future(job.future)
+            index_stats = store.get_stats()
+            index_version = store.version
+        except Exception as e:
+            logger.error("Index update for deleted document failed: %s", str(e))
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    delete_document(document_id)
+    return {
+        "status": "success",
+        "document_id": document_id,
+        "chunks_removed": len(chunks),
+        "index_stats": index_stats,
+        "index_version": index_version
+    }
 
 @app.post("/index/build")
 async def build_vector_index(
+    response: Response,
     approved_only: bool = Query(True, description="Only index approved documents"),
-    document_type: Optional[str] = Query(None, description="Filter by document type")
+    document_type: Optional[str] = Query(None, description="Filter by document type"),
+    shard_by: Optional[str] = Query(None, description="Shard the index by 'document_type' or 'document_id'"),
+    num_shards: int = Query(4, description="Number of shards when sharding by document_id"),
+    store_name: str = Query("default", description="Name of the vector store to build"),
+    embedding_provider: Optional[str] = Query(None, description="Embedding provider, e.g. 'azure' or 'hashing:512'"),
+    resume: bool = Query(True, description="Reuse embeddings checkpointed by an unfinished earlier build"),
+    wait: bool = Query(False, description="Respond only once the build has finished")
 ):
-    """Build or rebuild the vector index with governance controls."""
-    logger.info(f"Index build requested (approved_only={approved_only}, document_type={document_type})")
+    """
+    Build or rebuild the vector index with governance controls.
+    
+    The build runs in the background into a new index version; searches keep
+    using the active version until it completes. Without ``wait`` this returns
+    202 and a job to poll at /index/jobs/{job_id}, whose ``progress`` reports
+    chunks embedded, rate and ETA.
+    """
+    logger.info("Index build requested (store=%s, approved_only=%s, document_type=%s, shard_by=%s, provider=%s)", store_name, approved_only, document_type, shard_by, embedding_provider)
     
     try:
-        store = build_index(approved_only=approved_only, document_type=document_type)
+        job = submit_job(
+            "build",
+            store_name,
+            build_index,
+            store_name=store_name,
+            approved_only=approved_only,
+            document_type=document_type,
+            shard_by=shard_by,
+            num_shards=num_shards,
+            embedding_provider=embedding_provider,
+            resume=resume
+        )
+        if not wait:
+            response.status_code = 202
+            return {
+                "status": "accepted",
+                "message": "Index build started",
+                "job": job.to_dict(),
+                "active_version": active_version(store_name)
+            }
+        
+        store = await asyncio.wrap_future(job.future)
         stats = store.get_stats()
-        logger.info(f"Index built successfully: {stats}")
+        logger.info("Index built successfully: %s", stats)
         return {
             "status": "success",
             "message": "Vector index built successfully",
+            "job": job.to_dict(),
             "stats": stats,
             "governance": {
                 "approved_only": approved_only,
@@ -645,35 +469,95 @@ async def build_vector_index(
             }
         }
     except Exception as e:
-        logger.error(f"Index build failed: {str(e)}")
+        logger.error("Index build failed: %s", str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/index/jobs")
+async def get_index_jobs():
+    """List recent background index builds, newest first."""
+    return {"status": "success", "jobs": [job.to_dict() for job in list_jobs()]}
+
+@app.get("/index/jobs/{job_id}")
+async def get_index_job(job_id: str):
+    """Status of a background index build."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "job": job.to_dict()}
+
+@app.get("/index/versions")
+async def get_index_versions(
+    store_name: str = Query("default", description="Name of the vector store")
+):
+    """List the retained versions of a store and the one being served."""
+    return {
+        "status": "success",
+        "store_name": store_name,
+        "active_version": active_version(store_name),
+        "versions": list_versions(store_name)
+    }
+
+@app.post("/index/versions/{version}/activate")
+async def activate_index_version(
+    version: int,
+    store_name: str = Query("default", description="Name of the vector store")
+):
+    """Switch a store to a retained version, e.g. to roll back a bad build."""
+    try:
+        activate_version(store_name, version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"status": "success", "store_name": store_name, "active_version": version}
+
 @app.post("/search")
 async def search(
     query: str,
     top_k: int = 5,
-    document_type: Optional[str] = Query(None, description="Filter by document type")
+    document_type: Optional[str] = Query(None, description="Filter by document type"),
+    debug: bool = Query(False, description="Include per-stage timing spans in the response"),
+    store_name: str = Query("default", description="Name of the vector store to search"),
+    fields: Optional[str] = Query(None, description="Comma-separated result fields to return, e.g. chunk_id,score,metadata.title"),
+    snippet_chars: Optional[int] = Query(None, ge=1, description="Shorten each result's text to about this many characters")
 ):
     """Search the vector index with optional filtering."""
-    logger.info(f"Search request: '{query}' (top_k={top_k}, document_type={document_type})")
+    logger.info("Search request: '%s' (top_k=%s, document_type=%s, store=%s)", query, top_k, document_type, store_name)
+    try:
+        projection = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        results = search_index(query, k=top_k, document_type=document_type)
-        return {
+        with start_trace("/search", top_k=top_k) as trace:
+            results, index_version = await _run_search(search_index, query, k=top_k, store_name=store_name, document_type=document_type)
+        response = {
             "status": "success",
             "query": query,
-            "results": results,
-            "filters": {"document_type": document_type}
+            "results": project_results(results, projection, snippet_chars),
+            "filters": {"document_type": document_type},
+            "index_version": index_version
         }
+        if debug:
+            response["debug"] = {"trace": trace.to_dict()}
+        return response
+    except CircuitOpenError as e:
+        logger.warning("Search rejected: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after_s))})
+    except DeadlineExceededError as e:
+        logger.error("Search timed out: %s", e)
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        logger.error(f"Search failed: {str(e)}")
+        logger.error("Search failed: %s", str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/query")
 async def query_knowledge(
     query: str,
     top_k: int = 3,
-    document_type: Optional[str] = Query(None, description="Filter by document type")
+    document_type: Optional[str] = Query(None, description="Filter by document type"),
+    debug: bool = Query(False, description="Include per-stage timing spans in the response"),
+    store_name: str = Query("default", description="Name of the vector store to query"),
+    fields: Optional[str] = Query(None, description="Comma-separated result fields to return, e.g. chunk_id,score,metadata.title"),
+    snippet_chars: Optional[int] = Query(None, ge=1, description="Shorten each result's text to about this many characters")
 ):
     """
     RAG endpoint with governance - Retrieve context and generate answer.
@@ -682,41 +566,67 @@ async def query_knowledge(
         query: User's question
         top_k: Number of context chunks to retrieve
         document_type: Filter by document type for compliance
+        debug: Return the request's timing spans under "debug"
+        store_name: Vector store to retrieve from
+        fields: Return only these context fields (chunk_id, text, metadata, score, metadata.<key>)
+        snippet_chars: Return each context's text shortened to about this many characters
     """
-    logger.info(f"Query request: '{query}' (top_k={top_k}, document_type={document_type})")
+    logger.info("Query request: '%s' (top_k=%s, document_type=%s)", query, top_k, document_type)
+    try:
+        projection = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        # Step 1: Retrieve relevant contexts with filtering
-        contexts = retrieve_context(query, k=top_k, document_type=document_type)
+        # Shed here, before retrieval and a thread are spent on a request that cannot be served in time
+        with start_trace("/query", top_k=top_k) as trace, llm_admission.reserve(PRIORITY_QUERY) as reservation:
+            # Step 1: Retrieve relevant contexts with filtering
+            contexts, index_version = await _run_search(retrieve_context, query, k=top_k, store_name=store_name, document_type=document_type)
+            
+            # Step 2: Generate answer using GPT (queued behind interactive chat when busy)
+            result = await _run_admitted(reservation, generate_answer, query, contexts) if contexts else None
         
-        if not contexts:
+        if result is None:
             logger.warning("No relevant documents found")
-            return {
+            response = {
                 "status": "success",
                 "query": query,
                 "answer": "No relevant documents found in the knowledge base.",
-                "contexts": []
+                "contexts": [],
+                "index_version": index_version
             }
-        
-        # Step 2: Generate answer using GPT
-        result = generate_answer(query, contexts)
+            if debug:
+                response["debug"] = {"trace": trace.to_dict()}
+            return response
         
         logger.info("Query completed successfully")
         
         # Step 3: Return complete response
-        return {
+        response = {
             "status": "success",
             "query": query,
             "answer": result["answer"],
-            "contexts": result["contexts"],
+            "contexts": project_results(result["contexts"], projection, snippet_chars),
             "metadata": {
                 "contexts_used": result["contexts_used"],
                 "model": result["model"],
                 "document_type_filter": document_type
-            }
+            },
+            "index_version": index_version
         }
+        if debug:
+            response["debug"] = {"trace": trace.to_dict()}
+        return response
+    except OverloadedError as e:
+        raise _overloaded(e)
+    except CircuitOpenError as e:
+        logger.warning("Query rejected: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after_s))})
+    except DeadlineExceededError as e:
+        logger.error("Query timed out: %s", e)
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        logger.error(f"Query failed: {str(e)}")
+        logger.error("Query failed: %s", str(e))
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -28,6 +28,7 @@ class ChatRequest(BaseModel):
     session_id: Optional[str]= None
     message:str
     topic: Optional[str]=None 
+    debug: bool=False
 
 class ChatResponse(BaseModel):
     session_id:str
@@ -35,6 +36,8 @@ class ChatResponse(BaseModel):
     topic: Optional[str]
     sources: List[dict]=[]
     available_topics: List[str]=[]
+    index_version: Optional[int]=None
+    debug: Optional[dict]=None
 
 
 
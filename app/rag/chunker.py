@@ -1,4 +1,5 @@
-from typing import List
+from collections import deque
+from typing import Iterable, Iterator, List
 
 def chunk_text(
     text:str,
@@ -17,17 +18,51 @@ def chunk_text(
     List of text chunks
     """
 
-    words=text.split()
-    chunks=[]
+    return list(stream_chunks(text.split(), chunk_size, overlap))
 
-    start=0
-    while start < len(words):
-        end=start+chunk_size
-        chunk=" ".join(words[start:end])
-        chunks.append(chunk)
-        start=end-overlap
 
-    return chunks
+def iter_words(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    Split a stream of text pieces into words as if they were one string.
+
+    A word cut across two pieces is carried over, so only one piece is held
+    in memory at a time.
+    """
+    carry = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        text = carry + piece
+        words = text.split()
+        carry = "" if text[-1].isspace() or not words else words.pop()
+        yield from words
+    if carry:
+        yield carry
 
 
+def stream_chunks(
+    words: Iterable[str],
+    chunk_size: int = 500,
+    overlap: int = 100,
+) -> Iterator[str]:
+    """
+    Yield the same chunks as ``chunk_text`` from a stream of words,
+    holding at most ``chunk_size`` words.
+    """
+    step = chunk_size - overlap
+    if step <= 0:
+        raise ValueError("overlap must be smaller than chunk_size")
+
+    window = deque()
+    for word in words:
+        window.append(word)
+        if len(window) == chunk_size:
+            yield " ".join(window)
+            for _ in range(step):
+                window.popleft()
 
+    # Trailing windows shorter than chunk_size, as chunk_text produces them
+    while window:
+        yield " ".join(window)
+        for _ in range(min(step, len(window))):
+            window.popleft()
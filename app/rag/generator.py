@@ -1,19 +1,17 @@
-import os
 from typing import List, Dict
-from dotenv import load_dotenv
-from openai import AzureOpenAI
+from app.config import AZURE_OPENAI_CHAT_DEPLOYMENT, COALESCE_COMPLETIONS
+from app.utils.admission import PRIORITY_QUERY, llm_admission
 from app.utils.logger import get_logger
+from app.utils.metrics import record_usage, stage_timer
+from app.utils.openai_client import get_openai_client
+from app.utils.resilience import completion_policy
+from app.utils.singleflight import SingleFlight, normalize_query
+from app.utils.tracing import annotate, traced
 
 logger = get_logger(__name__)
 
-load_dotenv()
-
-# Initialize Azure OpenAI client
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-)
+# Identical questions over identical contexts can share one completion (COALESCE_COMPLETIONS)
+_inflight = SingleFlight("completion")
 
 def build_prompt(query: str, contexts: List[Dict]) -> str:
     """Build a prompt for the LLM using retrieved contexts."""
@@ -33,36 +31,56 @@ Answer:"""
     
     return prompt
 
+@traced("generate_answer")
 def generate_answer(query: str, contexts: List[Dict]) -> Dict:
     """Generate an answer using Azure OpenAI GPT."""
-    deployment = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT")
+    if COALESCE_COMPLETIONS:
+        # The retrieved chunk ids stand in for topic, k and index version
+        key = (normalize_query(query), tuple(ctx.get("chunk_id", "") for ctx in contexts))
+        return _inflight.do(key, _generate_answer, query, contexts)
+    return _generate_answer(query, contexts)
+
+def _generate_answer(query: str, contexts: List[Dict]) -> Dict:
+    deployment = AZURE_OPENAI_CHAT_DEPLOYMENT
     
-    logger.info(f"Generating answer for query: '{query[:50]}...'")
-    logger.info(f"Using {len(contexts)} context chunks")
+    logger.debug("Generating answer for query: '%s...'", query[:50])
+    logger.debug("Using %s context chunks", len(contexts))
     
     # Build the prompt
-    prompt = build_prompt(query, contexts)
+    with stage_timer("prompt_build"):
+        prompt = build_prompt(query, contexts)
     
     # Call Azure OpenAI
-    logger.info(f"Calling Azure OpenAI model: {deployment}")
-    response = client.chat.completions.create(
-        model=deployment,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a helpful assistant that answers questions based on provided context. Be concise and accurate."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        temperature=0.7,
-        max_tokens=500
+    logger.debug("Calling Azure OpenAI model: %s", deployment)
+    with llm_admission.slot(PRIORITY_QUERY), stage_timer("llm"):
+        response = completion_policy.call(
+            lambda timeout: get_openai_client().chat.completions.create(
+                model=deployment,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a helpful assistant that answers questions based on provided context. Be concise and accurate."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.7,
+                max_tokens=500,
+                timeout=timeout
+            )
+        )
+    usage = getattr(response, "usage", None)
+    record_usage(usage)
+    annotate(
+        contexts=len(contexts),
+        prompt_bytes=len(prompt.encode("utf-8")),
+        tokens=getattr(usage, "total_tokens", None)
     )
     
     answer = response.choices[0].message.content
-    logger.info(f"Generated answer ({len(answer)} characters)")
+    logger.debug("Generated answer (%s characters)", len(answer))
     
     # Convert contexts to JSON-serializable format
     serializable_contexts = []
@@ -1,16 +1,43 @@
-from typing import List, Dict, Optional
-from app.indexing.embeddings import embed_texts
-from app.indexing.vector_store import VectorStore
+import logging
+from typing import List, Dict, Optional, Tuple
+from app.config import COALESCE_SEARCHES
+from app.indexing.embeddings import embed_query
+from app.indexing.sharded_store import open_store, search_store
 from app.utils.logger import get_logger
+from app.utils.metrics import stage_timer
+from app.utils.singleflight import SingleFlight, normalize_query
+from app.utils.tracing import annotate, traced
 
 logger = get_logger(__name__)
 
+# Concurrent identical retrievals share one embedding call and one search
+_inflight = SingleFlight("retrieve")
+
+def _search(store, query: str, k: int, document_type: Optional[str]) -> Tuple[List[Dict], Optional[int]]:
+    # Generate query embedding with the provider that built the store
+    query_embedding = embed_query(query, provider=store.provider)
+    
+    # Get more results if filtering by type
+    search_k = k * 3 if document_type else k
+    with stage_timer("search"):
+        contexts = search_store(store, query_embedding, search_k, document_type)
+    
+    # Filter by document type if specified
+    if document_type:
+        with stage_timer("filter"):
+            contexts = [
+                c for c in contexts 
+                if c.get("metadata", {}).get("document_type") == document_type
+            ][:k]
+    return contexts, store.version
+
+@traced("retrieve_context")
 def retrieve_context(
     query: str,
     k: int = 5,
     store_name: str = "default",
     document_type: Optional[str] = None
-) -> List[Dict]:
+) -> Tuple[List[Dict], Optional[int]]:
     """
     Retrieve relevant context chunks for a query.
     
@@ -21,34 +48,30 @@ def retrieve_context(
         document_type: Filter by document type
         
     Returns:
-        List of relevant chunks with metadata
+        Relevant chunks with metadata, and the version of the store they came from
     """
-    logger.info(f"Retrieving context for query: '{query[:50]}...' (k={k}, type={document_type})")
+    logger.debug("Retrieving context for query: '%s...' (k=%s, type=%s)", query[:50], k, document_type)
     
     # Load vector store
-    store = VectorStore()
-    if not store.load(store_name):
-        logger.error(f"Vector store '{store_name}' not found")
+    store = open_store(store_name)
+    if store is None:
+        logger.error("Vector store '%s' not found", store_name)
         raise ValueError(f"Vector store '{store_name}' not found. Build index first.")
     
-    # Generate query embedding
-    query_embedding = embed_texts([query])[0]
-    
-    # Get more results if filtering by type
-    search_k = k * 3 if document_type else k
-    contexts = store.search(query_embedding, search_k)
-    
-    # Filter by document type if specified
-    if document_type:
-        contexts = [
-            c for c in contexts 
-            if c.get("metadata", {}).get("document_type") == document_type
-        ][:k]
+    if COALESCE_SEARCHES:
+        key = (store_name, store.version, normalize_query(query), document_type, k)
+        contexts, version = _inflight.do(key, _search, store, query, k, document_type)
+        # Coalesced callers share the result; each gets its own list
+        contexts = list(contexts)
+    else:
+        contexts, version = _search(store, query, k, document_type)
     
-    logger.info(f"Retrieved {len(contexts)} relevant contexts")
+    logger.debug("Retrieved %s relevant contexts", len(contexts))
+    annotate(k=k, search_k=k * 3 if document_type else k, document_type=document_type, results=len(contexts), index_version=version)
     
     # Log which documents were used
-    doc_ids = set(c.get("metadata", {}).get("document_id", "unknown") for c in contexts)
-    logger.info(f"Context from {len(doc_ids)} unique documents: {list(doc_ids)[:3]}...")
+    if logger.isEnabledFor(logging.DEBUG):
+        doc_ids = set(c.get("metadata", {}).get("document_id", "unknown") for c in contexts)
+        logger.debug("Context from %s unique documents: %s...", len(doc_ids), list(doc_ids)[:3])
     
-    return contexts
\ No newline at end of file
+    return contexts, version
\ No newline at end of file
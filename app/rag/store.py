@@ -1,22 +1,137 @@
 import json
-from typing import List, Dict
+import sqlite3
+import threading
+import uuid
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
 from pathlib import Path
 from datetime import datetime
 
+from app.config import CHUNK_DB_PATH
+
+# Chunks were stored as one JSON file per document before the repository existed
 DATA_DIR = Path("data/chunks")
-DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    document_id TEXT PRIMARY KEY,
+    document_type TEXT,
+    approved INTEGER NOT NULL,
+    metadata TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_type_approved ON documents (document_type, approved);
+CREATE INDEX IF NOT EXISTS documents_approved ON documents (approved, document_type);
+CREATE TABLE IF NOT EXISTS chunks (
+    document_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    chunk_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (document_id, seq)
+) WITHOUT ROWID;
+"""
+
+# Chunks written per transaction while a document is staged
+_STAGING_BATCH = 256
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect() -> sqlite3.Connection:
+    """Per-thread connection; WAL lets readers run while a document is written."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        Path(CHUNK_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CHUNK_DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+        _ensure_schema(conn)
+    return conn
+
+
+def _ensure_schema(conn: sqlite3.Connection):
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        conn.executescript(_SCHEMA)
+        # user_version 1 marks the one-time import of legacy JSON chunk files as done
+        if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            _import_legacy_files(conn)
+            conn.execute("PRAGMA user_version = 1")
+        _initialized = True
+
+
+def _import_legacy_files(conn: sqlite3.Connection):
+    if not DATA_DIR.is_dir():
+        return
+    for chunk_file in DATA_DIR.glob("*.json"):
+        with open(chunk_file, "r") as f:
+            records = json.load(f)
+        if records:
+            _write_document(conn, chunk_file.stem, records[0].get("metadata", {}), records)
+
+
+def _write_document(conn: sqlite3.Connection, document_id: str, metadata: Dict, records: Iterable[Dict]) -> int:
+    """
+    Replace a document; ``records`` is consumed lazily.
+
+    Chunks are staged under a private document id in small transactions, so
+    the write lock is not held while a generator extracts and chunks the file;
+    one short final transaction swaps them in. Staged rows have no documents
+    row and are therefore invisible to readers.
+    """
+    staging_id = f"{document_id}#staging-{uuid.uuid4().hex}"
+    rows = (
+        (staging_id, i, record["chunk_id"], record["text"])
+        for i, record in enumerate(records)
+    )
+    count = 0
+    try:
+        while True:
+            # Pull the batch before taking the lock
+            batch = list(islice(rows, _STAGING_BATCH))
+            if not batch:
+                break
+            with conn:
+                conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", batch)
+            count += len(batch)
+        with conn:
+            conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            conn.execute("UPDATE chunks SET document_id = ? WHERE document_id = ?", (document_id, staging_id))
+            conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    document_id,
+                    metadata.get("document_type"),
+                    int(bool(metadata.get("approved", False))),
+                    json.dumps(metadata),
+                    count,
+                    datetime.utcnow().isoformat(),
+                ),
+            )
+    except BaseException:
+        with conn:
+            conn.execute("DELETE FROM chunks WHERE document_id = ?", (staging_id,))
+        raise
+    return count
+
 
 def save_chunks(
     document_id: str,
-    chunks: List[str],
+    chunks: Iterable[str],
     metadata: Dict
 ):
     """
-    Save document chunks to local JSON storage.
+    Save document chunks to the chunk repository, replacing any earlier version.
     
     Args:
         document_id: Unique document identifier
-        chunks: List of text chunks
+        chunks: Text chunks; a generator is written as it is consumed
         metadata: Document metadata
         
     Returns:
@@ -30,15 +145,109 @@ def save_chunks(
         else:
             serializable_metadata[key] = value
     
-    records = []
-    for i, chunk in enumerate(chunks):
-        records.append({
-            "chunk_id": f"{document_id}_chunk_{i}",
-            "text": chunk,
-            "metadata": serializable_metadata
-        })
-
-    with open(DATA_DIR / f"{document_id}.json", "w") as f:
-        json.dump(records, f, indent=2)
-
-    return len(records)
\ No newline at end of file
+    records = (
+        {"chunk_id": f"{document_id}_chunk_{i}", "text": chunk}
+        for i, chunk in enumerate(chunks)
+    )
+
+    return _write_document(_connect(), document_id, serializable_metadata, records)
+
+def iter_chunks(
+    approved_only: bool = True,
+    document_type: Optional[str] = None,
+    document_id: Optional[str] = None,
+    document_ids: Optional[Iterable[str]] = None
+) -> Iterator[Dict]:
+    """
+    Stream chunks matching the filters; only matching documents are read.
+    
+    ``document_ids`` restricts the scan to those documents (an empty list
+    matches none). Yields chunk dicts of the form {"chunk_id", "text", "metadata"}.
+    """
+    clauses, params = [], []
+    if approved_only:
+        clauses.append("d.approved = 1")
+    if document_type:
+        clauses.append("d.document_type = ?")
+        params.append(document_type)
+    if document_id:
+        clauses.append("d.document_id = ?")
+        params.append(document_id)
+    if document_ids is not None:
+        # One JSON parameter instead of one placeholder per id (SQLite caps those)
+        clauses.append("d.document_id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(document_ids)))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    cursor = _connect().execute(
+        f"SELECT d.document_id, d.metadata, c.chunk_id, c.text "
+        f"FROM documents d JOIN chunks c ON c.document_id = d.document_id {where} "
+        f"ORDER BY d.document_id, c.seq",
+        params,
+    )
+    current_id, metadata = None, None
+    for row_document_id, metadata_json, chunk_id, text in cursor:
+        if row_document_id != current_id:
+            # Decode each document's metadata once, not once per chunk
+            current_id, metadata = row_document_id, json.loads(metadata_json)
+        yield {"chunk_id": chunk_id, "text": text, "metadata": dict(metadata)}
+
+def load_chunks(document_id: str) -> Optional[List[Dict]]:
+    """Return the stored chunks of a document, or None if it does not exist."""
+    chunks = list(iter_chunks(approved_only=False, document_id=document_id))
+    if not chunks and not document_exists(document_id):
+        return None
+    return chunks
+
+def document_metadata(approved_only: bool = True) -> Dict[str, Dict]:
+    """Metadata of every (approved) document keyed by document_id; no chunks are read."""
+    query = "SELECT document_id, metadata FROM documents"
+    if approved_only:
+        query += " WHERE approved = 1"
+    return {document_id: json.loads(metadata) for document_id, metadata in _connect().execute(query)}
+
+def document_exists(document_id: str) -> bool:
+    row = _connect().execute("SELECT 1 FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+    return row is not None
+
+def document_chunk_count(document_id: str) -> int:
+    """Chunks currently stored for a document (0 if it does not exist)."""
+    row = _connect().execute("SELECT chunk_count FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+    return row[0] if row else 0
+
+def delete_chunks(document_id: str) -> bool:
+    """Delete a document's chunks. Returns False if there were none."""
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+        deleted = conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,)).rowcount
+    # Also drop a legacy file so it is not mistaken for a live document
+    (DATA_DIR / f"{document_id}.json").unlink(missing_ok=True)
+    return deleted > 0
+
+def count_chunks(approved_only: bool = True, document_type: Optional[str] = None) -> int:
+    """Number of chunks ``iter_chunks`` would yield, from the per-document counts."""
+    clauses, params = [], []
+    if approved_only:
+        clauses.append("approved = 1")
+    if document_type:
+        clauses.append("document_type = ?")
+        params.append(document_type)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return _connect().execute(f"SELECT COALESCE(SUM(chunk_count), 0) FROM documents {where}", params).fetchone()[0]
+
+def unapproved_chunk_counts(document_type: Optional[str] = None) -> Dict[str, int]:
+    """Chunk counts of unapproved documents, keyed by document_id."""
+    query = "SELECT document_id, chunk_count FROM documents WHERE approved = 0"
+    params = []
+    if document_type:
+        query += " AND document_type = ?"
+        params.append(document_type)
+    return dict(_connect().execute(query, params).fetchall())
+
+def list_document_types(approved_only: bool = True) -> List[str]:
+    """Distinct document types, answered from the metadata index."""
+    query = "SELECT DISTINCT document_type FROM documents WHERE document_type IS NOT NULL"
+    if approved_only:
+        query += " AND approved = 1"
+    return [row[0] for row in _connect().execute(query + " ORDER BY document_type")]
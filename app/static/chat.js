@@ -0,0 +1,164 @@
+let sessionId = null;
+let selectedFile = null;
+const API_URL = 'http://127.0.0.1:8000';
+
+// Initialize
+async function init() {
+    // Create session
+    const sessionRes = await fetch(`${API_URL}/chat/session`, { method: 'POST' });
+    const sessionData = await sessionRes.json();
+    sessionId = sessionData.session_id;
+
+    // Load topics
+    await loadTopics();
+}
+
+async function loadTopics() {
+    const topicsRes = await fetch(`${API_URL}/chat/topics`);
+    const topicsData = await topicsRes.json();
+
+    const select = document.getElementById('topicSelect');
+    select.innerHTML = '<option value="">All Topics</option>';
+    topicsData.topics.forEach(topic => {
+        const option = document.createElement('option');
+        option.value = topic;
+        option.textContent = topic;
+        select.appendChild(option);
+    });
+}
+
+function handleFileSelect(event) {
+    selectedFile = event.target.files[0];
+    const fileName = document.getElementById('fileName');
+    const uploadBtn = document.getElementById('uploadBtn');
+
+    if (selectedFile) {
+        fileName.textContent = selectedFile.name;
+        uploadBtn.disabled = false;
+    } else {
+        fileName.textContent = 'No file selected';
+        uploadBtn.disabled = true;
+    }
+}
+
+async function uploadDocument() {
+    if (!selectedFile) return;
+
+    const uploadBtn = document.getElementById('uploadBtn');
+    const docTitle = document.getElementById('docTitle').value || selectedFile.name;
+
+    uploadBtn.disabled = true;
+    uploadBtn.textContent = 'Uploading...';
+
+    addMessage('system', `📤 Uploading "${docTitle}"...`);
+
+    try {
+        const formData = new FormData();
+        formData.append('file', selectedFile);
+
+        const response = await fetch(
+            `${API_URL}/documents/upload-and-index?title=${encodeURIComponent(docTitle)}&document_type=General&approved=true&approved_by=chat_user`,
+            {
+                method: 'POST',
+                body: formData
+            }
+        );
+
+        const data = await response.json();
+
+        if (response.ok) {
+            addMessage('system', `✅ "${docTitle}" uploaded and indexed! You can now ask questions about it.`);
+
+            // Reload topics
+            await loadTopics();
+
+            // Clear file input
+            document.getElementById('fileInput').value = '';
+            document.getElementById('fileName').textContent = 'No file selected';
+            document.getElementById('docTitle').value = '';
+            selectedFile = null;
+        } else {
+            addMessage('system', `❌ Upload failed: ${data.detail}`);
+        }
+
+    } catch (error) {
+        addMessage('system', '❌ Upload failed. Please try again.');
+        console.error(error);
+    } finally {
+        uploadBtn.disabled = false;
+        uploadBtn.textContent = 'Upload';
+    }
+}
+
+function addMessage(role, content, sources = []) {
+    const messagesDiv = document.getElementById('chatMessages');
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${role}`;
+
+    let sourcesHTML = '';
+    if (sources && sources.length > 0) {
+        sourcesHTML = '<div class="sources"> Sources: ' + 
+            sources.map(s => s.document_title).join(', ') + 
+            '</div>';
+    }
+
+    messageDiv.innerHTML = `
+        <div class="message-content">
+            ${content}
+            ${sourcesHTML}
+        </div>
+    `;
+
+    messagesDiv.appendChild(messageDiv);
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+}
+
+async function sendMessage() {
+    const input = document.getElementById('messageInput');
+    const message = input.value.trim();
+
+    if (!message) return;
+
+    const topic = document.getElementById('topicSelect').value;
+    const sendBtn = document.getElementById('sendBtn');
+    const loading = document.getElementById('loading');
+
+    // Disable input
+    input.disabled = true;
+    sendBtn.disabled = true;
+    loading.style.display = 'block';
+
+    // Add user message
+    addMessage('user', message);
+    input.value = '';
+
+    try {
+        // Send to API
+        const response = await fetch(`${API_URL}/chat/message`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                session_id: sessionId,
+                message: message,
+                topic: topic || null
+            })
+        });
+
+        const data = await response.json();
+
+        // Add assistant response
+        addMessage('assistant', data.message, data.sources);
+
+    } catch (error) {
+        addMessage('assistant', '❌ Sorry, I encountered an error. Please try again.');
+        console.error(error);
+    } finally {
+        input.disabled = false;
+        sendBtn.disabled = false;
+        loading.style.display = 'none';
+        input.focus();
+    }
+}
+
+// Initialize on load
+init();
@@ -0,0 +1,203 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.config import LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_S
+from app.utils.logger import get_logger
+from app.utils.metrics import LLM_ADMISSIONS, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT
+from app.utils.tracing import annotate
+
+logger = get_logger(__name__)
+
+# Lower value is served first: interactive chat ahead of batch /query
+PRIORITY_CHAT = 0
+PRIORITY_QUERY = 1
+_PRIORITY_NAMES = {PRIORITY_CHAT: "chat", PRIORITY_QUERY: "query"}
+
+# Weight of the newest sample in the moving average of slot hold times
+_SERVICE_TIME_ALPHA = 0.2
+
+
+class OverloadedError(RuntimeError):
+    """Raised instead of queueing a request that could not be served in time."""
+
+    def __init__(self, reason: str, retry_after_s: float):
+        super().__init__(f"Too many pending LLM requests ({reason}); retry in {retry_after_s:.0f}s")
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class _Waiter:
+    __slots__ = ("priority", "event", "granted")
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.event = threading.Event()
+        self.granted = False
+
+
+class Reservation:
+    """A request's place in an AdmissionController, claimed before it gets a thread."""
+
+    def __init__(self, controller: "AdmissionController", priority: int):
+        self.controller = controller
+        self.priority = priority
+        # Set once the request runs on a worker thread, which then releases it
+        self.handed_off = False
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._unreserve(self.priority)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc):
+        if not self.handed_off:
+            self.release()
+
+
+class AdmissionController:
+    """
+    Bounded, priority-ordered admission to a limited number of concurrent slots.
+
+    Requests first ``reserve`` a place on the event loop, before a worker
+    thread is spent on them: at most ``max_concurrency + max_queue`` requests
+    are reserved at once, and one whose estimated wait exceeds
+    ``queue_timeout_s`` is shed right away. Inside the request, ``slot``
+    waits for one of ``max_concurrency`` slots in a heap ordered by
+    (priority, arrival) and rejects a request that waited too long after all.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout_s: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._heap: List = []
+        self._queued: Dict[int, int] = {}
+        self._seq = itertools.count()
+        self._reserved: Dict[int, int] = {}
+        self._service_time_s: Optional[float] = None
+
+    def reserve(self, priority: int = PRIORITY_QUERY) -> Reservation:
+        """
+        Claim a place for a request or raise OverloadedError. Use as a context
+        manager; after ``handed_off`` is set the worker must ``release`` it.
+        """
+        label = _PRIORITY_NAMES.get(priority, str(priority))
+        with self._lock:
+            total = sum(self._reserved.values())
+            if total >= self.max_concurrency + self.max_queue:
+                self._reject(label, "queue_full", self._estimate_reserved(priority) or self.queue_timeout_s)
+            estimate = self._estimate_reserved(priority)
+            if estimate > self.queue_timeout_s:
+                self._reject(label, "deadline", estimate)
+            self._reserved[priority] = self._reserved.get(priority, 0) + 1
+        return Reservation(self, priority)
+
+    def _unreserve(self, priority: int):
+        with self._lock:
+            self._reserved[priority] -= 1
+
+    def _estimate_reserved(self, priority: int) -> float:
+        """Wait of a new reservation: requests of equal or higher priority, and busy slots, go first."""
+        if self._service_time_s is None:
+            return 0.0
+        ahead = sum(count for p, count in self._reserved.items() if p <= priority)
+        ahead = max(ahead, min(sum(self._reserved.values()), self.max_concurrency))
+        if ahead < self.max_concurrency:
+            return 0.0
+        return ((ahead - self.max_concurrency) // self.max_concurrency + 1) * self._service_time_s
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_QUERY):
+        """Hold one slot for the duration of the block."""
+        label = _PRIORITY_NAMES.get(priority, str(priority))
+        start = time.monotonic()
+        self._acquire(priority, label)
+        waited = time.monotonic() - start
+        LLM_QUEUE_WAIT.observe(waited, priority=label)
+        LLM_ADMISSIONS.inc(priority=label, outcome="admitted")
+        annotate(queue_wait_ms=round(waited * 1000, 3))
+
+        held_from = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - held_from)
+
+    def estimated_wait(self, priority: int) -> float:
+        """Seconds a new request of ``priority`` would wait, 0 until hold times are known."""
+        with self._lock:
+            return self._estimate(priority)
+
+    def _estimate(self, priority: int) -> float:
+        if self._service_time_s is None:
+            return 0.0
+        ahead = sum(count for p, count in self._queued.items() if p <= priority)
+        return (ahead // self.max_concurrency + 1) * self._service_time_s
+
+    def _reject(self, label: str, reason: str, retry_after_s: float):
+        LLM_ADMISSIONS.inc(priority=label, outcome=f"rejected_{reason}")
+        logger.warning("Shedding %s request: %s", label, reason)
+        raise OverloadedError(reason, max(math.ceil(retry_after_s), 1))
+
+    def _acquire(self, priority: int, label: str):
+        with self._lock:
+            if self._in_flight < self.max_concurrency and not self._heap:
+                self._in_flight += 1
+                LLM_IN_FLIGHT.set(self._in_flight)
+                return
+            if len(self._heap) >= self.max_queue:
+                self._reject(label, "queue_full", self._estimate(priority) or self.queue_timeout_s)
+            estimate = self._estimate(priority)
+            if estimate > self.queue_timeout_s:
+                self._reject(label, "deadline", estimate)
+
+            waiter = _Waiter(priority)
+            entry = (priority, next(self._seq), waiter)
+            heapq.heappush(self._heap, entry)
+            self._set_queued(priority, 1)
+
+        if waiter.event.wait(self.queue_timeout_s):
+            return
+        with self._lock:
+            if waiter.granted:
+                # Handed a slot just as the wait timed out
+                return
+            self._heap.remove(entry)
+            heapq.heapify(self._heap)
+            self._set_queued(priority, -1)
+        self._reject(label, "timeout", self.queue_timeout_s)
+
+    def _release(self, held_s: float):
+        with self._lock:
+            if self._service_time_s is None:
+                self._service_time_s = held_s
+            else:
+                self._service_time_s += _SERVICE_TIME_ALPHA * (held_s - self._service_time_s)
+
+            if self._heap:
+                # Hand the slot straight to the next waiter; in-flight is unchanged
+                _, _, waiter = heapq.heappop(self._heap)
+                self._set_queued(waiter.priority, -1)
+                waiter.granted = True
+                waiter.event.set()
+                return
+            self._in_flight -= 1
+            LLM_IN_FLIGHT.set(self._in_flight)
+
+    def _set_queued(self, priority: int, delta: int):
+        self._queued[priority] = self._queued.get(priority, 0) + delta
+        LLM_QUEUE_DEPTH.set(self._queued[priority], priority=_PRIORITY_NAMES.get(priority, str(priority)))
+
+
+llm_admission = AdmissionController(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_S)
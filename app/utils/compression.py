@@ -0,0 +1,118 @@
+import gzip
+from typing import Dict, List, Optional
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+from app.config import COMPRESSION_LEVEL, COMPRESSION_MIN_BYTES
+
+# Body types worth compressing; images and archives are already compressed
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript")
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this process can produce, most preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts (ignoring q-values other than q=0)."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip())
+    for encoding in supported_encodings():
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=min(COMPRESSION_LEVEL, 11))
+    return gzip.compress(body, compresslevel=min(COMPRESSION_LEVEL, 9), mtime=0)
+
+
+def precompress(body: bytes) -> Dict[Optional[str], bytes]:
+    """All encodings of a static body, computed once (highest quality)."""
+    variants = {None: body}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    return variants
+
+
+class CompressionMiddleware:
+    """
+    Compress complete responses of at least ``minimum_size`` bytes with
+    brotli (when installed) or gzip, based on the request's Accept-Encoding.
+
+    Streaming responses and responses that already carry a Content-Encoding
+    are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._should_compress(start_message, body):
+                # Streaming or not worth it: send as is from here on
+                passthrough = True
+                await send(start_message)
+                start_message = None
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            response_headers = [
+                (name, value) for name, value in start_message["headers"]
+                if name.lower() not in (b"content-length", b"vary")
+            ]
+            vary = [value for name, value in start_message["headers"] if name.lower() == b"vary"]
+            response_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"]) if vary else b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": response_headers})
+            start_message = None
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, start_message, body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        headers = {name.lower(): value for name, value in start_message["headers"]}
+        if b"content-encoding" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        return content_type.startswith(_COMPRESSIBLE_TYPES)
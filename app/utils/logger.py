@@ -1,21 +1,80 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 from datetime import datetime
 from pathlib import Path
 
+from app.config import LOG_LEVEL, SLOW_TRACE_LOG
+
 # Create logs directory
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(exist_ok=True)
 
-# Configure logging with a simpler format to avoid % issues
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_DIR / f"rag_system_{datetime.now().strftime('%Y%m%d')}.log"),
-        logging.StreamHandler()
-    ]
-)
+# Records on this logger go only to the slow-request JSONL file
+SLOW_TRACE_LOGGER = "rag.slow_requests"
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra=`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records untouched so message formatting happens on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _configure():
+    file_handler = logging.FileHandler(LOG_DIR / f"rag_system_{datetime.now().strftime('%Y%m%d')}.log")
+    file_handler.setFormatter(JsonFormatter())
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    for handler in (file_handler, stream_handler):
+        handler.addFilter(lambda record: record.name != SLOW_TRACE_LOGGER)
+
+    Path(SLOW_TRACE_LOG).parent.mkdir(parents=True, exist_ok=True)
+    slow_handler = logging.FileHandler(SLOW_TRACE_LOG, delay=True)
+    slow_handler.setFormatter(logging.Formatter("%(message)s"))
+    slow_handler.addFilter(logging.Filter(SLOW_TRACE_LOGGER))
+    logging.getLogger(SLOW_TRACE_LOGGER).setLevel(logging.INFO)
+
+    # Request threads only put records on the queue; the listener thread does the I/O
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, slow_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [_LazyQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+
+    # The HTTP client logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+_configure()
 
 def get_logger(name: str):
     """Get a logger instance for a module."""
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import (
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_ENDPOINT,
+    OPENAI_CONNECT_TIMEOUT_S,
+    OPENAI_KEEPALIVE_EXPIRY_S,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_TIMEOUT_S,
+)
+
+_client = None
+# The pooled httpx client behind _client (None for injected clients)
+_http_client = None
+_lock = threading.Lock()
+
+def get_openai_client():
+    """
+    Return the process-wide Azure OpenAI client, creating it on first use.
+
+    All modules share one client, and so one pooled keep-alive HTTP
+    connection pool. openai and httpx are only imported here, so importing
+    the app does not pay for them.
+    """
+    global _client, _http_client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import httpx
+                from openai import AzureOpenAI
+
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_S,
+                    ),
+                    timeout=httpx.Timeout(OPENAI_TIMEOUT_S, connect=OPENAI_CONNECT_TIMEOUT_S),
+                )
+                _client = AzureOpenAI(
+                    api_key=AZURE_OPENAI_API_KEY,
+                    api_version=AZURE_OPENAI_API_VERSION,
+                    azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                    http_client=http_client,
+                    # Retries are handled by app.utils.resilience
+                    max_retries=0,
+                )
+                _http_client = http_client
+    return _client
+
+def prime_openai_client(connections: int = 1) -> int:
+    """
+    Open up to ``connections`` keep-alive connections (TCP + TLS) to the
+    Azure endpoint ahead of the first real request.
+
+    Any HTTP response counts; only connection failures are errors. Returns
+    the number of connections opened (0 for an injected client).
+    """
+    get_openai_client()
+    http_client = _http_client
+    if http_client is None or not AZURE_OPENAI_ENDPOINT:
+        return 0
+    # Concurrent requests so the pool keeps several idle connections
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        responses = list(pool.map(lambda _: http_client.get(AZURE_OPENAI_ENDPOINT), range(connections)))
+    return len(responses)
+
+def set_openai_client(client):
+    """Replace the shared client, e.g. with a local fake for benchmarks."""
+    global _client, _http_client
+    with _lock:
+        _client = client
+        _http_client = None
+
+def close_openai_client():
+    """Close pooled connections; the next call creates a fresh client."""
+    global _client, _http_client
+    with _lock:
+        client, _client = _client, None
+        _http_client = None
+    if client is not None and hasattr(client, "close"):
+        client.close()
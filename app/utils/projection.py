@@ -0,0 +1,62 @@
+from typing import Dict, List, Optional
+
+RESULT_FIELDS = ("chunk_id", "text", "metadata", "similarity_score")
+_FIELD_ALIASES = {"score": "similarity_score", "id": "chunk_id"}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a ``fields=chunk_id,score,metadata.title`` projection.
+
+    Raises:
+        ValueError: if a field is not a result field or ``metadata.<key>``
+    """
+    if not fields:
+        return None
+    names = [_FIELD_ALIASES.get(name.strip(), name.strip()) for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in RESULT_FIELDS and not name.startswith("metadata.")]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Use {', '.join(RESULT_FIELDS + tuple(_FIELD_ALIASES))} or metadata.<key>"
+        )
+    return names
+
+
+def snippet(text: str, chars: int) -> str:
+    """Shorten ``text`` to about ``chars`` characters, preferring a word boundary."""
+    if len(text) <= chars:
+        return text
+    cut = text[:chars]
+    space = cut.rfind(" ")
+    if space > chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def project_results(
+    results: List[Dict],
+    fields: Optional[List[str]] = None,
+    snippet_chars: Optional[int] = None
+) -> List[Dict]:
+    """Trim search hits to the requested fields and/or a text snippet."""
+    if fields is None and snippet_chars is None:
+        return results
+
+    projected = []
+    for result in results:
+        if snippet_chars is not None and "text" in result:
+            result = {**result, "text": snippet(result["text"], snippet_chars)}
+        if fields is not None:
+            selected = {}
+            for name in fields:
+                if name.startswith("metadata."):
+                    key = name.split(".", 1)[1]
+                    metadata = result.get("metadata") or {}
+                    if key in metadata:
+                        selected.setdefault("metadata", {})[key] = metadata[key]
+                elif name in result:
+                    selected[name] = result[name]
+            result = selected
+        projected.append(result)
+    return projected
@@ -0,0 +1,224 @@
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+
+from app.config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT_S,
+    EMBEDDING_DEADLINE_S,
+    EMBEDDING_HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    LLM_DEADLINE_S,
+    LLM_HEDGE_PERCENTILE,
+    UPSTREAM_BACKOFF_BASE_S,
+    UPSTREAM_BACKOFF_MAX_S,
+    UPSTREAM_MAX_RETRIES,
+)
+from app.utils.logger import get_logger
+from app.utils.metrics import CIRCUIT_STATE, HEDGED_REQUESTS, UPSTREAM_CALLS
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Retry on throttling, request timeouts and server errors, never on 4xx caller errors
+_RETRYABLE_STATUS = {408, 409, 429}
+_RETRYABLE_NAMES = {"APITimeoutError", "APIConnectionError", "TimeoutException", "ConnectError", "ReadTimeout"}
+
+_hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while a circuit breaker is open."""
+
+    def __init__(self, operation: str, retry_after_s: float):
+        super().__init__(f"Circuit breaker for '{operation}' is open; retry in {retry_after_s:.0f}s")
+        self.operation = operation
+        self.retry_after_s = retry_after_s
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call and its retries did not finish within the deadline."""
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in _RETRYABLE_STATUS or status >= 500
+    return type(error).__name__ in _RETRYABLE_NAMES or isinstance(error, TimeoutError)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one probe through after a cool-down."""
+
+    def __init__(self, operation: str, failure_threshold: int, reset_timeout_s: float):
+        self.operation = operation
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0, operation=operation)
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_timeout_s or self._probing:
+                UPSTREAM_CALLS.inc(operation=self.operation, outcome="circuit_open")
+                raise CircuitOpenError(self.operation, max(self.reset_timeout_s - elapsed, 1.0))
+            # Half-open: allow a single probe request through
+            self._probing = True
+            CIRCUIT_STATE.set(0.5, operation=self.operation)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+            CIRCUIT_STATE.set(0, operation=self.operation)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    logger.warning("Circuit breaker for '%s' opened after %s failures", self.operation, self._failures)
+                self._opened_at = time.monotonic()
+                self._probing = False
+                CIRCUIT_STATE.set(1, operation=self.operation)
+
+
+class ResiliencePolicy:
+    """
+    Deadline, jittered retries, circuit breaking and optional hedging for one
+    kind of upstream call.
+
+    ``call`` takes a function of the per-attempt timeout (seconds) so it can be
+    passed straight to the OpenAI SDK's ``timeout=`` argument.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        deadline_s: float,
+        max_retries: int,
+        backoff_base_s: float,
+        backoff_max_s: float,
+        failure_threshold: int,
+        reset_timeout_s: float,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+    ):
+        self.operation = operation
+        self.deadline_s = deadline_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(operation, failure_threshold, reset_timeout_s)
+        self._latencies = deque(maxlen=500)
+
+    def call(self, fn: Callable[[float], T]) -> T:
+        deadline = time.monotonic() + self.deadline_s
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                UPSTREAM_CALLS.inc(operation=self.operation, outcome="deadline_exceeded")
+                raise DeadlineExceededError(f"'{self.operation}' exceeded its {self.deadline_s}s deadline")
+
+            start = time.monotonic()
+            try:
+                result = self._attempt(fn, remaining)
+            except Exception as e:
+                if not is_retryable(e):
+                    # Caller errors say nothing about upstream health
+                    self.breaker.record_success()
+                    UPSTREAM_CALLS.inc(operation=self.operation, outcome="error")
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    UPSTREAM_CALLS.inc(operation=self.operation, outcome="error")
+                    raise
+                UPSTREAM_CALLS.inc(operation=self.operation, outcome="retry")
+                delay = _retry_after(e) or random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt))
+                if time.monotonic() + delay >= deadline:
+                    UPSTREAM_CALLS.inc(operation=self.operation, outcome="deadline_exceeded")
+                    raise DeadlineExceededError(
+                        f"'{self.operation}' exceeded its {self.deadline_s}s deadline after {attempt + 1} attempts"
+                    ) from e
+                logger.warning("Retrying '%s' in %.2fs after %s (attempt %s)", self.operation, delay, type(e).__name__, attempt + 1)
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            self._latencies.append(time.monotonic() - start)
+            self.breaker.record_success()
+            UPSTREAM_CALLS.inc(operation=self.operation, outcome="success")
+            return result
+
+    def hedge_delay(self) -> Optional[float]:
+        """Latency percentile after which a hedged request is sent, once enough samples exist."""
+        if not self.hedge_percentile or len(self._latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(int(len(ordered) * self.hedge_percentile / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def _attempt(self, fn: Callable[[float], T], timeout: float) -> T:
+        delay = self.hedge_delay()
+        if delay is None or delay >= timeout:
+            return fn(timeout)
+
+        primary = _hedge_pool.submit(contextvars.copy_context().run, fn, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        hedge = _hedge_pool.submit(contextvars.copy_context().run, fn, max(timeout - delay, 0.001))
+        pending = {primary, hedge}
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    HEDGED_REQUESTS.inc(operation=self.operation, winner="primary" if future is primary else "hedge")
+                    # The slower attempt keeps running; its result is discarded
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+def _policy(operation: str, deadline_s: float, hedge_percentile: Optional[float]) -> ResiliencePolicy:
+    return ResiliencePolicy(
+        operation,
+        deadline_s=deadline_s,
+        max_retries=UPSTREAM_MAX_RETRIES,
+        backoff_base_s=UPSTREAM_BACKOFF_BASE_S,
+        backoff_max_s=UPSTREAM_BACKOFF_MAX_S,
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout_s=CIRCUIT_RESET_TIMEOUT_S,
+        hedge_percentile=hedge_percentile,
+        hedge_min_samples=HEDGE_MIN_SAMPLES,
+    )
+
+completion_policy = _policy("chat_completion", LLM_DEADLINE_S, LLM_HEDGE_PERCENTILE)
+embedding_policy = _policy("embedding", EMBEDDING_DEADLINE_S, EMBEDDING_HEDGE_PERCENTILE)
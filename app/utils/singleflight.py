@@ -0,0 +1,54 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, TypeVar
+
+from app.utils.metrics import COALESCED_REQUESTS
+from app.utils.tracing import annotate
+
+T = TypeVar("T")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, for coalescing keys."""
+    return " ".join(query.split()).casefold()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs ``fn``; callers arriving
+    while it runs wait for and share its result, or its exception. Nothing
+    is cached: the key is forgotten as soon as the leader finishes, so the
+    shared result must be treated as read-only by every caller.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args, **kwargs) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            COALESCED_REQUESTS.inc(group=self.name, role="follower")
+            annotate(coalesced=True)
+            return future.result()
+
+        COALESCED_REQUESTS.inc(group=self.name, role="leader")
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
@@ -0,0 +1,86 @@
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from app.utils.compression import choose_encoding, precompress
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+# Fingerprinted assets never change under the same URL
+_IMMUTABLE = "public, max-age=31536000, immutable"
+# Pages keep a stable URL, so browsers revalidate them with If-None-Match
+_REVALIDATE = "no-cache"
+
+
+class StaticAsset:
+    """One file from app/static, read and compressed once, served with an ETag."""
+
+    def __init__(self, name: str, body: bytes):
+        self.name = name
+        self.media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type.endswith("javascript"):
+            self.media_type += "; charset=utf-8"
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.etag = f'"{self.digest}"'
+        self.variants = precompress(body)
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding in self.variants:
+            headers["Content-Encoding"] = encoding
+        else:
+            encoding = None
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+_assets: Dict[str, StaticAsset] = {}
+
+
+def load_assets(directory: Path = STATIC_DIR) -> Dict[str, StaticAsset]:
+    """
+    Read every static file once. References to ``/static/<name>`` in pages
+    are rewritten to ``/static/<name>?v=<digest>`` so those assets can be
+    cached for good and still change with each deploy.
+    """
+    files = {path.name: path.read_bytes() for path in sorted(directory.iterdir()) if path.is_file()}
+    assets = {name: StaticAsset(name, body) for name, body in files.items() if not name.endswith(".html")}
+
+    def fingerprint(match: re.Match) -> bytes:
+        asset = assets.get(match.group(1).decode("utf-8"))
+        return match.group(0) if asset is None else match.group(0) + f"?v={asset.digest}".encode("utf-8")
+
+    for name, body in files.items():
+        if name.endswith(".html"):
+            assets[name] = StaticAsset(name, re.sub(rb"/static/([\w.-]+)", fingerprint, body))
+
+    _assets.clear()
+    _assets.update(assets)
+    return assets
+
+
+def get_asset(name: str) -> Optional[StaticAsset]:
+    if not _assets:
+        load_assets()
+    return _assets.get(name)
+
+
+def serve_page(request: Request, name: str) -> Response:
+    """An HTML page from app/static, always revalidated by ETag."""
+    return get_asset(name).response(request, _REVALIDATE)
+
+
+def serve_asset(request: Request, name: str) -> Optional[Response]:
+    """A CSS/JS asset; cached for a year when requested by its fingerprinted URL."""
+    asset = get_asset(name)
+    if asset is None or name.endswith(".html"):
+        return None
+    cache_control = _IMMUTABLE if request.query_params.get("v") == asset.digest else _REVALIDATE
+    return asset.response(request, cache_control)
@@ -0,0 +1,126 @@
+import contextvars
+import functools
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.config import SLOW_TRACE_THRESHOLD_MS
+from app.utils.logger import SLOW_TRACE_LOGGER
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_slow_log = logging.getLogger(SLOW_TRACE_LOGGER)
+
+
+class Span:
+    """A timed unit of work with attributes and nested child spans."""
+
+    __slots__ = ("name", "attrs", "children", "start", "end", "origin")
+
+    def __init__(self, name: str, attrs: Dict, origin: Optional[float] = None):
+        self.name = name
+        self.attrs = attrs
+        self.children: List[Span] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        # perf_counter value of the root span, used to report start offsets
+        self.origin = self.start if origin is None else origin
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - self.origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record a child span of the active trace; a no-op outside of a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attrs, origin=parent.origin)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    """Start a root span for a request and log it if it exceeds the slow threshold."""
+    root = Span(name, attrs)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except Exception as e:
+        root.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        root.end = time.perf_counter()
+        _current_span.reset(token)
+        if root.duration_ms >= SLOW_TRACE_THRESHOLD_MS:
+            _write_slow_trace(root)
+
+
+def traced(name: str):
+    """Decorator that wraps a function call in a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attrs):
+    """Attach attributes (sizes, counts, tokens) to the current span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class _SlowTraceLine:
+    """Serializes a finished trace only when the log listener formats it."""
+
+    __slots__ = ("timestamp", "root")
+
+    def __init__(self, root: Span):
+        self.timestamp = datetime.utcnow().isoformat()
+        self.root = root
+
+    def __str__(self) -> str:
+        return json.dumps({"timestamp": self.timestamp, "trace": self.root.to_dict()}, default=str)
+
+
+def _write_slow_trace(root: Span):
+    # Goes through the queued logging pipeline, so no file I/O on the request thread
+    _slow_log.info("%s", _SlowTraceLine(root))
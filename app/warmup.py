@@ -0,0 +1,145 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from app.config import WARMUP_CONNECTIONS, WARMUP_SEARCH, WARMUP_STORES
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PENDING, LOADING, READY, SKIPPED, FAILED = "pending", "loading", "ready", "skipped", "failed"
+
+
+class Readiness:
+    """
+    Per-component warm-up status for the /ready endpoint.
+
+    The instance is ready once warm-up has finished and every required
+    component is ready. Optional components (connection priming, the dummy
+    search) may fail without keeping it out of rotation; their errors are
+    still reported.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict] = {}
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def run(self, name: str, fn: Callable[[], Optional[Dict]], required: bool = True):
+        """Run one warm-up step, recording its status, duration and details."""
+        component = {"status": LOADING, "required": required}
+        with self._lock:
+            self._components[name] = component
+        start = time.perf_counter()
+        try:
+            detail = fn()
+            component["status"] = SKIPPED if detail is None else READY
+            component.update(detail or {})
+        except Exception as e:
+            component["status"] = FAILED
+            component["error"] = f"{type(e).__name__}: {e}"
+            logger.warning("Warm-up step '%s' failed: %s", name, e)
+        component["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    def start(self):
+        self._started = time.perf_counter()
+
+    def finish(self):
+        self._finished = time.perf_counter()
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            components = list(self._components.values())
+        return self._finished is not None and all(
+            c["status"] in (READY, SKIPPED) for c in components if c["required"]
+        )
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            components = {name: dict(c) for name, c in self._components.items()}
+        elapsed = None
+        if self._started is not None:
+            elapsed = round(((self._finished or time.perf_counter()) - self._started) * 1000, 3)
+        return {
+            "ready": self.ready,
+            "warmup": "finished" if self._finished is not None else ("running" if self._started else PENDING),
+            "warmup_ms": elapsed,
+            "components": components,
+        }
+
+
+readiness = Readiness()
+
+
+def _import_modules() -> Dict:
+    import faiss
+    import numpy
+
+    return {"faiss": faiss.__version__, "numpy": numpy.__version__}
+
+
+def _load_assets() -> Dict:
+    from app.utils.static_assets import load_assets
+
+    return {"assets": len(load_assets())}
+
+
+def _load_store(name: str) -> Dict:
+    from app.indexing.sharded_store import open_store
+
+    store = open_store(name)
+    if store is None:
+        # Not built yet: nothing to warm, but nothing to wait for either
+        return {"built": False}
+    stats = store.get_stats()
+    return {"built": True, "version": stats["version"], "vectors": stats["total_vectors"]}
+
+
+def _build_topics() -> Dict:
+    from app.chat.chatbot import get_available_topics
+
+    return {"topics": len(get_available_topics())}
+
+
+def _prime_connections() -> Optional[Dict]:
+    from app.utils.openai_client import prime_openai_client
+
+    if WARMUP_CONNECTIONS <= 0:
+        return None
+    return {"connections": prime_openai_client(WARMUP_CONNECTIONS)}
+
+
+def _dummy_search(store_name: str) -> Optional[Dict]:
+    from app.indexing.indexer import search_index
+    from app.indexing.sharded_store import open_store
+
+    if open_store(store_name) is None:
+        return None
+    # Embeds one query and scans the whole index, paging in memory-mapped files
+    results, _ = search_index("warm-up", k=1, store_name=store_name)
+    return {"store": store_name, "results": len(results)}
+
+
+def run_warmup():
+    """
+    Pay first-request costs before traffic arrives: imports, static assets,
+    configured stores (WARMUP_STORES), the topic catalog, Azure connections
+    and one dummy search.
+    """
+    readiness.start()
+    logger.info("Warm-up started (stores: %s)", ", ".join(WARMUP_STORES) or "none")
+
+    readiness.run("modules", _import_modules)
+    readiness.run("static_assets", _load_assets)
+    for name in WARMUP_STORES:
+        readiness.run(f"store:{name}", lambda name=name: _load_store(name))
+    readiness.run("topics", _build_topics)
+    readiness.run("openai_connections", _prime_connections, required=False)
+    if WARMUP_SEARCH and WARMUP_STORES:
+        readiness.run("search", lambda: _dummy_search(WARMUP_STORES[0]), required=False)
+
+    readiness.finish()
+    status = readiness.to_dict()
+    logger.info("Warm-up finished in %.0f ms (ready=%s)", status["warmup_ms"], status["ready"])
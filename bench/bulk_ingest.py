@@ -0,0 +1,122 @@
+"""Bulk ingestion throughput with one worker versus several.
+
+Writes ``--files`` synthetic .docx files and a manifest, then ingests them
+with ``python -m app.ingestion.bulk``'s ``plan``/``ingest`` in a fresh
+subprocess and chunk repository per worker count. ``--read-latency-ms`` is
+added to every file's extraction to stand in for slow storage; it is what
+lets several workers overlap even on a single CPU, as long as they do not
+serialize on the chunk repository's write lock.
+
+    python -m bench.bulk_ingest --files 32 --workers 1,4 --read-latency-ms 250
+
+Exits non-zero when the largest worker count is not at least
+``--min-speedup`` times faster than the first.
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _install_read_latency():
+    # Spawned ingestion workers re-import this module as __mp_main__, so they get the delay too
+    latency_ms = float(os.environ.get("BENCH_READ_LATENCY_MS", "0"))
+    if not latency_ms:
+        return
+    from app.ingestion import loader
+
+    iter_text = loader.iter_text
+
+    def slow_iter_text(file_path):
+        time.sleep(latency_ms / 1000)
+        yield from iter_text(file_path)
+
+    loader.iter_text = slow_iter_text
+
+
+_install_read_latency()
+
+
+def write_manifest(paths, manifest: Path):
+    with open(manifest, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["path", "title", "document_type", "version", "approved", "approved_by", "approval_date"])
+        for path in paths:
+            writer.writerow([path.name, path.stem, "Bench", "1", "true", "bench", "2026-01-01"])
+
+
+def child(directory: Path, manifest: Path, workers: int):
+    """Ingest every file once and print the ingestion stats as JSON."""
+    from app.ingestion.bulk import Journal, ingest, load_manifest, plan
+
+    journal = Journal(Path("bulk_state.jsonl"))
+    try:
+        tasks, _ = plan(directory, load_manifest(manifest), journal)
+        start = time.perf_counter()
+        stats = ingest(tasks, journal, workers)
+        elapsed = time.perf_counter() - start
+    finally:
+        journal.close()
+    print(json.dumps({"seconds": elapsed, "files": stats["files"], "chunks": stats["chunks"], "failed": len(stats["failed"])}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--words", type=int, default=3000, help="Words per file")
+    parser.add_argument("--workers", default="1,4", help="Comma-separated worker counts")
+    parser.add_argument("--read-latency-ms", type=float, default=250.0, help="Simulated storage latency per file")
+    parser.add_argument("--min-speedup", type=float, default=1.5)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        directory, manifest, workers = args.child
+        child(Path(directory), Path(manifest), int(workers))
+        return
+
+    from bench.run import make_documents
+
+    workdir = Path(tempfile.mkdtemp(prefix="rag-bulk-ingest-"))
+    paths = make_documents(workdir / "documents", args.files, args.words, seed=0)
+    write_manifest(paths, workdir / "manifest.csv")
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([os.getcwd(), os.environ.get("PYTHONPATH", "")]),
+        LOG_LEVEL="WARNING",
+        BENCH_READ_LATENCY_MS=str(args.read_latency_ms),
+    )
+    rows = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        # Fresh chunk repository and journal per run
+        rundir = workdir / f"workers_{workers}"
+        rundir.mkdir()
+        output = subprocess.run(
+            [sys.executable, "-m", "bench.bulk_ingest", "--child",
+             str(workdir / "documents"), str(workdir / "manifest.csv"), str(workers)],
+            cwd=rundir, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        rows.append((workers, json.loads(output.strip().splitlines()[-1])))
+
+    print(f"{args.files} files x {args.words} words, {args.read_latency_ms:g} ms read latency per file")
+    print(f"{'workers':>8}{'seconds':>9}{'files/s':>9}{'chunks':>8}{'failed':>8}{'speedup':>9}")
+    for workers, figures in rows:
+        speedup = rows[0][1]["seconds"] / figures["seconds"]
+        print(f"{workers:>8}{figures['seconds']:>9.2f}{figures['files'] / figures['seconds']:>9.1f}"
+              f"{figures['chunks']:>8}{figures['failed']:>8}{speedup:>9.2f}")
+    print(f"\nworkdir: {workdir}")
+
+    speedup = rows[0][1]["seconds"] / rows[-1][1]["seconds"]
+    if any(figures["failed"] for _, figures in rows) or speedup < args.min_speedup:
+        print(f"{rows[-1][0]} workers were {speedup:.2f}x as fast as {rows[0][0]} (expected at least {args.min_speedup}x)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
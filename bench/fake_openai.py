@@ -0,0 +1,190 @@
+"""Local stand-in for Azure OpenAI used by the benchmarks.
+
+Two ways to use it:
+
+* ``install_fake_client(FakeOpenAIClient(...))`` swaps the client used by the
+  app modules in-process.
+* ``python -m bench.fake_openai --port 9000`` serves the Azure OpenAI REST
+  routes so a real uvicorn server can point ``AZURE_OPENAI_ENDPOINT`` at it.
+
+Embeddings are deterministic hashed bag-of-words vectors, so similar texts get
+similar vectors and retrieval behaves sensibly. Latency is simulated as a base
+delay plus completion tokens divided by a token rate.
+"""
+import argparse
+import asyncio
+import hashlib
+import re
+import time
+import types
+from typing import List
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def fake_embedding(text: str, dim: int = 1536) -> List[float]:
+    """Deterministic, L2-normalized hashed bag-of-words embedding."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in _WORD_RE.findall(text.lower()):
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector.tolist()
+
+
+def _count_tokens(text: str) -> int:
+    # Rough GPT tokenization: ~4 characters per token
+    return max(1, len(text) // 4)
+
+
+class FakeOpenAIClient:
+    """In-process client exposing ``embeddings.create`` and ``chat.completions.create``.
+
+    Args:
+        embedding_dim: Dimension of returned embeddings
+        embedding_latency_ms: Delay per embeddings call
+        chat_latency_ms: Time to first token for chat completions
+        tokens_per_second: Generation rate for completion tokens
+        completion_tokens: Tokens generated per completion (capped by max_tokens)
+    """
+
+    def __init__(
+        self,
+        embedding_dim: int = 1536,
+        embedding_latency_ms: float = 0.0,
+        chat_latency_ms: float = 0.0,
+        tokens_per_second: float = 0.0,
+        completion_tokens: int = 100,
+    ):
+        self.embedding_dim = embedding_dim
+        self.embedding_latency_ms = embedding_latency_ms
+        self.chat_latency_ms = chat_latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.calls = {"embeddings": 0, "chat": 0}
+        self.embeddings = types.SimpleNamespace(create=self._create_embeddings)
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create_completion))
+
+    def _create_embeddings(self, model=None, input=None, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.calls["embeddings"] += 1
+        if self.embedding_latency_ms:
+            time.sleep(self.embedding_latency_ms / 1000)
+        return embedding_response(texts, self.embedding_dim, model)
+
+    def _create_completion(self, model=None, messages=None, max_tokens=None, **kwargs):
+        self.calls["chat"] += 1
+        completion_tokens = min(self.completion_tokens, max_tokens or self.completion_tokens)
+        time.sleep(completion_delay(self.chat_latency_ms, self.tokens_per_second, completion_tokens))
+        return completion_response(messages or [], completion_tokens, model)
+
+
+def completion_delay(latency_ms: float, tokens_per_second: float, completion_tokens: int) -> float:
+    delay = latency_ms / 1000
+    if tokens_per_second:
+        delay += completion_tokens / tokens_per_second
+    return delay
+
+
+def embedding_response(texts: List[str], dim: int, model=None):
+    data = [
+        types.SimpleNamespace(object="embedding", index=i, embedding=fake_embedding(text, dim))
+        for i, text in enumerate(texts)
+    ]
+    prompt_tokens = sum(_count_tokens(text) for text in texts)
+    usage = types.SimpleNamespace(prompt_tokens=prompt_tokens, total_tokens=prompt_tokens)
+    return types.SimpleNamespace(object="list", data=data, model=model, usage=usage)
+
+
+def completion_response(messages: List[dict], completion_tokens: int, model=None):
+    prompt_tokens = sum(_count_tokens(str(m.get("content", ""))) for m in messages)
+    question = str(messages[-1].get("content", ""))[:80] if messages else ""
+    content = f"Fake answer to: {question} " + " ".join(["lorem"] * max(completion_tokens - 8, 0))
+    message = types.SimpleNamespace(role="assistant", content=content.strip())
+    usage = types.SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+    choice = types.SimpleNamespace(index=0, message=message, finish_reason="stop")
+    return types.SimpleNamespace(id="chatcmpl-fake", object="chat.completion", model=model, choices=[choice], usage=usage)
+
+
+def install_fake_client(client) -> None:
+    """Make every app module that calls Azure OpenAI use ``client``."""
+    from app.utils.openai_client import set_openai_client
+
+    set_openai_client(client)
+
+
+def create_fake_server(
+    embedding_dim: int = 1536,
+    embedding_latency_ms: float = 0.0,
+    chat_latency_ms: float = 0.0,
+    tokens_per_second: float = 0.0,
+    completion_tokens: int = 100,
+):
+    """FastAPI app serving the Azure OpenAI embeddings and chat completion routes."""
+    from fastapi import FastAPI, Request
+
+    server = FastAPI(title="Fake Azure OpenAI")
+
+    def _to_json(obj):
+        if isinstance(obj, types.SimpleNamespace):
+            return {key: _to_json(value) for key, value in vars(obj).items()}
+        if isinstance(obj, list):
+            return [_to_json(item) for item in obj]
+        return obj
+
+    @server.post("/openai/deployments/{deployment}/embeddings")
+    async def embeddings(deployment: str, request: Request):
+        body = await request.json()
+        texts = body["input"]
+        texts = [texts] if isinstance(texts, str) else texts
+        if embedding_latency_ms:
+            await asyncio.sleep(embedding_latency_ms / 1000)
+        return _to_json(embedding_response(texts, embedding_dim, deployment))
+
+    @server.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request):
+        body = await request.json()
+        max_tokens = body.get("max_tokens") or completion_tokens
+        tokens = min(completion_tokens, max_tokens)
+        await asyncio.sleep(completion_delay(chat_latency_ms, tokens_per_second, tokens))
+        response = _to_json(completion_response(body.get("messages", []), tokens, deployment))
+        response["created"] = int(time.time())
+        return response
+
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Azure OpenAI endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--completion-tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    server = create_fake_server(
+        embedding_dim=args.embedding_dim,
+        embedding_latency_ms=args.embedding_latency_ms,
+        chat_latency_ms=args.chat_latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+    )
+    uvicorn.run(server, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Wall time and peak memory of an index build, pipelined versus sequential.
+
+Seeds a scratch chunk repository with ``--chunks`` synthetic chunks, then
+builds the index in a fresh subprocess per mode against ``FakeOpenAIClient``
+with ``--latency-ms`` per embeddings call:
+
+* ``pipelined``: ``build_index`` (streamed batches, INDEX_EMBED_IN_FLIGHT
+  embedding batches in flight, float32 batches added as they arrive)
+* ``sequential``: the previous approach of loading every chunk, embedding
+  them all into Python lists and converting the lot before one ``add``
+
+    python -m bench.index_build --chunks 5000 --latency-ms 20
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_VOCABULARY = ["policy", "security", "access", "review", "approval", "incident", "backup", "network",
+               "employee", "vendor", "contract", "budget", "travel", "expense", "training", "audit"]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def seed(chunks: int, words: int, per_document: int = 100):
+    """Write ``chunks`` approved chunks into the repository of the current directory."""
+    from app.rag.store import save_chunks
+
+    rng = random.Random(0)
+    for start in range(0, chunks, per_document):
+        texts = [
+            " ".join(rng.choice(_VOCABULARY) for _ in range(words))
+            for _ in range(min(per_document, chunks - start))
+        ]
+        save_chunks(f"doc_{start // per_document:05d}", texts, {"title": "bench", "document_type": "Bench", "approved": True})
+
+
+def child(mode: str, latency_ms: float, dim: int):
+    """Build the index once and print timing and peak RSS figures as JSON."""
+    import faiss  # noqa: F401 - imported before the baseline like the app would
+
+    from app.indexing.embeddings import embed_texts
+    from app.indexing.indexer import build_index, load_all_chunks
+    from app.indexing.vector_store import VectorStore
+    from bench.fake_openai import FakeOpenAIClient, install_fake_client
+
+    fake = FakeOpenAIClient(embedding_dim=dim, embedding_latency_ms=latency_ms)
+    install_fake_client(fake)
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "pipelined":
+        store = build_index(store_name="bench", resume=False)
+    else:
+        chunks = load_all_chunks()
+        embeddings = embed_texts([chunk["text"] for chunk in chunks])
+        store = VectorStore(dim=len(embeddings[0]))
+        store.add(embeddings, chunks)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "seconds": elapsed,
+        "vectors": store.index.ntotal,
+        "calls": fake.calls["embeddings"],
+        "baseline_mb": baseline,
+        "peak_mb": _peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=60, help="Words per chunk")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated latency per embeddings call")
+    parser.add_argument("--modes", default="sequential,pipelined")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.latency_ms, args.dim)
+        return
+
+    workdir = Path(tempfile.mkdtemp(prefix="rag-index-build-"))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.getcwd(), os.environ.get("PYTHONPATH", "")]), LOG_LEVEL="WARNING")
+    # Embeddings come from FakeOpenAIClient, but the app still needs Azure settings to start
+    for name in ("AZURE_OPENAI_API_KEY", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_API_VERSION"):
+        env.setdefault(name, "http://fake.invalid" if name.endswith("ENDPOINT") else "fake")
+    env.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT", "fake-chat")
+    env.setdefault("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "fake-embedding")
+    subprocess.run(
+        [sys.executable, "-c", f"from bench.index_build import seed; seed({args.chunks}, {args.words})"],
+        cwd=workdir, env=env, check=True,
+    )
+
+    rows = []
+    for mode in args.modes.split(","):
+        output = subprocess.run(
+            [sys.executable, "-m", "bench.index_build", "--child", mode,
+             "--latency-ms", str(args.latency_ms), "--dim", str(args.dim)],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        rows.append((mode, json.loads(output.strip().splitlines()[-1])))
+
+    print(f"{args.chunks} chunks x {args.words} words, dim {args.dim}, {args.latency_ms:g} ms per embeddings call")
+    print(f"{'mode':>11}{'seconds':>9}{'chunks/s':>10}{'calls':>7}{'base MB':>9}{'peak MB':>9}{'growth MB':>11}")
+    for mode, figures in rows:
+        growth = figures["peak_mb"] - figures["baseline_mb"]
+        print(f"{mode:>11}{figures['seconds']:>9.2f}{figures['vectors'] / figures['seconds']:>10.0f}{figures['calls']:>7}"
+              f"{figures['baseline_mb']:>9.1f}{figures['peak_mb']:>9.1f}{growth:>11.1f}")
+    print(f"\nworkdir: {workdir}")
+
+
+if __name__ == "__main__":
+    main()
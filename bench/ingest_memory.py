@@ -0,0 +1,132 @@
+"""Peak memory of document ingestion as the input grows.
+
+Each size runs in a fresh subprocess that ingests one synthetic .docx and
+reports its peak RSS above the post-import baseline. The streaming path
+(``ingest_document``) should stay flat; ``--mode in-memory`` runs the old
+extract-everything-then-chunk approach for comparison.
+
+    python -m bench.ingest_memory --sizes-mb 4,16,64
+    python -m bench.ingest_memory --sizes-mb 4,16,64 --mode in-memory
+
+Exits non-zero when the streaming peak grows by more than ``--tolerance-mb``
+between the smallest and the largest input.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import types
+import zipfile
+from pathlib import Path
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_VOCABULARY = ["policy", "security", "access", "review", "approval", "incident", "backup", "network",
+               "employee", "vendor", "contract", "budget", "travel", "expense", "training", "audit"]
+
+
+def make_docx(path: Path, text_mb: float, seed: int = 0):
+    """Write a .docx with roughly ``text_mb`` MB of text, streaming the XML."""
+    rng = random.Random(seed)
+    target = int(text_mb * 1024 * 1024)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _RELS)
+        with archive.open("word/document.xml", "w") as xml:
+            xml.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{_W_NS}"><w:body>'.encode())
+            written = 0
+            while written < target:
+                paragraph = " ".join(rng.choice(_VOCABULARY) for _ in range(80))
+                xml.write(f"<w:p><w:r><w:t>{paragraph}</w:t></w:r></w:p>".encode())
+                written += len(paragraph) + 1
+            xml.write(b"</w:body></w:document>")
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def child(document: Path, mode: str):
+    """Ingest one document and print peak RSS figures as JSON."""
+    from datetime import datetime
+
+    from app.ingestion.extractor import extract_text
+    from app.ingestion.loader import ingest_document
+    from app.models.schemas import DocumentMetadata
+    from app.rag.chunker import chunk_text
+
+    baseline = _peak_rss_mb()
+    if mode == "streaming":
+        metadata = DocumentMetadata(
+            title=document.stem, document_type="Bench", version="1.0",
+            approved=True, approved_by="bench", approval_date=datetime.utcnow(),
+        )
+        with open(document, "rb") as f:
+            result = ingest_document(types.SimpleNamespace(filename=document.name, file=f), metadata)
+        chunks = result["chunk_count"]
+    else:
+        chunks = len(chunk_text(extract_text(document)))
+    print(json.dumps({"baseline_mb": baseline, "peak_mb": _peak_rss_mb(), "chunks": chunks}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", default="4,16,64", help="Comma-separated text sizes in MB")
+    parser.add_argument("--mode", choices=["streaming", "in-memory"], default="streaming")
+    parser.add_argument("--tolerance-mb", type=float, default=32.0)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(Path(args.child), args.mode)
+        return
+
+    workdir = Path(tempfile.mkdtemp(prefix="rag-ingest-mem-"))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.getcwd(), os.environ.get("PYTHONPATH", "")]), LOG_LEVEL="WARNING")
+    rows = []
+    for size in [float(s) for s in args.sizes_mb.split(",")]:
+        document = workdir / f"doc_{size:g}mb.docx"
+        make_docx(document, size)
+        output = subprocess.run(
+            [sys.executable, "-m", "bench.ingest_memory", "--child", str(document), "--mode", args.mode],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        figures = json.loads(output.strip().splitlines()[-1])
+        growth = figures["peak_mb"] - figures["baseline_mb"]
+        rows.append((size, figures["chunks"], figures["baseline_mb"], figures["peak_mb"], growth))
+
+    print(f"{'text MB':>8}{'chunks':>9}{'base MB':>10}{'peak MB':>10}{'growth MB':>11}   ({args.mode})")
+    for size, chunks, baseline, peak, growth in rows:
+        print(f"{size:>8g}{chunks:>9}{baseline:>10.1f}{peak:>10.1f}{growth:>11.1f}")
+    print(f"\nworkdir: {workdir}")
+
+    spread = rows[-1][4] - rows[0][4]
+    if args.mode == "streaming" and spread > args.tolerance_mb:
+        print(f"Peak memory grew by {spread:.1f} MB across sizes (tolerance {args.tolerance_mb} MB)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
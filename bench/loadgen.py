@@ -0,0 +1,247 @@
+"""Replay multi-turn chat sessions against a running server to find saturation.
+
+Each virtual user creates a session with ``POST /chat/session`` and then sends
+the turns of one conversation script to ``POST /chat/message``, carrying the
+session id and topic so history and topic filtering are exercised.
+
+Closed loop (fixed number of concurrent users) or open loop (Poisson session
+arrivals at a target rate):
+
+    python -m bench.loadgen --url http://127.0.0.1:8000 --users 16 --duration 60
+    python -m bench.loadgen --rate 2.5 --duration 60 --scripts sessions.json
+    python -m bench.loadgen --sweep 1,2,4,8,16,32 --duration 30 --output load.json
+
+A scripts file is a JSON list of conversations:
+
+    [{"topic": "Policy", "turns": ["What is the travel policy?", "And for contractors?"],
+      "think_time_s": 2.0}]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from bench.stats import summarize
+
+_SYNTHETIC_SUBJECTS = ["travel", "expense", "security", "onboarding", "backup", "privacy", "budget", "incident"]
+_SYNTHETIC_FOLLOW_UPS = [
+    "Can you give more detail?",
+    "Who approves that?",
+    "Does this apply to contractors?",
+    "What are the exceptions?",
+    "Summarize that in one sentence.",
+]
+
+
+def synthetic_scripts(count: int, turns: int, topics: List[Optional[str]], seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    scripts = []
+    for _ in range(count):
+        subject = rng.choice(_SYNTHETIC_SUBJECTS)
+        conversation = [f"What is our {subject} policy?"]
+        conversation += [rng.choice(_SYNTHETIC_FOLLOW_UPS) for _ in range(turns - 1)]
+        scripts.append({"topic": rng.choice(topics), "turns": conversation, "think_time_s": 1.0})
+    return scripts
+
+
+class Recorder:
+    """Collects per-endpoint latency, time-to-first-byte and errors."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.ttfb: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, List[str]] = defaultdict(list)
+
+    def error(self, endpoint: str, detail: str):
+        self.errors[endpoint] += 1
+        if len(self.error_samples[endpoint]) < 5:
+            self.error_samples[endpoint].append(detail)
+
+    def report(self, wall_time_s: float) -> Dict:
+        endpoints = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            summary = summarize(self.latencies[endpoint], wall_time_s, self.errors[endpoint])
+            ttfb = summarize(self.ttfb[endpoint], wall_time_s)
+            summary["ttfb_p50_ms"] = ttfb.get("p50_ms")
+            summary["ttfb_p95_ms"] = ttfb.get("p95_ms")
+            summary["ttfb_p99_ms"] = ttfb.get("p99_ms")
+            summary["error_rate"] = round(self.errors[endpoint] / max(summary["requests"], 1), 4)
+            if self.error_samples[endpoint]:
+                summary["error_samples"] = self.error_samples[endpoint]
+            endpoints[endpoint] = summary
+        return endpoints
+
+
+async def timed_post(client, recorder: Recorder, endpoint: str, **kwargs) -> Optional[Dict]:
+    """POST and record TTFB (first body byte) and full latency."""
+    start = time.perf_counter()
+    first_byte = None
+    body = b""
+    try:
+        async with client.stream("POST", endpoint, **kwargs) as response:
+            async for chunk in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter()
+                body += chunk
+            status = response.status_code
+    except Exception as e:
+        recorder.error(endpoint, f"{type(e).__name__}: {e}")
+        return None
+
+    end = time.perf_counter()
+    if status >= 400:
+        recorder.error(endpoint, f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+        return None
+    recorder.latencies[endpoint].append(end - start)
+    recorder.ttfb[endpoint].append((first_byte or end) - start)
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+async def run_session(client, recorder: Recorder, script: Dict, think_scale: float, deadline: float):
+    session = await timed_post(client, recorder, "/chat/session")
+    if not session:
+        # Back off briefly so a failing server is not hammered in a tight loop
+        await asyncio.sleep(0.1)
+        return
+    session_id = session["session_id"]
+    for turn in script["turns"]:
+        if time.perf_counter() >= deadline:
+            return
+        await timed_post(client, recorder, "/chat/message", json={
+            "session_id": session_id,
+            "message": turn,
+            "topic": script.get("topic"),
+        })
+        think = script.get("think_time_s", 0.0) * think_scale
+        if think:
+            await asyncio.sleep(random.expovariate(1 / think))
+
+
+async def closed_loop(client, scripts: List[Dict], users: int, duration: float, think_scale: float) -> Dict:
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    async def user(user_id: int):
+        i = user_id
+        while time.perf_counter() < deadline:
+            await run_session(client, recorder, scripts[i % len(scripts)], think_scale, deadline)
+            i += users
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(u) for u in range(users)))
+    return {"mode": "closed", "users": users, "endpoints": recorder.report(time.perf_counter() - start)}
+
+
+async def open_loop(client, scripts: List[Dict], rate: float, duration: float, think_scale: float) -> Dict:
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    tasks = []
+    start = time.perf_counter()
+    i = 0
+    while time.perf_counter() < deadline:
+        tasks.append(asyncio.create_task(run_session(client, recorder, scripts[i % len(scripts)], think_scale, deadline)))
+        i += 1
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return {
+        "mode": "open",
+        "session_rate": rate,
+        "sessions_started": i,
+        "endpoints": recorder.report(time.perf_counter() - start),
+    }
+
+
+def find_saturation(steps: List[Dict], endpoint: str = "/chat/message", max_error_rate: float = 0.01) -> Optional[Dict]:
+    """First sweep step where throughput stops scaling, p95 jumps or errors appear."""
+    previous = None
+    for step in steps:
+        stats = step["endpoints"].get(endpoint)
+        if not stats:
+            continue
+        if stats["error_rate"] > max_error_rate:
+            return {"users": step["users"], "reason": f"error rate {stats['error_rate']:.2%}"}
+        if previous:
+            throughput_gain = stats["throughput_rps"] / max(previous["throughput_rps"], 1e-9) - 1
+            p95_growth = stats.get("p95_ms", 0) / max(previous.get("p95_ms", 0), 1e-9) - 1
+            if throughput_gain < 0.10 and p95_growth > 0.50:
+                return {
+                    "users": step["users"],
+                    "reason": f"throughput +{throughput_gain:.0%} while p95 +{p95_growth:.0%}",
+                }
+        previous = stats
+    return None
+
+
+def print_report(result: Dict):
+    label = f"users={result['users']}" if result["mode"] == "closed" else f"rate={result['session_rate']}/s"
+    print(f"\n[{label}]")
+    print(f"{'endpoint':<16}{'reqs':>7}{'errs':>6}{'rps':>9}{'ttfb p50':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint, s in result["endpoints"].items():
+        print(
+            f"{endpoint:<16}{s['requests']:>7}{s['errors']:>6}{s['throughput_rps']:>9.2f}"
+            f"{s.get('ttfb_p50_ms') or 0:>10.1f}{s.get('p50_ms', 0):>9.1f}{s.get('p95_ms', 0):>9.1f}{s.get('p99_ms', 0):>9.1f}"
+        )
+
+
+async def main_async(args) -> Dict:
+    import httpx
+
+    if args.scripts:
+        with open(args.scripts) as f:
+            scripts = json.load(f)
+    else:
+        topics = args.topics.split(",") if args.topics else [None]
+        scripts = synthetic_scripts(args.synthetic_sessions, args.turns, topics, args.seed)
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        if args.sweep:
+            steps = []
+            for users in [int(u) for u in args.sweep.split(",")]:
+                step = await closed_loop(client, scripts, users, args.duration, args.think_scale)
+                print_report(step)
+                steps.append(step)
+            saturation = find_saturation(steps)
+            print(f"\nSaturation: {saturation or 'not reached'}")
+            return {"sweep": steps, "saturation": saturation}
+        if args.rate:
+            result = await open_loop(client, scripts, args.rate, args.duration, args.think_scale)
+        else:
+            result = await closed_loop(client, scripts, args.users, args.duration, args.think_scale)
+        print_report(result)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay multi-turn chat sessions against the API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scripts", help="JSON file of conversation scripts (default: synthetic)")
+    parser.add_argument("--synthetic-sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=4, help="Turns per synthetic conversation")
+    parser.add_argument("--topics", help="Comma-separated topics for synthetic sessions")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent users (closed loop)")
+    parser.add_argument("--rate", type=float, help="New sessions per second (open loop)")
+    parser.add_argument("--sweep", help="Comma-separated user counts to step through, e.g. 1,2,4,8,16")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per run or sweep step")
+    parser.add_argument("--think-scale", type=float, default=1.0, help="Multiplier for script think times (0 disables)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    result = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
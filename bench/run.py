@@ -0,0 +1,223 @@
+"""End-to-end offline benchmark of ingestion, indexing, search, query and chat.
+
+Runs the FastAPI app in-process against ``FakeOpenAIClient`` inside a scratch
+working directory, so no Azure access is needed and only our own code is
+measured (plus the simulated model latency you configure).
+
+    python -m bench.run --documents 20 --requests 200 --concurrency 8 \
+        --output bench_results.json --baseline bench_baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from bench.stats import compare, format_table, summarize
+
+_VOCABULARY = [
+    "policy", "security", "access", "review", "approval", "incident", "backup", "network",
+    "employee", "vendor", "contract", "budget", "travel", "expense", "onboarding", "training",
+    "leadership", "growth", "marketing", "customer", "support", "release", "deployment", "audit",
+    "compliance", "privacy", "retention", "encryption", "password", "device", "remote", "office",
+]
+_DOCUMENT_TYPES = ["Policy", "Technical", "HR", "Finance"]
+
+
+def make_documents(directory: Path, count: int, words: int, seed: int) -> List[Path]:
+    """Write ``count`` synthetic .docx files of roughly ``words`` words each."""
+    from docx import Document
+
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        document = Document()
+        remaining = words
+        while remaining > 0:
+            n = min(remaining, 60)
+            document.add_paragraph(" ".join(rng.choice(_VOCABULARY) for _ in range(n)))
+            remaining -= n
+        path = directory / f"doc_{i:04d}.docx"
+        document.save(path)
+        paths.append(path)
+    return paths
+
+
+def make_queries(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        f"What does the {rng.choice(_VOCABULARY)} {rng.choice(_VOCABULARY)} guideline say?"
+        for _ in range(count)
+    ]
+
+
+async def run_concurrent(count: int, concurrency: int, make_request: Callable[[int], object]) -> Dict:
+    """Issue ``count`` requests with at most ``concurrency`` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await make_request(i)
+                if response.status_code >= 400:
+                    errors += 1
+                    return
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def run_benchmark(args) -> Dict:
+    import httpx
+
+    from app.main import app
+    from bench.fake_openai import FakeOpenAIClient, install_fake_client
+
+    fake = FakeOpenAIClient(
+        embedding_dim=args.embedding_dim,
+        embedding_latency_ms=args.embedding_latency_ms,
+        chat_latency_ms=args.chat_latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+    )
+    install_fake_client(fake)
+
+    documents = make_documents(Path("bench_input"), args.documents, args.words, args.seed)
+    queries = make_queries(args.requests, args.seed)
+    scenarios: Dict[str, Dict] = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Ingestion is sequential: each upload writes its own files
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for i, path in enumerate(documents):
+            t0 = time.perf_counter()
+            with open(path, "rb") as f:
+                response = await client.post(
+                    "/documents/upload",
+                    params={
+                        "title": path.stem,
+                        "document_type": _DOCUMENT_TYPES[i % len(_DOCUMENT_TYPES)],
+                        "approved": True,
+                        "approved_by": "bench",
+                    },
+                    files={"file": (path.name, f)},
+                )
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - t0)
+        scenarios["ingest"] = summarize(latencies, time.perf_counter() - start, errors)
+
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for _ in range(args.build_repeats):
+            t0 = time.perf_counter()
+            response = await client.post("/index/build?wait=true")
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - t0)
+        scenarios["index_build"] = summarize(latencies, time.perf_counter() - start, errors)
+
+        scenarios["search"] = await run_concurrent(
+            args.requests, args.concurrency,
+            lambda i: client.post("/search", params={"query": queries[i], "top_k": 5}),
+        )
+        scenarios["query"] = await run_concurrent(
+            args.requests, args.concurrency,
+            lambda i: client.post("/query", params={"query": queries[i], "top_k": 3}),
+        )
+
+        session_ids = []
+        for _ in range(args.sessions):
+            response = await client.post("/chat/session")
+            session_ids.append(response.json()["session_id"])
+        scenarios["chat_message"] = await run_concurrent(
+            args.requests, args.concurrency,
+            lambda i: client.post("/chat/message", json={
+                "session_id": session_ids[i % len(session_ids)],
+                "message": queries[i],
+            }),
+        )
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "workdir")},
+        "fake_client_calls": dict(fake.calls),
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark with a fake Azure OpenAI client")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--words", type=int, default=3000, help="Words per synthetic document")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per search/query/chat scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--build-repeats", type=int, default=1)
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--completion-tokens", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="Scratch directory for data/ and logs/ (default: a new temp dir)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    output = Path(args.output).resolve()
+    baseline_path = Path(args.baseline).resolve() if args.baseline else None
+
+    # The app uses paths relative to the working directory, so isolate them
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="rag-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    os.chdir(workdir)
+    for name in ("AZURE_OPENAI_API_KEY", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_API_VERSION"):
+        os.environ.setdefault(name, "http://fake.invalid" if name.endswith("ENDPOINT") else "fake")
+    os.environ.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT", "fake-chat")
+    os.environ.setdefault("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "fake-embedding")
+
+    results = asyncio.run(run_benchmark(args))
+    print(format_table(results))
+
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output} (workdir: {workdir})")
+
+    if baseline_path:
+        rows = compare(results, json.loads(baseline_path.read_text()), args.tolerance)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['scenario']:<16}{row['metric']:<16}{row['baseline']:>10}{row['current']:>10}{row['change_pct']:>9}% {flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Throughput of batched versus per-query FAISS search under concurrency.
+
+Builds an in-memory ``VectorStore`` of random vectors and has ``--threads``
+workers call ``store.search`` concurrently, first with every query as its
+own 1 x d ``index.search`` (the previous path) and then through the
+store's ``SearchExecutor``.
+
+    python -m bench.search_batching --vectors 50000 --dim 1536 --threads 1,8,32
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+import app.indexing.vector_store as vector_store
+from app.indexing.vector_store import VectorStore
+from bench.stats import summarize
+
+
+def build_store(vectors: int, dim: int, seed: int) -> VectorStore:
+    rng = np.random.default_rng(seed)
+    store = VectorStore(dim=dim, provider="bench")
+    chunks = [{"chunk_id": f"c{i}", "text": "", "metadata": {}} for i in range(vectors)]
+    store.add(rng.random((vectors, dim), dtype=np.float32), chunks)
+    return store
+
+
+def run(store: VectorStore, queries: np.ndarray, threads: int, k: int, batched: bool, max_batch: int, max_wait_ms: float) -> Dict:
+    vector_store.SEARCH_BATCH_MAX = max_batch if batched else 1
+    vector_store.SEARCH_BATCH_WAIT_MS = max_wait_ms
+    store._search_executor = None
+    latencies: List[float] = []
+
+    def one(query):
+        start = time.perf_counter()
+        store.search(query.tolist(), k)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, queries))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=2000, help="Queries per run")
+    parser.add_argument("--threads", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store = build_store(args.vectors, args.dim, args.seed)
+    queries = np.random.default_rng(args.seed + 1).random((args.queries, args.dim), dtype=np.float32)
+    # Warm up FAISS and BLAS before timing
+    run(store, queries[:50], 4, args.k, True, args.max_batch, args.max_wait_ms)
+
+    print(f"{args.vectors} x {args.dim} vectors, {args.queries} queries, k={args.k}, "
+          f"max batch {args.max_batch}, max wait {args.max_wait_ms:g} ms")
+    print(f"{'threads':>8}{'mode':>11}{'qps':>10}{'p50 ms':>10}{'p99 ms':>10}{'speedup':>9}")
+    for threads in [int(t) for t in args.threads.split(",")]:
+        single = run(store, queries, threads, args.k, False, args.max_batch, args.max_wait_ms)
+        batched = run(store, queries, threads, args.k, True, args.max_batch, args.max_wait_ms)
+        for mode, row in (("per-query", single), ("batched", batched)):
+            speedup = f"{row['throughput_rps'] / single['throughput_rps']:.2f}x" if mode == "batched" else ""
+            print(f"{threads:>8}{mode:>11}{row['throughput_rps']:>10.0f}{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}{speedup:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Memory per chat session and cost of reading history per request.
+
+Compares the compact ``Session`` ring buffer used by ``SessionManager``
+with the previous representation (a pydantic ``ChatSession`` holding one
+``ChatMessage`` per turn, never trimmed).
+
+    python -m bench.session_memory --sessions 5000 --turns 40
+"""
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from app.chat.session_manager import SessionManager
+from app.models.schemas import ChatMessage, ChatSession
+
+
+class PydanticSessions:
+    """The representation SessionManager used before the ring buffer."""
+
+    def __init__(self):
+        self.sessions: Dict[str, ChatSession] = {}
+
+    def create_session(self, session_id: str):
+        now = datetime.utcnow()
+        self.sessions[session_id] = ChatSession(session_id=session_id, messages=[], created_at=now, updated_at=now)
+
+    def add_message(self, session_id: str, role: str, content: str):
+        session = self.sessions[session_id]
+        session.messages.append(ChatMessage(role=role, content=content, timestamp=datetime.utcnow()))
+        session.updated_at = datetime.utcnow()
+
+    def get_conversation_history(self, session_id: str, max_messages: int = 10) -> List[dict]:
+        return [{"role": m.role, "content": m.content} for m in self.sessions[session_id].messages[-max_messages:]]
+
+
+def _compact() -> SessionManager:
+    manager = SessionManager.__new__(SessionManager)
+    manager.sessions = {}
+    return manager
+
+
+def measure(factory: Callable, sessions: int, turns: int, reads: int) -> Dict:
+    gc.collect()
+    tracemalloc.start()
+    manager = factory()
+    ids = [f"session-{i:06d}" for i in range(sessions)]
+    for session_id in ids:
+        manager.create_session(session_id)
+        for turn in range(turns):
+            # Distinct strings per turn, as real messages would be
+            manager.add_message(session_id, "user", f"question {turn} in {session_id}")
+            manager.add_message(session_id, "assistant", f"answer {turn} in {session_id}")
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for i in range(reads):
+        manager.get_conversation_history(ids[i % sessions])
+    read_us = (time.perf_counter() - start) / reads * 1e6
+    return {"bytes_per_session": current / sessions, "history_read_us": read_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=40, help="User+assistant pairs per session")
+    parser.add_argument("--reads", type=int, default=100_000)
+    args = parser.parse_args()
+
+    # Session creation logs at INFO; queued records would be counted as session memory
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    print(f"{args.sessions} sessions x {args.turns} turns")
+    print(f"{'representation':<16}{'KiB/session':>14}{'history read us':>18}")
+    for name, factory in (("pydantic", PydanticSessions), ("compact", _compact)):
+        result = measure(factory, args.sessions, args.turns, args.reads)
+        print(f"{name:<16}{result['bytes_per_session'] / 1024:>14.1f}{result['history_read_us']:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Latency summaries and baseline comparison shared by the benchmark tools."""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def summarize(latencies_s: List[float], wall_time_s: float, errors: int = 0) -> Dict:
+    """Summarize request latencies (seconds) into throughput and percentiles (ms)."""
+    count = len(latencies_s)
+    summary = {
+        "requests": count + errors,
+        "errors": errors,
+        "wall_time_s": round(wall_time_s, 4),
+        "throughput_rps": round(count / wall_time_s, 3) if wall_time_s > 0 else 0.0,
+    }
+    if count:
+        values = np.asarray(latencies_s) * 1000
+        summary.update({
+            "mean_ms": round(float(values.mean()), 3),
+            "p50_ms": round(float(np.percentile(values, 50)), 3),
+            "p95_ms": round(float(np.percentile(values, 95)), 3),
+            "p99_ms": round(float(np.percentile(values, 99)), 3),
+            "max_ms": round(float(values.max()), 3),
+        })
+    return summary
+
+
+# Metrics where a larger value is an improvement
+_HIGHER_IS_BETTER = {"throughput_rps"}
+_COMPARED = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = 0.10) -> List[Dict]:
+    """Compare scenario summaries against a baseline run.
+
+    Returns one row per scenario metric with the relative change and whether it
+    regressed by more than ``tolerance``.
+    """
+    rows = []
+    for scenario, summary in results.get("scenarios", {}).items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            continue
+        for metric in _COMPARED:
+            current: Optional[float] = summary.get(metric)
+            previous: Optional[float] = base.get(metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            worse = -change if metric in _HIGHER_IS_BETTER else change
+            rows.append({
+                "scenario": scenario,
+                "metric": metric,
+                "baseline": previous,
+                "current": current,
+                "change_pct": round(change * 100, 2),
+                "regression": worse > tolerance,
+            })
+    return rows
+
+
+def format_table(results: Dict) -> str:
+    lines = [f"{'scenario':<16}{'reqs':>7}{'errs':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for scenario, s in results.get("scenarios", {}).items():
+        lines.append(
+            f"{scenario:<16}{s['requests']:>7}{s['errors']:>6}{s['throughput_rps']:>10.2f}"
+            f"{s.get('p50_ms', 0):>10.2f}{s.get('p95_ms', 0):>10.2f}{s.get('p99_ms', 0):>10.2f}"
+        )
+    return "\n".join(lines)
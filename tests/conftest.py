@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Fake Azure settings; calls go to bench.fake_openai's in-process client
+FAKE_AZURE_ENV = {
+    "AZURE_OPENAI_API_KEY": "fake",
+    "AZURE_OPENAI_ENDPOINT": "http://fake.invalid",
+    "AZURE_OPENAI_API_VERSION": "fake",
+    "AZURE_OPENAI_CHAT_DEPLOYMENT": "fake-chat",
+    "AZURE_OPENAI_EMBEDDING_DEPLOYMENT": "fake-embedding",
+}
+
+
+def clean_env(**overrides) -> dict:
+    """The test process's environment without any Azure settings, plus ``overrides``."""
+    env = {key: value for key, value in os.environ.items() if not key.startswith("AZURE_")}
+    env["PYTHONPATH"] = os.pathsep.join([str(REPO_ROOT), os.environ.get("PYTHONPATH", "")])
+    env.update(overrides)
+    return env
+
+
+@pytest.fixture
+def run_app(tmp_path):
+    """
+    Run a snippet in a fresh interpreter whose working directory is ``tmp_path``.
+
+    The app keeps its data under relative paths and reads its settings at
+    import time, so every scenario gets its own process and directory.
+    """
+    def run(code: str, **env) -> subprocess.CompletedProcess:
+        result = subprocess.run(
+            [sys.executable, "-c", textwrap.dedent(code)],
+            cwd=tmp_path, env=clean_env(**FAKE_AZURE_ENV, **env), capture_output=True, text=True, timeout=300,
+        )
+        assert result.returncode == 0, result.stdout + result.stderr
+        return result
+    return run
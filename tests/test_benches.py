@@ -0,0 +1,14 @@
+import subprocess
+import sys
+
+from conftest import REPO_ROOT, clean_env
+
+
+def test_index_build_bench_runs_without_azure_settings():
+    # Benchmarks are offline: they must start from a clean checkout with no Azure settings at all
+    result = subprocess.run(
+        [sys.executable, "-m", "bench.index_build", "--chunks", "60", "--dim", "32", "--latency-ms", "0"],
+        cwd=REPO_ROOT, env=clean_env(), capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "pipelined" in result.stdout and "sequential" in result.stdout
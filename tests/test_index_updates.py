@@ -0,0 +1,64 @@
+CONCURRENT_UPDATES = """
+    BUILD = __BUILD__
+    import threading
+    import time
+
+    from bench.fake_openai import FakeOpenAIClient, install_fake_client
+    from app.indexing import indexer
+    from app.indexing.sharded_store import open_store
+    from app.rag.store import delete_chunks, load_chunks, save_chunks
+
+    install_fake_client(FakeOpenAIClient(embedding_dim=32))
+    for i in range(4):
+        save_chunks(f"doc{i}", [f"text {i} {j}" for j in range(3)], {"approved": True, "document_type": "AB"[i % 2]})
+    indexer.build_index(**BUILD)
+    chunks = {i: load_chunks(f"doc{i}") for i in range(4)}
+    # As DELETE /documents does once the index is updated
+    delete_chunks("doc1")
+
+    # Widen the window between reading the current version and publishing
+    editable_copy = indexer._editable_copy
+    def slow_editable_copy(current):
+        time.sleep(0.3)
+        return editable_copy(current)
+    indexer._editable_copy = slow_editable_copy
+    shard_chunks = indexer._shard_chunks
+    def slow_shard_chunks(*args):
+        # Long enough to span the other updates' publishes
+        time.sleep(1.0)
+        return shard_chunks(*args)
+    indexer._shard_chunks = slow_shard_chunks
+
+    errors = []
+    def update(fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            errors.append(repr(e))
+
+    updates = [
+        threading.Thread(target=update, args=(indexer.remove_document_from_index, "default", chunks[0])),
+        threading.Thread(target=update, args=(indexer.remove_document_from_index, "default", chunks[1])),
+        threading.Thread(target=update, args=(indexer.replace_document_in_index, "default", chunks[2], [])),
+    ]
+    if BUILD:
+        updates.append(threading.Thread(target=update, args=(indexer.rebuild_shard, "default", {"document_type": "B"})))
+    for t in updates:
+        t.start()
+    for t in updates:
+        t.join()
+
+    assert not errors, errors
+    store = open_store("default")
+    results = indexer.search_index("text", k=12)[0]
+    found = {r["chunk_id"].split("_chunk_")[0] for r in results}
+    assert found == {"doc3"}, (found, store.version)
+"""
+
+
+def test_concurrent_updates_keep_every_change(run_app):
+    run_app(CONCURRENT_UPDATES.replace("__BUILD__", "{}"))
+
+
+def test_shard_rebuild_does_not_undo_concurrent_updates(run_app):
+    run_app(CONCURRENT_UPDATES.replace("__BUILD__", "{'shard_by': 'document_type'}"))
@@ -0,0 +1,41 @@
+FAILED_REPLACE = """
+    import types
+    from datetime import datetime
+    from pathlib import Path
+
+    import pytest
+
+    from bench.run import make_documents
+    from app.ingestion.loader import DOCUMENT_DIR, ingest_document
+    from app.models.schemas import DocumentMetadata
+    from app.rag.store import load_chunks
+
+    def upload(path, name=None):
+        return types.SimpleNamespace(filename=name or path.name, file=open(path, "rb"))
+
+    def metadata():
+        return DocumentMetadata(title="t", document_type="Policy", version="1", approved=True, approved_by="me", approval_date=datetime.utcnow())
+
+    original, replacement = make_documents(Path("sources"), 2, 300, seed=0)
+    broken = Path("sources/broken.docx")
+    broken.write_bytes(b"not a docx")
+
+    document_id = ingest_document(upload(original), metadata())["document_id"]
+    stored = DOCUMENT_DIR / f"{document_id}_{original.name}"
+    chunks = load_chunks(document_id)
+
+    with pytest.raises(Exception):
+        ingest_document(upload(broken), metadata(), document_id=document_id)
+    # The failed replacement left the stored original, its chunks and no stray files
+    assert sorted(DOCUMENT_DIR.iterdir()) == [stored]
+    assert stored.read_bytes() == original.read_bytes()
+    assert load_chunks(document_id) == chunks
+
+    ingest_document(upload(replacement, "v2.docx"), metadata(), document_id=document_id)
+    assert sorted(DOCUMENT_DIR.iterdir()) == [DOCUMENT_DIR / f"{document_id}_v2.docx"]
+    assert load_chunks(document_id) != chunks
+"""
+
+
+def test_failed_replacement_keeps_the_original(run_app):
+    run_app(FAILED_REPLACE)
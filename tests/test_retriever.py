@@ -0,0 +1,31 @@
+import pytest
+
+RETRIEVE = """
+    from bench.fake_openai import FakeOpenAIClient, install_fake_client
+    from app.indexing.indexer import build_index
+    from app.indexing.versions import activate_version
+    from app.rag.retriever import retrieve_context
+    from app.rag.store import save_chunks
+
+    install_fake_client(FakeOpenAIClient(embedding_dim=32))
+    for i in range(3):
+        save_chunks(f"doc{i}", [f"policy text {i} {j}" for j in range(4)], {"approved": True, "document_type": "Policy"})
+    build_index()
+    build_index()
+    activate_version("default", 1)
+
+    contexts, version = retrieve_context("policy text", k=3)
+    assert version == 1, version
+    assert isinstance(contexts, list) and len(contexts) == 3, contexts
+    assert all(isinstance(c, dict) and c["chunk_id"].startswith("doc") for c in contexts), contexts
+
+    contexts, version = retrieve_context("policy text", k=2, document_type="Policy")
+    assert version == 1 and len(contexts) == 2, (version, contexts)
+"""
+
+
+@pytest.mark.parametrize("coalesce", ["true", "false"])
+def test_retrieve_context_returns_contexts_and_version(run_app, coalesce):
+    # DEBUG runs the per-document logging over the returned contexts
+    result = run_app(RETRIEVE, LOG_LEVEL="DEBUG", COALESCE_SEARCHES=coalesce)
+    assert "unique documents" in result.stdout + result.stderr